@@ -88,6 +88,10 @@ class StockPriceAnalysisConsole(code.InteractiveConsole):
             self.command_delistings(argv)
         elif command == 'simulate':
             self.command_simulate(argv)
+        elif command == 'sweep':
+            self.command_sweep(argv)
+        elif command == 'walkforward':
+            self.command_walkforward(argv)
         elif command == 'ticker':
             self.command_ticker(argv)
         elif command == 'principal':
@@ -128,6 +132,10 @@ class StockPriceAnalysisConsole(code.InteractiveConsole):
             self.command_load(argv)
         elif command == 'forceload':
             self.command_forceload(argv)
+        elif command == 'loaddir':
+            self.command_loaddir(argv)
+        elif command == 'export':
+            self.command_export(argv)
         elif command == 'help':
             self.command_help(argv)
         elif command == 'rank':
@@ -188,7 +196,58 @@ class StockPriceAnalysisConsole(code.InteractiveConsole):
                     commission_max  = Decimal(self.simulation_parameter.commission_max),
                     commission_rate = Decimal(self.simulation_parameter.commission_rate),
                     is_summary      = True if len(argv) > 4 and argv[4] == 'True' else False,
-                    loop_num        = 1 if len(argv) < 6 or not argv[5].isdigit() else int(argv[5])
+                    loop_num        = 1 if len(argv) < 6 or not argv[5].isdigit() else int(argv[5]),
+                    seed            = None if len(argv) < 7 or not argv[6].isdigit() else int(argv[6]),
+                    workers         = os.cpu_count() or 1
+                    )
+            print(message)
+
+    def command_sweep(self, argv:List[str]):
+        rules = ['turtle', 'random', 'randlong', 'randtrail', 'goldentrail', 'serialstepuptrail', 'triplestepuptrail', 'buyhold']
+        pairs = dict([a.split('=', 1) for a in argv[2:] if '=' in a])
+        options = {name: pairs.pop(name) for name in ['loop', 'seed', 'limit'] if name in pairs}
+
+        if len(argv) > 1 and argv[0] in rules and argv[1].isdigit() and 'unit' in pairs and 'losscut_rate' in pairs and all([v.isdigit() for v in options.values()]):
+            message = self.controller.sweep_trade_rule(
+                    rule_type       = argv[0],
+                    code            = self.common_parameter.ticker, 
+                    market          = self.common_parameter.market, 
+                    tags            = self.common_parameter.tags, 
+                    today           = self.common_parameter.today,
+                    term            = int(argv[1]),
+                    principal       = Decimal(self.simulation_parameter.principal),
+                    commission_min  = Decimal(self.simulation_parameter.commission_min),
+                    commission_max  = Decimal(self.simulation_parameter.commission_max),
+                    commission_rate = Decimal(self.simulation_parameter.commission_rate),
+                    parameters      = pairs,
+                    loop_num        = int(options.get('loop', '1')),
+                    seed            = int(options.get('seed', '0')),
+                    workers         = os.cpu_count() or 1,
+                    limit           = int(options.get('limit', '20'))
+                    )
+            print(message)
+
+    def command_walkforward(self, argv:List[str]):
+        isdecimal_lambda = lambda x: len(x.split('.')) < 3 and all([a.isdigit() for a in x.split('.')])
+
+        if len(argv) > 5 and (argv[0] in ['turtle', 'random', 'randlong', 'randtrail', 'goldentrail', 'serialstepuptrail', 'triplestepuptrail', 'buyhold']) and argv[1].isdigit() and isdecimal_lambda(argv[2]) and all([a.isdigit() and int(a) > 0 for a in argv[3:6]]):
+            message = self.controller.walk_forward_trade_rule(
+                    rule_type       = argv[0],
+                    code            = self.common_parameter.ticker, 
+                    market          = self.common_parameter.market, 
+                    tags            = self.common_parameter.tags, 
+                    unit            = int(argv[1]),
+                    losscut_rate    = argv[2],
+                    today           = self.common_parameter.today,
+                    term            = int(argv[3]),
+                    windows         = int(argv[4]),
+                    step            = int(argv[5]),
+                    principal       = Decimal(self.simulation_parameter.principal),
+                    commission_min  = Decimal(self.simulation_parameter.commission_min),
+                    commission_max  = Decimal(self.simulation_parameter.commission_max),
+                    commission_rate = Decimal(self.simulation_parameter.commission_rate),
+                    seed            = 0 if len(argv) < 7 or not argv[6].isdigit() else int(argv[6]),
+                    workers         = os.cpu_count() or 1
                     )
             print(message)
 
@@ -327,6 +386,11 @@ class StockPriceAnalysisConsole(code.InteractiveConsole):
             message = self.controller.load_candlesticks(filename = argv[0], safe = True)
             print(message)
 
+    def command_export(self, argv:List[str]):
+        if len(argv) > 0:
+            message = self.controller.export_candlesticks(market = argv[0])
+            print(message)
+
     def command_ath(self, argv:List[str]):
         if len(argv) > 0:
             message = self.controller.get_ath(
@@ -361,6 +425,15 @@ class StockPriceAnalysisConsole(code.InteractiveConsole):
             message = self.controller.load_candlesticks(filename = argv[0], safe = False)
             print(message)
 
+    def command_loaddir(self, argv:List[str]):
+        if len(argv) > 0:
+            message = self.controller.load_directory(
+                    dirname = argv[0], 
+                    workers = os.cpu_count() if len(argv) < 2 or not argv[1].isdigit() else int(argv[1]),
+                    safe    = True
+                    )
+            print(message)
+
     def command_rank(self, argv:List[str]):
         table = ''
         if (len(argv) >= 5) and (argv[0] in ['price', 'volume']) and (argv[1] in ['asc', 'desc']) and (argv[2].isdigit()) and (argv[3].isdigit()) and (argv[4].isdigit()):
@@ -492,6 +565,7 @@ class StockPriceAnalysisConsole(code.InteractiveConsole):
         print("[load]")
         print("  Description:")
         print("    Load the csvfile. If inconsistency data error occurs, it will rollback and displays the data missmatched.")
+        print("    Unchanged files since the last load are skipped, and only rows newer than the last loaded date of each ticker are processed.")
         print("  Usage:")
         print("    load </path/to/the/csvfile>")
         print("")
@@ -501,6 +575,20 @@ class StockPriceAnalysisConsole(code.InteractiveConsole):
         print("  Usage:")
         print("    forceload </path/to/the/csvfile>")
         print("")
+        print("[loaddir]")
+        print("  Description:")
+        print("    Load all csvfiles in the directory in parallel. Chunks with inconsistency data are skipped and counted as conflicts.")
+        print("    Loaded files and rows are skipped like load, so an interrupted run resumes where it stopped.")
+        print("  Usage:")
+        print("    loaddir </path/to/the/directory> [workers]")
+        print("")
+        print("[export]")
+        print("  Description:")
+        print("    Export the candlesticks and the tags of the market from the database to the columnar store.")
+        print("    The store replaces the database for the reads when the stock repository type is columnar.")
+        print("  Usage:")
+        print("    export <market(str)>")
+        print("")
         print("[search]")
         print("  Description:")
         print("    Search the ticker symbol which includes the keyword given by arg.")
@@ -643,7 +731,26 @@ class StockPriceAnalysisConsole(code.InteractiveConsole):
         print("  Description:")
         print("    Simulate the trade rule and evaluate.")
         print("  Usage:")
-        print("    simulate <rule [turtle|random|randlong|randtrail|goldentrail|serialstepuptrail|triplestepuptrail|buyhold]> <unit (int)> <losscut rate(decimal)> <term(integer)> <summary (bool) *optional> <loop num (int) *optional>")
+        print("    simulate <rule [turtle|random|randlong|randtrail|goldentrail|serialstepuptrail|triplestepuptrail|buyhold]> <unit (int)> <losscut rate(decimal)> <term(integer)> <summary (bool) *optional> <loop num (int) *optional> <seed (int) *optional>")
+        print("    With the loop num more than 1, the runs are executed in parallel and the quantiles are shown. The same seed reproduces the same result.")
+        print("")
+        print("[sweep]")
+        print("  Description:")
+        print("    Simulate the trade rule with every combination of the parameters in parallel, and rank them by the mean valuation.")
+        print("    The values are the list (a,b,c) or the range including the stop (start:stop:step). unit and losscut_rate are required.")
+        print("    The parameters: turtle (setup_term, closedup_term, setup_rate), goldentrail (long_sma_term, short_sma_term, setup_rate),")
+        print("                    serialstepuptrail/triplestepuptrail (term, number, setup_rate), random/randlong (setup_rate, closedup_rate), randtrail (setup_rate)")
+        print("  Usage:")
+        print("    sweep <rule [turtle|random|randlong|randtrail|goldentrail|serialstepuptrail|triplestepuptrail|buyhold]> <term(integer)> unit=<values> losscut_rate=<values> <parameter>=<values> ... <loop=(int) *optional> <seed=(int) *optional> <limit=(int) *optional>")
+        print("    e.g. sweep turtle 500 unit=5,10 losscut_rate=0.05:0.2:0.05 setup_term=10:40:10 closedup_term=5,10 loop=5")
+        print("")
+        print("[walkforward]")
+        print("  Description:")
+        print("    Simulate the trade rule on the rolling windows of the term, each ending the step days after the previous one, in parallel.")
+        print("    The candlesticks are fetched once. The report of each window and the summary of all windows are shown.")
+        print("  Usage:")
+        print("    walkforward <rule [turtle|random|randlong|randtrail|goldentrail|serialstepuptrail|triplestepuptrail|buyhold]> <unit (int)> <losscut rate(decimal)> <term(integer)> <windows(integer)> <step(integer)> <seed (int) *optional>")
+        print("    e.g. walkforward turtle 10 0.1 250 8 60")
         print("")
         print("[principal]")
         print("  Description:")
@@ -1,4 +1,4 @@
-from typing   import ClassVar, List
+from typing   import ClassVar, Dict, List
 import csv
 import asciichartpy
 
@@ -6,16 +6,144 @@ from app.util.exception import DataNotfoundAppException, UnauthorizedAppExceptio
 
 from app.usecase.stock           import StockUsecase
 from app.usecase.inputdata.stock import *
+from app.usecase.outputdata.stock import SimulateTradeRuleOutput
 
 from app.controller.stock  import  StockController
 
-from app.domain.stock import Candlestick
+from app.domain.stock import Candlestick, Ingestion
 from app.domain.analyze import TrendType
 from app.domain.invest import PositionType, InvestRuleType
 
 import re
+import os
+import random
+import glob
+import time
+import hashlib
+from multiprocessing import Manager
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty
+
+# ---------------------------------------------------------------------------------
+# Parse the rule name of the command.
+# ---------------------------------------------------------------------------------
+def parse_invest_rule_type(rule_type:str) -> InvestRuleType:
+    invest_rule_type = None
+    if rule_type == 'random':
+        invest_rule_type = InvestRuleType.RANDOM
+    elif rule_type == 'randlong':
+        invest_rule_type = InvestRuleType.RANDOM_LONG
+    elif rule_type == 'randtrail':
+        invest_rule_type = InvestRuleType.RANDOM_TRAIL
+    elif rule_type == 'goldentrail':
+        invest_rule_type = InvestRuleType.GOLDEN_TRAIL
+    elif rule_type == 'serialstepuptrail':
+        invest_rule_type = InvestRuleType.SERIAL_STEPUP_TRAIL
+    elif rule_type == 'triplestepuptrail':
+        invest_rule_type = InvestRuleType.TRIPLE_STEPUP_TRAIL
+    elif rule_type == 'buyhold':
+        invest_rule_type = InvestRuleType.BUYHOLD
+    else:
+        invest_rule_type = InvestRuleType.TURTLE
+
+    return invest_rule_type
+
+# ---------------------------------------------------------------------------------
+# Expand the values of the sweep parameter. "a,b,c" is the list of the values and
+# "start:stop:step" is the range including the stop. The rates are decimal, others are integer.
+# ---------------------------------------------------------------------------------
+def expand_sweep_parameter(name:str, text:str) -> List:
+    convert = Decimal if name.endswith('rate') else int
+    if ':' not in text:
+        return [convert(t) for t in text.split(',')]
+
+    (start, stop, step) = [convert(t) for t in text.split(':')]
+    if step <= 0:
+        raise ValueError(f"The step of {name} must be positive.")
+
+    values = list()
+    while start <= stop:
+        values.append(start)
+        start += step
+    return values
+
+# ---------------------------------------------------------------------------------
+# Parse the date column. "YYYY/MM/DD" and "YYYY-MM-DD" (with optional time) take
+# the fast path, others fall back to the regex split.
+# ---------------------------------------------------------------------------------
+def parse_candlestick_date(text:str) -> date:
+    if len(text) >= 10 and text[4] in '/-' and text[7] == text[4]:
+        return date(int(text[0:4]), int(text[5:7]), int(text[8:10]))
+
+    date_split = re.split(r"\s+|\/|:", text) 
+    return date(int(date_split[0]), int(date_split[1]), int(date_split[2]))
+
+# ---------------------------------------------------------------------------------
+# Read candlesticks file lazily as chunks.
+# ---------------------------------------------------------------------------------
+def read_candlestick_chunks(filename:str, chunk_size:int):
+    with open(filename, "r", errors="", newline="" ) as csv_file:
+        f = csv.reader(csv_file, delimiter=",", doublequote=True, lineterminator="\r\n", quotechar='"', skipinitialspace=True)
+        header = next(f, None) # Discard header part.
+
+        sticks = []
+        for row in f: 
+            sticks.append(
+                    Candlestick( 
+                        code        = row[0], 
+                        market      = row[1], 
+                        date        = parse_candlestick_date(row[2]), 
+                        open_price  = Decimal(row[3]), 
+                        close_price = Decimal(row[6]), 
+                        high_price  = Decimal(row[4]), 
+                        low_price   = Decimal(row[5]), 
+                        volume      = int(row[7]), 
+                        interval    = Interval.DAILY
+                        )
+                    )
+            if len(sticks) >= chunk_size:
+                yield sticks
+                sticks = []
+
+        if len(sticks) > 0:
+            yield sticks
+
+# ---------------------------------------------------------------------------------
+# Make the ingestion manifest of the file. Row count is filled after loading.
+# ---------------------------------------------------------------------------------
+def hash_candlestick_file(filename:str) -> Ingestion:
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+
+    return Ingestion(
+            path      = os.path.abspath(filename),
+            size      = os.path.getsize(filename),
+            hash      = digest.hexdigest(),
+            row_count = 0
+            )
+
+# ---------------------------------------------------------------------------------
+# Parse a candlesticks file in worker process and pass the chunks to the queue.
+# ---------------------------------------------------------------------------------
+def parse_candlestick_file(filename:str, chunk_size:int, queue):
+    rows = 0
+    try:
+        for sticks in read_candlestick_chunks(filename, chunk_size):
+            rows += len(sticks)
+            queue.put(('chunk', filename, sticks))
+    except Exception as e:
+        queue.put(('error', filename, str(e)))
+        return rows
+
+    queue.put(('done', filename, rows))
+    return rows
 
 class CliStockController(StockController):
+    load_chunk_size:     ClassVar[int] = 10000
+    # Seconds to wait for a chunk of the workers before checking they are alive.
+    load_poll_interval:  ClassVar[float] = 1.0
 
     stock_usecase:       StockUsecase
 
@@ -25,30 +153,38 @@ class CliStockController(StockController):
     # ---------------------------------------------------------------------------------
     # Simulate the trade rule.
     # ---------------------------------------------------------------------------------
-    def simulate_trade_rule(self, rule_type:str, code:str, market:str, tags:List[str], unit:int, losscut_rate:str, today:str, term:int, principal:str, commission_max:str, commission_min:str, commission_rate:str, is_summary:bool, loop_num:int):
+    def simulate_trade_rule(self, rule_type:str, code:str, market:str, tags:List[str], unit:int, losscut_rate:str, today:str, term:int, principal:str, commission_max:str, commission_min:str, commission_rate:str, is_summary:bool, loop_num:int, seed:int = None, workers:int = 1):
         (today_year, today_month, today_day) = today.split('-')
 
-        invest_rule_type = None
-        if rule_type == 'random':
-            invest_rule_type = InvestRuleType.RANDOM
-        elif rule_type == 'randlong':
-            invest_rule_type = InvestRuleType.RANDOM_LONG
-        elif rule_type == 'randtrail':
-            invest_rule_type = InvestRuleType.RANDOM_TRAIL
-        elif rule_type == 'goldentrail':
-            invest_rule_type = InvestRuleType.GOLDEN_TRAIL
-        elif rule_type == 'serialstepuptrail':
-            invest_rule_type = InvestRuleType.SERIAL_STEPUP_TRAIL
-        elif rule_type == 'triplestepuptrail':
-            invest_rule_type = InvestRuleType.TRIPLE_STEPUP_TRAIL
-        elif rule_type == 'buyhold':
-            invest_rule_type = InvestRuleType.BUYHOLD
-        else:
-            invest_rule_type = InvestRuleType.TURTLE
-                        
-        outputdata = []
+        invest_rule_type = parse_invest_rule_type(rule_type)
+
+        outputdata   = []
+        distribution = None
+        seed         = random.SystemRandom().randrange(2**32) if seed is None else seed
         try:
-            for i in range(loop_num):
+            if loop_num > 1:
+                # Repeated runs load the candlesticks once and run in parallel with the seeded generators.
+                montecarlo = self.stock_usecase.simulate_trade_rule_montecarlo(
+                        input_data = SimulateTradeRuleMonteCarloInput(
+                            rule_type    = invest_rule_type,
+                            code         = code,
+                            market       = market,
+                            tags         = tags,
+                            unit         = unit,
+                            losscut_rate = Decimal(losscut_rate),
+                            today        = date(int(today_year), int(today_month), int(today_day)),
+                            term         = term,
+                            principal    = Decimal(principal),
+                            commission   = StandardCommission(minimum = Decimal(commission_min), maximum = Decimal(commission_max), rate = Decimal(commission_rate)),
+                            loop_num     = loop_num,
+                            seed         = seed,
+                            workers      = workers,
+                            detail       = not is_summary
+                            )
+                        )
+                outputdata   = [SimulateTradeRuleOutput(report = r) for r in montecarlo.reports]
+                distribution = montecarlo.distribution
+            else:
                 outputdata.append(self.stock_usecase.simulate_trade_rule( 
                         input_data = SimulateTradeRuleInput(
                             rule_type    = invest_rule_type,
@@ -87,6 +223,18 @@ class CliStockController(StockController):
                 result += f"|{'':->20}|{'':->20}|{'':->20}|{'':->20}|{'':->20}|\n" 
                 result += f"|{r.mean_profit:>20.7f}|{r.mean_loss:>20.7f}|{r.win_rate:>20.7f}|{r.lose_rate:>20.7f}|{r.payoff_ratio:>20.7f}|\n" 
                 result += "\n"
+                result += f"|{'Max Drawdown':>20}|{'Exposure Rate':>20}|{'Sharpe Ratio':>20}|{'Sortino Ratio':>20}|\n" 
+                result += f"|{'':->20}|{'':->20}|{'':->20}|{'':->20}|\n" 
+                result += f"|{r.max_drawdown:>20.7f}|{r.exposure_rate:>20.7f}|{r.sharpe_ratio:>20.7f}|{r.sortino_ratio:>20.7f}|\n" 
+                result += "\n"
+                result += "[Ticker Details]\n\n"
+                result += f"|{'Ticker':>20}|{'Trades':>20}|{'Win':>20}|{'Lose':>20}|{'Profit':>20}|{'Commission':>20}|{'Exposure Rate':>20}|\n" 
+                result += f"|{'':->20}|{'':->20}|{'':->20}|{'':->20}|{'':->20}|{'':->20}|{'':->20}|\n" 
+                for (key, t) in r.tickers.items(): 
+                    if t.trade_number == 0 and t.exposure_rate == 0:
+                        continue
+                    result += f"|{key:>20}|{t.trade_number:>20}|{t.win_number:>20}|{t.lose_number:>20}|{t.profit:>20.7f}|{t.commission:>20,.7f}|{t.exposure_rate:>20.7f}|\n"
+                result += "\n"
                 result += "[Transaction Details]\n\n"
                 result += f"{'':>21}|{'Open':>41}|{'Close':>41}|\n" 
                 result += f"|{'':>20}|{'':->41}|{'':->41}|\n" 
@@ -113,47 +261,129 @@ class CliStockController(StockController):
                         result += f"|{p.volume:>20}|\n"
         else:
             result += "----------------------------------------------------------------------------------------------------------------------------------------------\n"
-            result += f"|{'Current Valuation':>20}|{'Commission':>20}|{'Mean Profit':>20}|{'Mean Loss':>20}|{'Win Rate':>20}|\n" 
+            result += f"|{'Current Valuation':>20}|{'Commission':>20}|{'Mean Profit':>20}|{'Mean Loss':>20}|{'Win Rate':>20}|{'Max Drawdown':>20}|{'Sharpe Ratio':>20}|\n" 
             for (index, item) in enumerate(outputdata): 
                 r = item.report
-                result += f"|{r.current_valuation:>20,.7f}|{r.commission:>20,.7f}|{r.mean_profit:>20.7f}|{r.mean_loss:>20.7f}|{r.win_rate:>20.7f}|\n" 
+                result += f"|{r.current_valuation:>20,.7f}|{r.commission:>20,.7f}|{r.mean_profit:>20.7f}|{r.mean_loss:>20.7f}|{r.win_rate:>20.7f}|{r.max_drawdown:>20.7f}|{r.sharpe_ratio:>20.7f}|\n" 
 
+        if distribution != None:
+            result += "----------------------------------------------------------------------------------------------------------------------------------------------\n"
+            result += f"[Distribution of {distribution.number} runs (seed: {seed})]\n\n"
+            result += f"|{'Quantile':>20}|{'Current Valuation':>20}|{'Win Rate':>20}|{'Payoff Ratio':>20}|\n" 
+            result += f"|{'':->20}|{'':->20}|{'':->20}|{'':->20}|\n" 
+            for (p, valuation, win_rate, payoff_ratio) in zip(distribution.probabilities, distribution.valuations, distribution.win_rates, distribution.payoff_ratios):
+                result += f"|{p:>20}|{valuation:>20,.7f}|{win_rate:>20.7f}|{payoff_ratio:>20.7f}|\n" 
 
         return result
         
 
     # ---------------------------------------------------------------------------------
-    # Load candlesticks.
+    # Sweep the parameters of the trade rule.
     # ---------------------------------------------------------------------------------
-    def load_candlesticks(self, filename:str, safe:bool):
-        csv_file = open(filename, "r", errors="", newline="" )
-        f = csv.reader(csv_file, delimiter=",", doublequote=True, lineterminator="\r\n", quotechar='"', skipinitialspace=True)
-        header = next(f) # Discard header part.
+    def sweep_trade_rule(self, rule_type:str, code:str, market:str, tags:List[str], today:str, term:int, principal:str, commission_max:str, commission_min:str, commission_rate:str, parameters:Dict[str,str], loop_num:int, seed:int, workers:int, limit:int):
+        (today_year, today_month, today_day) = today.split('-')
 
-        sticks = []
-        for row in f: 
-            date_split = re.split(r"\s+|\/|:", row[2]) 
-            sticks.append(
-                    Candlestick( 
-                        code        = row[0], 
-                        market      = row[1], 
-                        date        = date(int(date_split[0]), int(date_split[1]), int(date_split[2])), 
-                        open_price  = Decimal(row[3]), 
-                        close_price = Decimal(row[6]), 
-                        high_price  = Decimal(row[4]), 
-                        low_price   = Decimal(row[5]), 
-                        volume      = int(row[7]), 
-                        interval    = Interval.DAILY
+        try:
+            outputdata = self.stock_usecase.sweep_trade_rule(
+                    input_data = SweepTradeRuleInput(
+                        rule_type  = parse_invest_rule_type(rule_type),
+                        code       = code,
+                        market     = market,
+                        tags       = tags,
+                        today      = date(int(today_year), int(today_month), int(today_day)),
+                        term       = term,
+                        principal  = Decimal(principal),
+                        commission = StandardCommission(minimum = Decimal(commission_min), maximum = Decimal(commission_max), rate = Decimal(commission_rate)),
+                        parameters = {name: expand_sweep_parameter(name, text) for (name, text) in parameters.items()},
+                        loop_num   = loop_num,
+                        seed       = seed,
+                        workers    = workers
                         )
                     )
+        except Exception as e:
+            print(e)
+            # TODO: Handle exception.
+            return ''
+
+        names   = list(parameters.keys())
+        result  = f"[Sweep of {len(outputdata.results)} combinations x {loop_num} runs (seed: {seed})]\n\n"
+        result += f"|{'Rank':>6}|" + ''.join([f"{name:>15}|" for name in names]) + f"{'Valuation':>20}|{'Win Rate':>12}|{'Payoff Ratio':>12}|{'Commission':>15}|\n"
+        result += f"|{'':->6}|" + ''.join([f"{'':->15}|" for name in names]) + f"{'':->20}|{'':->12}|{'':->12}|{'':->15}|\n"
+        for (rank, r) in enumerate(outputdata.results[:limit]):
+            result += f"|{rank+1:>6}|" + ''.join([f"{str(r.parameters[name]):>15}|" for name in names])
+            result += f"{r.valuation:>20,.4f}|{r.win_rate:>12.4f}|{r.payoff_ratio:>12.4f}|{r.commission:>15,.4f}|\n"
+
+        return result
+
+    # ---------------------------------------------------------------------------------
+    # Simulate the trade rule on the rolling windows.
+    # ---------------------------------------------------------------------------------
+    def walk_forward_trade_rule(self, rule_type:str, code:str, market:str, tags:List[str], unit:int, losscut_rate:str, today:str, term:int, windows:int, step:int, principal:str, commission_max:str, commission_min:str, commission_rate:str, seed:int, workers:int):
+        (today_year, today_month, today_day) = today.split('-')
+
+        try:
+            outputdata = self.stock_usecase.walk_forward_trade_rule(
+                    input_data = WalkForwardTradeRuleInput(
+                        rule_type    = parse_invest_rule_type(rule_type),
+                        code         = code,
+                        market       = market,
+                        tags         = tags,
+                        unit         = unit,
+                        losscut_rate = Decimal(losscut_rate),
+                        today        = date(int(today_year), int(today_month), int(today_day)),
+                        term         = term,
+                        windows      = windows,
+                        step         = step,
+                        principal    = Decimal(principal),
+                        commission   = StandardCommission(minimum = Decimal(commission_min), maximum = Decimal(commission_max), rate = Decimal(commission_rate)),
+                        seed         = seed,
+                        workers      = workers
+                        )
+                    )
+        except Exception as e:
+            print(e)
+            # TODO: Handle exception.
+            return ''
+
+        result  = f"[Walk-forward of {len(outputdata.windows)} windows of {term} days every {step} days (seed: {seed})]\n\n"
+        result += f"|{'Window':>8}|{'First Date':>12}|{'Last Date':>12}|{'Valuation':>20}|{'Return':>12}|{'Win Rate':>12}|{'Max Drawdown':>13}|{'Sharpe Ratio':>13}|\n"
+        result += f"|{'':->8}|{'':->12}|{'':->12}|{'':->20}|{'':->12}|{'':->12}|{'':->13}|{'':->13}|\n"
+        for w in outputdata.windows:
+            r = w.report
+            result += f"|{w.index+1:>8}|{w.first_date.strftime('%Y-%m-%d'):>12}|{w.last_date.strftime('%Y-%m-%d'):>12}|{r.current_valuation:>20,.4f}"
+            result += f"|{(r.current_valuation/r.principal - 1 if r.principal != 0 else 0):>12.4f}|{r.win_rate:>12.4f}|{r.max_drawdown:>13.4f}|{r.sharpe_ratio:>13.4f}|\n"
+
+        s = outputdata.summary
+        result += "\n"
+        result += f"|{'Windows':>8}|{'Profitable Rate':>16}|{'Mean Return':>12}|{'Mean Win Rate':>14}|{'Mean Sharpe':>12}|{'Worst Drawdown':>15}|\n"
+        result += f"|{'':->8}|{'':->16}|{'':->12}|{'':->14}|{'':->12}|{'':->15}|\n"
+        result += f"|{s.number:>8}|{s.profitable_rate:>16.4f}|{s.mean_return:>12.4f}|{s.mean_win_rate:>14.4f}|{s.mean_sharpe:>12.4f}|{s.worst_drawdown:>15.4f}|\n"
+
+        return result
+
+    # ---------------------------------------------------------------------------------
+    # Load candlesticks.
+    # ---------------------------------------------------------------------------------
+    def load_candlesticks(self, filename:str, safe:bool):
+        ingestion = hash_candlestick_file(filename)
+
+        # Safe load skips the file loaded before and the rows between the loaded dates of the tickers.
+        if safe:
+            present = self.stock_usecase.get_ingestion(input_data = GetIngestionInput(path = ingestion.path)).ingestion
+            if present != None and present.size == ingestion.size and present.hash == ingestion.hash:
+                return f"{filename} is not changed since the last load. Skipped."
+
         result = ''
         try:
-            outputdata = self.stock_usecase.create_candlestick( 
-                    input_data = CreateCandlestickInput(
-                        candlesticks = sticks,
-                        safe         = safe
+            outputdata = self.stock_usecase.create_candlestick_chunks( 
+                    input_data = CreateCandlestickChunksInput(
+                        chunks      = read_candlestick_chunks(filename, self.load_chunk_size),
+                        safe        = safe,
+                        incremental = safe
                         )
                     )
+            ingestion.row_count = outputdata.count + outputdata.skipped
+            self.stock_usecase.create_ingestion(input_data = CreateIngestionInput(ingestion = ingestion))
         except InconsistencyDataException as e:
             result += f"|{'':>10}|{'Symbol':>20}|{'Date':>12}|{'Open Price':>20}|{'Close Price':>20}|{'High Price':>20}|{'Low Price':>20}|{'Volume':>20}|{'Interval':>10}|{'Patched':>10}|\n" 
             for (present, newer) in list(zip(e.present, e.newer)):
@@ -168,6 +398,99 @@ class CliStockController(StockController):
 
         return result
 
+    # ---------------------------------------------------------------------------------
+    # Load all candlesticks files in the directory.
+    # ---------------------------------------------------------------------------------
+    def load_directory(self, dirname:str, workers:int, safe:bool):
+        filenames = sorted(glob.glob(os.path.join(dirname, '*.csv')))
+        if len(filenames) == 0:
+            return f"No csv file in {dirname}."
+
+        stats = {filename: {'rows': 0, 'saved': 0, 'skipped': 0, 'conflicts': 0, 'error': '', 'status': 'Loaded'} for filename in filenames}
+        started_at = time.time()
+
+        # Workers parse files in parallel and the bounded queue keeps only a few chunks in memory while this process writes them.
+        with Manager() as manager:
+            queue = manager.Queue(maxsize = workers * 2)
+            with ProcessPoolExecutor(max_workers = workers) as executor:
+                ingestions = dict(zip(filenames, executor.map(hash_candlestick_file, filenames)))
+
+                # Files not changed since the last load are skipped. Interrupted files resume from the watermarks.
+                targets = []
+                for filename in filenames:
+                    ingestion = ingestions[filename]
+                    present = self.stock_usecase.get_ingestion(input_data = GetIngestionInput(path = ingestion.path)).ingestion
+                    if safe and present != None and present.size == ingestion.size and present.hash == ingestion.hash:
+                        stats[filename]['status'] = 'Unchanged'
+                    else:
+                        targets.append(filename)
+
+                futures  = {executor.submit(parse_candlestick_file, filename, self.load_chunk_size, queue): filename for filename in targets}
+                finished = set()
+                # The first date of the rows of each ticker saved from the file so far, which joins the next chunk to the dates loaded before.
+                loaded_from = {filename: dict() for filename in targets}
+
+                while len(finished) < len(targets):
+                    try:
+                        (kind, filename, payload) = queue.get(timeout = self.load_poll_interval)
+                    except Empty:
+                        # A worker killed on the way (e.g. out of memory) never posts 'done' or 'error'. The pool fails its futures instead.
+                        for (future, filename) in futures.items():
+                            if filename not in finished and future.done() and future.exception() != None:
+                                stats[filename]['error']  = str(future.exception()) or type(future.exception()).__name__
+                                stats[filename]['status'] = 'Failed'
+                                finished.add(filename)
+                        continue
+
+                    if filename in finished:
+                        continue
+                    if kind == 'chunk':
+                        stats[filename]['rows'] += len(payload)
+                        try:
+                            # The conflicting rows are left out and counted, and the other rows of the chunk are saved.
+                            outputdata = self.stock_usecase.create_candlestick_chunks( 
+                                    input_data = CreateCandlestickChunksInput(
+                                        chunks         = [payload],
+                                        safe           = safe,
+                                        incremental    = safe,
+                                        skip_conflicts = True,
+                                        loaded_from    = loaded_from[filename]
+                                        )
+                                    )
+                            stats[filename]['saved']     += outputdata.count
+                            stats[filename]['skipped']   += outputdata.skipped
+                            stats[filename]['conflicts'] += len(outputdata.newer)
+                            loaded_from[filename]         = outputdata.loaded_from
+                        except Exception as e:
+                            stats[filename]['error'] = str(e)
+                            # The next chunk is not joined over the rows of the chunk rolled back.
+                            for stick in payload:
+                                loaded_from[filename].pop((stick.code, stick.market), None)
+                    elif kind == 'error':
+                        stats[filename]['error']  = payload
+                        stats[filename]['status'] = 'Failed'
+                        finished.add(filename)
+                    else:
+                        finished.add(filename)
+                        if stats[filename]['conflicts'] == 0 and stats[filename]['error'] == '':
+                            ingestion = ingestions[filename]
+                            ingestion.row_count = payload
+                            self.stock_usecase.create_ingestion(input_data = CreateIngestionInput(ingestion = ingestion))
+                        else:
+                            stats[filename]['status'] = 'Failed'
+
+        elapsed = time.time() - started_at
+        total_rows = sum([stat['rows'] for stat in stats.values()])
+
+        result  = f"|{'File':>40}|{'Status':>10}|{'Rows':>12}|{'Saved':>12}|{'Skipped':>12}|{'Conflicts':>12}|{'Error':>30}|\n" 
+        result += f"|{'':->40}|{'':->10}|{'':->12}|{'':->12}|{'':->12}|{'':->12}|{'':->30}|\n" 
+        for (filename, stat) in stats.items():
+            result += f"|{os.path.basename(filename):>40}|{stat['status']:>10}|{stat['rows']:>12}|{stat['saved']:>12}|{stat['skipped']:>12}|{stat['conflicts']:>12}|{stat['error'][:30]:>30}|\n"
+        result += "\n"
+        result += f"Files: {len(filenames)}, Rows: {total_rows}, Elapsed: {elapsed:.2f}s, Throughput: {total_rows / elapsed if elapsed > 0 else 0:.1f} rows/s\n"
+
+        return result
+
     # ---------------------------------------------------------------------------------
     # Load tags.
     # ---------------------------------------------------------------------------------
@@ -1133,3 +1456,21 @@ class CliStockController(StockController):
             pass
 
         return True
+
+    # ---------------------------------------------------------------------------------
+    # Export the candlesticks of the market to the columnar store.
+    # ---------------------------------------------------------------------------------
+    def export_candlesticks(self, market:str):
+        started_at = time.time()
+        try:
+            outputdata = self.stock_usecase.export_candlesticks(
+                    input_data = ExportCandlesticksInput(
+                        market = market
+                        )
+                    )
+        except Exception as e:
+            print(e)
+            # TODO: Handle exception.
+            return f"Failed to export {market}."
+
+        return f"Exported {market}. Tickers: {outputdata.tickers}, Candlesticks: {outputdata.candlesticks}, Elapsed: {time.time() - started_at:.2f}s"
@@ -5,10 +5,22 @@ class StockController:
     def simulate_trade_rule(self):
         raise NotImplementedError
 
+    @abstractmethod
+    def sweep_trade_rule(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def walk_forward_trade_rule(self):
+        raise NotImplementedError
+
     @abstractmethod
     def load_candlesticks(self):
         raise NotImplementedError
 
+    @abstractmethod
+    def load_directory(self):
+        raise NotImplementedError
+
     @abstractmethod
     def load_tags(self):
         raise NotImplementedError
@@ -137,3 +149,7 @@ class StockController:
     @abstractmethod
     def make_cachetag(self):
         raise NotImplementedError
+
+    @abstractmethod
+    def export_candlesticks(self):
+        raise NotImplementedError
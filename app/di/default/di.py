@@ -10,6 +10,11 @@ from app.repository.transaction            import Transaction
 
 from app.repository.sqlalchemy.transaction import SqlalchemyTransaction
 from app.repository.sqlalchemy.stock       import SqlalchemyStockRepository
+from app.repository.cached.stock           import CachedStockRepository
+from app.repository.cached.window          import WindowCachedStockRepository
+from app.repository.columnar.stock         import ColumnarStockRepository
+from app.repository.export                 import StockExportRepository
+from app.repository.columnar.export        import ColumnarStockExportRepository
 
 from app.usecase.stock                     import StockUsecase
 from app.usecase.default.stock             import DefaultStockInteractor
@@ -19,35 +24,82 @@ from app.controller.cli.stock              import CliStockController
 
 from app.driver.cache                      import CacheDriver
 from app.driver.redis.cache                import RedisCacheDriver
+from app.driver.memory.cache               import MemoryCacheDriver
+from app.driver.window                     import WindowCacheDriver
+from app.driver.redis.window               import RedisWindowCacheDriver
+from app.driver.memory.window              import MemoryWindowCacheDriver
+
+from app.domain.numeric                    import NumericBackend, NumericBackendType, make_numeric_backend
 
 class DefaultDIContainer(DIContainer):
     config:             ConfigParser
     stock_repository:   StockRepository
+    stock_export_repository: StockExportRepository
+    export_source_repository: StockRepository
     stock_usecase:      StockUsecase
     transaction:        Transaction
     stock_controller:   StockController
     cache_driver:       CacheDriver
+    window_cache_driver: WindowCacheDriver
+    numeric_backend:    NumericBackend
 
     def __init__(self):
         self.stock_usecase      = None
         self.stock_repository   = None
+        self.stock_export_repository = None
+        self.export_source_repository = None
         self.transaction        = None
         self.stock_controller   = None
         self.cache_driver       = None
+        self.window_cache_driver = None
+        self.numeric_backend    = None
 
         self.config = ConfigParser()
         self.config.read(path.dirname(__file__)+'/config.ini', encoding='utf-8')
 
     def inject_stock_repository(self) -> StockRepository:
+        # The columnar store is read from the memory-mapped files, so the cache tiers are not put on it.
+        if self.stock_repository == None and getenv('StockRepositoryType', self.config['StockRepository']['type']).lower() == 'columnar':
+            self.stock_repository = ColumnarStockRepository(
+                    root = getenv('ColumnarStorePath', self.config['ColumnarStore']['path'])
+                    )
         if self.stock_repository == None:
             self.stock_repository = SqlalchemyStockRepository()
+            ttl = int(getenv('WindowCacheTtl', self.config['WindowCache']['ttl']))
+            if ttl > 0:
+                self.stock_repository = WindowCachedStockRepository(
+                        repository = self.stock_repository,
+                        driver     = self.inject_window_cache_driver(),
+                        ttl        = ttl,
+                        compress   = getenv('WindowCacheCompress', self.config['WindowCache']['compress']).lower() == 'true'
+                        )
+            capacity = int(getenv('StockRepositoryCacheCapacity', self.config['StockRepository']['cache_capacity']))
+            if capacity > 0:
+                self.stock_repository = CachedStockRepository(
+                        repository = self.stock_repository,
+                        capacity   = capacity
+                        )
         return self.stock_repository
 
+    def inject_stock_export_repository(self) -> StockExportRepository:
+        if self.stock_export_repository == None:
+            self.stock_export_repository = ColumnarStockExportRepository(
+                    root = getenv('ColumnarStorePath', self.config['ColumnarStore']['path'])
+                    )
+        return self.stock_export_repository
+
+    def inject_export_source_repository(self) -> StockRepository:
+        # The export always reads the database, even when the application reads the columnar store.
+        if self.export_source_repository == None:
+            self.export_source_repository = SqlalchemyStockRepository()
+        return self.export_source_repository
+
     def inject_transaction(self) -> Transaction:
         if self.transaction == None:
             self.transaction = SqlalchemyTransaction(
-                    target_url   = getenv('TransactionTargetUrl',       self.config['Transaction']['target_url']),
-                    pool_recycle = int(getenv('TransactionPoolRecycle', self.config['Transaction']['pool_recycle']))
+                    target_url    = getenv('TransactionTargetUrl',       self.config['Transaction']['target_url']),
+                    pool_recycle  = int(getenv('TransactionPoolRecycle', self.config['Transaction']['pool_recycle'])),
+                    create_schema = getenv('TransactionCreateSchema',    self.config['Transaction']['create_schema']).lower() == 'true'
                     ) 
         return self.transaction
 
@@ -56,7 +108,11 @@ class DefaultDIContainer(DIContainer):
             self.stock_usecase = DefaultStockInteractor(
                     stock_repository = self.inject_stock_repository(),
                     transaction      = self.inject_transaction(),
-                    cache_driver     = self.inject_cache_driver()
+                    cache_driver     = self.inject_cache_driver(),
+                    batch_size       = int(getenv('StockUsecaseBatchSize', self.config['StockUsecase']['batch_size'])),
+                    numeric          = self.inject_numeric_backend(),
+                    stock_export_repository = self.inject_stock_export_repository(),
+                    export_source_repository = self.inject_export_source_repository()
                     )
         return self.stock_usecase
 
@@ -68,9 +124,31 @@ class DefaultDIContainer(DIContainer):
         return self.stock_controller
 
     def inject_cache_driver(self) -> CacheDriver:
+        if self.cache_driver == None and self._cache_driver_type() == 'memory':
+            self.cache_driver = MemoryCacheDriver()
         if self.cache_driver == None:
             self.cache_driver = RedisCacheDriver(
                     server = getenv('CacheDriverServer', self.config['CacheDriver']['server']),
                     port   = getenv('CacheDriverPort', self.config['CacheDriver']['port'])
                     )
         return self.cache_driver
+
+    def inject_window_cache_driver(self) -> WindowCacheDriver:
+        if self.window_cache_driver == None and self._cache_driver_type() == 'memory':
+            self.window_cache_driver = MemoryWindowCacheDriver()
+        if self.window_cache_driver == None:
+            self.window_cache_driver = RedisWindowCacheDriver(
+                    server = getenv('CacheDriverServer', self.config['CacheDriver']['server']),
+                    port   = getenv('CacheDriverPort', self.config['CacheDriver']['port'])
+                    )
+        return self.window_cache_driver
+
+    def inject_numeric_backend(self) -> NumericBackend:
+        if self.numeric_backend == None:
+            self.numeric_backend = make_numeric_backend(
+                    NumericBackendType[getenv('NumericBackend', self.config['Numeric']['backend']).upper()]
+                    )
+        return self.numeric_backend
+
+    def _cache_driver_type(self) -> str:
+        return getenv('CacheDriverType', self.config['CacheDriver']['type']).lower()
@@ -2,19 +2,31 @@ from __future__ import annotations
 from abc import ABCMeta, abstractmethod
 
 from app.repository.stock import StockRepository
+from app.repository.export import StockExportRepository
 from app.repository.transaction import Transaction
 
 from app.driver.cache import CacheDriver
+from app.driver.window import WindowCacheDriver
 
 from app.usecase.stock import StockUsecase
 
 from app.controller.stock import StockController
 
+from app.domain.numeric import NumericBackend
+
 class DIContainer(metaclass=ABCMeta):
     @abstractmethod
     def inject_stock_repository(self) -> StockRepository:
         raise NotImplementedError
 
+    @abstractmethod
+    def inject_stock_export_repository(self) -> StockExportRepository:
+        raise NotImplementedError
+
+    @abstractmethod
+    def inject_export_source_repository(self) -> StockRepository:
+        raise NotImplementedError
+
     @abstractmethod
     def inject_transaction(self) -> Transaction:
         raise NotImplementedError
@@ -30,3 +42,11 @@ class DIContainer(metaclass=ABCMeta):
     @abstractmethod
     def inject_cache_driver(self) -> CacheDriver:
         raise NotImplementedError
+
+    @abstractmethod
+    def inject_numeric_backend(self) -> NumericBackend:
+        raise NotImplementedError
+
+    @abstractmethod
+    def inject_window_cache_driver(self) -> WindowCacheDriver:
+        raise NotImplementedError
@@ -1,11 +1,12 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
 from decimal import Decimal
 from typing import ClassVar, List
 
 from enum import IntEnum, auto
 from app.domain.stock import Candlestick
+from app.domain.numeric import NumericBackend, DecimalNumericBackend
 
 @dataclass
 class ScoreCalcurator:
@@ -76,12 +77,17 @@ class RelativeStrengthCalcurator:
         point:    int
 
     raw_scores: List[RawScore]
+    numeric:    NumericBackend = field(default_factory=DecimalNumericBackend)
 
     def relative_strength(self) -> List[RelativeStrength]:
-        sorted_scores = sorted(self.raw_scores, key=lambda x: x.score(), reverse=True)
+        # The scores of every ticker at once in the numbers of the backend, same as RawScore.score() on the decimal backend.
+        (price, price63, price126, price189, price252) = [self.numeric.array(self.numeric.numbers([getattr(score, name).close_price for score in self.raw_scores])) for name in ['stick', 'stick63', 'stick126', 'stick189', 'stick252']]
+        rawscores = 2*price/price63 + price/price126 + price/price189 + price/price252
+        sorted_indexes = sorted(range(len(self.raw_scores)), key=lambda x: rawscores[x], reverse=True)
 
         result = list()
-        for (idx, score) in enumerate(sorted_scores):
+        for (idx, index) in enumerate(sorted_indexes):
+            score = self.raw_scores[index]
             result.append( self.RelativeStrength(
                 code     = score.code,
                 market   = score.market,
@@ -90,8 +96,8 @@ class RelativeStrengthCalcurator:
                 stick126 = score.stick126,
                 stick189 = score.stick189,
                 stick252 = score.stick252,
-                rawscore = score.score(),
-                point = 100 - int(idx/len(sorted_scores)*100) - 1
+                rawscore = self.numeric.exact(rawscores[index]),
+                point = 100 - int(idx/len(sorted_indexes)*100) - 1
                 ))
 
         return result
@@ -0,0 +1,159 @@
+from __future__ import annotations
+from collections import deque
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.domain.stock import Candlestick
+from app.domain.numeric import NumericBackend, DecimalNumericBackend
+
+def rolling_max(values:Sequence, term:int) -> List:
+    """
+    values: Sequence (ascending order by date)
+    term:   int
+    return (maximums: List) None until the window is filled.
+    """
+    # Monotonic deque of indexes. The head is the maximum of the current window.
+    result  = list()
+    indexes = deque()
+    for (i, value) in enumerate(values):
+        while indexes and value >= values[indexes[-1]]:
+            indexes.pop()
+        indexes.append(i)
+        if indexes[0] <= i - term:
+            indexes.popleft()
+        result.append(values[indexes[0]] if i >= term - 1 else None)
+    return result
+
+def rolling_min(values:Sequence, term:int) -> List:
+    """
+    values: Sequence (ascending order by date)
+    term:   int
+    return (minimums: List) None until the window is filled.
+    """
+    # Monotonic deque of indexes. The head is the minimum of the current window.
+    result  = list()
+    indexes = deque()
+    for (i, value) in enumerate(values):
+        while indexes and value <= values[indexes[-1]]:
+            indexes.pop()
+        indexes.append(i)
+        if indexes[0] <= i - term:
+            indexes.popleft()
+        result.append(values[indexes[0]] if i >= term - 1 else None)
+    return result
+
+# ---------------------------------------------------------------------------------
+# Indicator arrays of each ticker, computed on the first request and shared by
+# every rule which refers to the same (ticker, indicator, column, term).
+# The values are in the number of the numeric backend, Decimal by default.
+# ---------------------------------------------------------------------------------
+class IndicatorCache:
+    candlesticks: Dict[str,List[Candlestick]]
+    indexes:      Dict[str,Dict[date,int]]
+    arrays:       Dict[Tuple,List]
+    numeric:      NumericBackend
+
+    def __init__(self, candlesticks:Dict[str,List[Candlestick]], numeric:NumericBackend = None):
+        """
+        candlesticks: Dict[str,List[Candlestick]] (descending order by date, as the repository returns)
+        numeric:      NumericBackend
+        """
+        self.candlesticks = {ticker: list(reversed(sticks)) for (ticker, sticks) in candlesticks.items()}
+        self.indexes      = {}
+        self.arrays       = {}
+        self.numeric      = DecimalNumericBackend() if numeric is None else numeric
+
+    def index(self, ticker:str, target_date:date) -> Optional[int]:
+        if ticker not in self.candlesticks:
+            return None
+        if ticker not in self.indexes:
+            self.indexes[ticker] = {s.date: i for (i, s) in enumerate(self.candlesticks[ticker])}
+        return self.indexes[ticker].get(target_date)
+
+    def column(self, ticker:str, column:str) -> List:
+        return self._cached(('column', ticker, column), lambda: self.numeric.numbers([getattr(s, column) for s in self.candlesticks[ticker]]))
+
+    def rolling_max(self, ticker:str, column:str, term:int) -> List:
+        return self._cached(('rolling_max', ticker, column, term), lambda: rolling_max(self.column(ticker, column), term))
+
+    def rolling_min(self, ticker:str, column:str, term:int) -> List:
+        return self._cached(('rolling_min', ticker, column, term), lambda: rolling_min(self.column(ticker, column), term))
+
+    def sma(self, ticker:str, column:str, term:int) -> List:
+        def compute():
+            values = self.column(ticker, column)
+            sma    = self.numeric.sma(values, term)
+            return [None] * (len(values) - len(sma)) + sma
+        return self._cached(('sma', ticker, column, term), compute)
+
+    # ---------------------------------------------------------------------------------
+    # Signals. Boolean arrays in the same order as the candlesticks, False until the
+    # required data is filled. The values are compared in object arrays.
+    # ---------------------------------------------------------------------------------
+    def is_highest(self, ticker:str, column:str, term:int) -> np.ndarray:
+        """
+        The value is the highest in the recent term.
+        """
+        return self._cached(('is_highest', ticker, column, term), lambda: (self._objects(self.column(ticker, column)) == self._objects(self.rolling_max(ticker, column, term))).astype(bool))
+
+    def is_lowest(self, ticker:str, column:str, term:int) -> np.ndarray:
+        """
+        The value is the lowest in the recent term.
+        """
+        return self._cached(('is_lowest', ticker, column, term), lambda: (self._objects(self.column(ticker, column)) == self._objects(self.rolling_min(ticker, column, term))).astype(bool))
+
+    def crossed_over(self, ticker:str, column:str, short_term:int, long_term:int) -> np.ndarray:
+        """
+        The short term SMA reaches the long term SMA from below.
+        """
+        def compute():
+            short  = self._objects(self.sma(ticker, column, short_term))
+            long   = self._objects(self.sma(ticker, column, long_term))
+            result = np.zeros(len(short), dtype=bool)
+            start  = max(short_term, long_term)
+            if len(short) > start:
+                result[start:] = (long[start-1:-1] > short[start-1:-1]).astype(bool) & (long[start:] <= short[start:]).astype(bool)
+            return result
+        return self._cached(('crossed_over', ticker, column, short_term, long_term), compute)
+
+    def stepped_up(self, ticker:str, term:int, number:int) -> np.ndarray:
+        """
+        Both the highest high price and the lowest low price of each block of the term rise over the number of blocks.
+        """
+        def compute():
+            highs  = self._objects(self.rolling_max(ticker, 'high_price', term))
+            lows   = self._objects(self.rolling_min(ticker, 'low_price', term))
+            result = np.zeros(len(highs), dtype=bool)
+            start  = term * number - 1
+            if len(highs) > start:
+                rising = np.ones(len(highs) - start, dtype=bool)
+                for k in range(number - 1):
+                    newer = slice(start - k*term, len(highs) - k*term)
+                    older = slice(start - (k+1)*term, len(highs) - (k+1)*term)
+                    rising &= (highs[newer] > highs[older]).astype(bool) & (lows[newer] > lows[older]).astype(bool)
+                result[start:] = rising
+            return result
+        return self._cached(('stepped_up', ticker, term, number), compute)
+
+    def stepped_up_volumes(self, ticker:str, term:int, number:int) -> np.ndarray:
+        """
+        The volumes of each block of the term, from the newest, rise in the lexicographic order over the number of blocks.
+        """
+        def compute():
+            volumes = self.column(ticker, 'volume')
+            blocks  = [tuple(reversed(volumes[max(i - term + 1, 0):i + 1])) for i in range(len(volumes))]
+            result  = np.zeros(len(volumes), dtype=bool)
+            for i in range(term * number - 1, len(volumes)):
+                result[i] = all([blocks[i - (k+1)*term] < blocks[i - k*term] for k in range(number - 1)])
+            return result
+        return self._cached(('stepped_up_volumes', ticker, term, number), compute)
+
+    def _objects(self, values:List) -> np.ndarray:
+        return self.numeric.array(values)
+
+    def _cached(self, key:Tuple, compute) -> List:
+        if key not in self.arrays:
+            self.arrays[key] = compute()
+        return self.arrays[key]
@@ -1,13 +1,14 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import ClassVar, List
+from typing import Callable, ClassVar, Dict, List, Optional
 from abc import ABCMeta, abstractmethod
 from enum import IntEnum, auto
 import random
 
 from app.domain.stock import Candlestick
 from app.domain.statistics import Statistics
+from app.domain.indicator import IndicatorCache
 
 @dataclass
 class History:
@@ -82,6 +83,23 @@ class InvestRule(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def prepare(self, cache: IndicatorCache):
+        """
+        cache: IndicatorCache
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def exposure_unit_by_aggregate(self, long_number: int, short_amount: Decimal, cash: Decimal) -> Decimal:
+        """
+        long_number:  int
+        short_amount: Decimal
+        cash:         Decimal
+        return (amount: Decimal)
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def reaching_have_long(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
@@ -182,10 +200,40 @@ class InvestRule(metaclass=ABCMeta):
 class BaseInvestRule(InvestRule):
     unit_number:   int
     losscut_rate:  Decimal
+    rng:           random.Random
+    cache:         IndicatorCache
+    signals:       Dict[str,Dict[str,List[bool]]]
 
-    def __init__(self, unit_number:int, losscut_rate:Decimal):
+    def __init__(self, unit_number:int, losscut_rate:Decimal, rng:random.Random = None):
         self.unit_number   = unit_number
         self.losscut_rate  = losscut_rate
+        self.rng           = random if rng is None else rng # The module functions share the global generator.
+        self.cache         = None
+        self.signals       = {}
+
+    def signal_expressions(self) -> Dict[str,Callable[[IndicatorCache,str],List[bool]]]:
+        """
+        Signals of the rule evaluated for each ticker at once. The key is the name of the signal.
+        return (expressions: Dict[str,Callable[[IndicatorCache,str],List[bool]]])
+        """
+        return {}
+
+    def prepare(self, cache: IndicatorCache):
+        """
+        Evaluate the signals of every ticker up front, and look them up by the date instead of scanning the window of the candlesticks.
+        """
+        self.cache   = cache
+        self.signals = {name: {ticker: expression(cache, ticker) for ticker in cache.candlesticks.keys()} for (name, expression) in self.signal_expressions().items()}
+
+    def _signal(self, name: str, sticks: List[Candlestick]) -> Optional[bool]:
+        """
+        The signal at the newest date of the window, or None if it is not evaluated.
+        """
+        if name not in self.signals or len(sticks) == 0:
+            return None
+        newest = sticks[0]
+        index  = self.cache.index(newest.code, newest.date)
+        return None if index is None else bool(self.signals[name][newest.code][index])
 
     @abstractmethod
     def required_number_of_histrical_data(self) -> int:
@@ -195,14 +243,27 @@ class BaseInvestRule(InvestRule):
         """
         Invest unit at risk free.
         """
-        amount = cash
+        long_number  = 0
+        short_amount = Decimal('0')
 
         for c in conditions:
             if c.position_type == PositionType.SELL:
-                amount -= c.price * c.volume if c.position_type == PositionType.SELL else Decimal('0')
+                short_amount += c.price * c.volume
+            else:
+                long_number += 1
 
-        available_num = self.unit_number - len(conditions) + len([c for c in conditions if c.position_type == PositionType.SELL])
-        return Decimal('0') if available_num == 0 else amount / Decimal(available_num)
+        return self.exposure_unit_by_aggregate(long_number = long_number, short_amount = short_amount, cash = cash)
+
+    def exposure_unit_by_aggregate(self, long_number: int, short_amount: Decimal, cash: Decimal) -> Decimal:
+        """
+        Invest unit at risk free. The short positions are excluded from the cash and the long positions use the units.
+        """
+        available_num = self.unit_number - long_number
+        return Decimal('0') if available_num == 0 else (cash - short_amount) / Decimal(available_num)
+
+    @staticmethod
+    def _has_position(conditions: List[InvestCondition], position_type: PositionType) -> bool:
+        return any(c.position_type == position_type for c in conditions)
 
     @abstractmethod
     def reaching_have_long(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
@@ -234,7 +295,7 @@ class BaseInvestRule(InvestRule):
         """
         Closed up at the close price.
         """
-        if len([c for c in conditions if c.position_type == PositionType.BUY]) == 0: # Nothing to close up.
+        if not self._has_position(conditions, PositionType.BUY): # Nothing to close up.
             (False, [], cash)
 
         removal   = list()
@@ -312,7 +373,7 @@ class BaseInvestRule(InvestRule):
         """
         Closed up at the close price.
         """
-        if len([c for c in conditions if c.position_type == PositionType.SELL]) == 0: # Nothing to close up.
+        if not self._has_position(conditions, PositionType.SELL): # Nothing to close up.
             (False, [], cash)
 
         removal   = list()
@@ -362,63 +423,86 @@ class BaseInvestRule(InvestRule):
 
 
 class TurtleInvestRule(BaseInvestRule):
-    setup_term:    int
-    closedup_term: int
-    setup_rate:    Decimal
-
-    def __init__(self, unit_number:int, losscut_rate:Decimal):
-        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate)
-        self.setup_term    = 20
-        self.closedup_term = 10
-        self.setup_rate    = Decimal('0.1')
+    setup_term:      int
+    closedup_term:   int
+    closedup_window: Optional[int]
+    setup_rate:      Decimal
+
+    def __init__(self, unit_number:int, losscut_rate:Decimal, setup_term:int = 20, closedup_term:int = None, setup_rate:Decimal = Decimal('0.1'), rng:random.Random = None):
+        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate, rng = rng)
+        self.setup_term      = setup_term
+        # Without closedup_term, the close up signals look at the whole window of the rule as they always have,
+        # and only require 10 candlesticks.
+        self.closedup_term   = 10 if closedup_term is None else closedup_term
+        self.closedup_window = closedup_term
+        self.setup_rate    = setup_rate
 
     def required_number_of_histrical_data(self) -> int:
         """
         Required number of histrical data.
         """
-        return self.setup_term
+        return max(self.setup_term, self.closedup_term)
+
+    def signal_expressions(self) -> Dict[str,Callable[[IndicatorCache,str],List[bool]]]:
+        return {
+                'highest_in_setup':    lambda cache, ticker: cache.is_highest(ticker, 'close_price', self.setup_term),
+                'lowest_in_setup':     lambda cache, ticker: cache.is_lowest(ticker, 'close_price', self.setup_term),
+                'highest_in_closedup': lambda cache, ticker: cache.is_highest(ticker, 'close_price', self._closedup_window()),
+                'lowest_in_closedup':  lambda cache, ticker: cache.is_lowest(ticker, 'close_price', self._closedup_window())
+                }
+
+    def _closedup_window(self) -> int:
+        return self.required_number_of_histrical_data() if self.closedup_window is None else self.closedup_window
+
+    def _is_highest(self, name: str, sticks: List[Candlestick], term: int, window: Optional[int]) -> bool:
+        if len(sticks) < term:
+            return False
+        signal = self._signal(name, sticks)
+        return max([s.close_price for s in sticks[:window]]) == sticks[0].close_price if signal is None else signal
+
+    def _is_lowest(self, name: str, sticks: List[Candlestick], term: int, window: Optional[int]) -> bool:
+        if len(sticks) < term:
+            return False
+        signal = self._signal(name, sticks)
+        return min([s.close_price for s in sticks[:window]]) == sticks[0].close_price if signal is None else signal
 
     def reaching_have_long(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
-        Newest close price is ATH in the recent 20 day.
+        Newest close price is ATH in the recent setup term.
         """
-        if len([c for c in conditions if c.position_type == PositionType.BUY]) > 0: 
+        if self._has_position(conditions, PositionType.BUY): 
             # Don't have position, if you already have another LONG position.
             return False
 
-        target_list = sticks[:self.setup_term]
-        return (len(target_list) == self.setup_term) and (max([s.close_price for s in sticks]) == sticks[0].close_price) and random.random() < self.setup_rate
+        return self._is_highest('highest_in_setup', sticks, self.setup_term, self.setup_term) and self.rng.random() < self.setup_rate
 
     def reaching_closedup_long(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
-        Newest close price is ATL in the recent 10 day.
+        Newest close price is ATL in the recent closed up term.
         """
-        if len([c for c in conditions if c.position_type == PositionType.BUY]) == 0: # Nothing to close up.
+        if not self._has_position(conditions, PositionType.BUY): # Nothing to close up.
             return False
 
-        target_list = sticks[:self.closedup_term]
-        return (len(target_list) == self.closedup_term) and (min([s.close_price for s in sticks]) == sticks[0].close_price)
+        return self._is_lowest('lowest_in_closedup', sticks, self.closedup_term, self.closedup_window)
 
     def reaching_have_short(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
-        Newest close price is ATL in the recent 20 day.
+        Newest close price is ATL in the recent setup term.
         """
-        if len([c for c in conditions if c.position_type == PositionType.SELL]) > 0: 
+        if self._has_position(conditions, PositionType.SELL): 
             # Don't have position, if you already have another SHORT position.
             return False
 
-        target_list = sticks[:self.setup_term]
-        return (len(target_list) == self.setup_term) and (min([s.close_price for s in sticks]) == sticks[0].close_price) and random.random() < self.setup_rate
+        return self._is_lowest('lowest_in_setup', sticks, self.setup_term, self.setup_term) and self.rng.random() < self.setup_rate
 
     def reaching_closedup_short(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
-        Newest close price is ATH in the recent 10 day.
+        Newest close price is ATH in the recent closed up term.
         """
-        if len([c for c in conditions if c.position_type == PositionType.SELL]) == 0: # Nothing to close up.
+        if not self._has_position(conditions, PositionType.SELL): # Nothing to close up.
             return False
 
-        target_list = sticks[:self.closedup_term]
-        return (len(target_list) == self.closedup_term) and (max([s.close_price for s in sticks]) == sticks[0].close_price)
+        return self._is_highest('highest_in_closedup', sticks, self.closedup_term, self.closedup_window)
 
 class RandomInvestRule(BaseInvestRule):
     setup_rate:    Decimal
@@ -429,10 +513,10 @@ class RandomInvestRule(BaseInvestRule):
     counter:       int
     buy_ratio:     float
 
-    def __init__(self, unit_number:int, losscut_rate:Decimal, tickers:List[str], buy_ratio:Decimal = 0.5):
-        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate)
-        self.setup_rate    = Decimal('0.1')
-        self.closedup_rate = Decimal('0.1')
+    def __init__(self, unit_number:int, losscut_rate:Decimal, tickers:List[str], buy_ratio:Decimal = 0.5, setup_rate:Decimal = Decimal('0.1'), closedup_rate:Decimal = Decimal('0.1'), rng:random.Random = None):
+        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate, rng = rng)
+        self.setup_rate    = setup_rate
+        self.closedup_rate = closedup_rate
         self.tickers       = tickers
         self.target_number = min(unit_number, len(tickers))
         self.targets       = dict()
@@ -448,10 +532,10 @@ class RandomInvestRule(BaseInvestRule):
     def _clear_targets(self):
         self.targets = dict()
         while len(self.targets) < self.target_number: 
-            ticker = self.tickers[int(len(self.tickers)*random.random())]
+            ticker = self.tickers[int(len(self.tickers)*self.rng.random())]
             if ticker in self.targets:
                 continue
-            self.targets[ticker] = PositionType.BUY if random.random() < self.buy_ratio else PositionType.SELL
+            self.targets[ticker] = PositionType.BUY if self.rng.random() < self.buy_ratio else PositionType.SELL
         self.counter = int(0)
 
     def _is_targets(self, ticker:str, position_type:PositionType) -> bool:
@@ -465,44 +549,44 @@ class RandomInvestRule(BaseInvestRule):
         """
         Random. Just under the setup rate.
         """
-        if len(sticks) == 0 or not(self._is_targets(ticker = sticks[0].code, position_type = PositionType.BUY)) or len([c for c in conditions if c.position_type == PositionType.BUY]) > 0: 
+        if len(sticks) == 0 or not(self._is_targets(ticker = sticks[0].code, position_type = PositionType.BUY)) or self._has_position(conditions, PositionType.BUY): 
             # Don't have position, if you already have another LONG position.
             return False
 
-        return random.random() < self.setup_rate
+        return self.rng.random() < self.setup_rate
 
     def reaching_closedup_long(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
         Random. Just under the setup rate.
         """
-        if len([c for c in conditions if c.position_type == PositionType.BUY]) == 0: # Nothing to close up.
+        if not self._has_position(conditions, PositionType.BUY): # Nothing to close up.
             return False
 
-        return random.random() < self.closedup_rate
+        return self.rng.random() < self.closedup_rate
 
     def reaching_have_short(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
         Random. Just under the setup rate.
         """
-        if len(sticks) == 0 or not(self._is_targets(ticker = sticks[0].code, position_type = PositionType.SELL)) or len([c for c in conditions if c.position_type == PositionType.SELL]) > 0: 
+        if len(sticks) == 0 or not(self._is_targets(ticker = sticks[0].code, position_type = PositionType.SELL)) or self._has_position(conditions, PositionType.SELL): 
             # Don't have position, if you already have another SHORT position.
             return False
 
-        return random.random() < self.setup_rate
+        return self.rng.random() < self.setup_rate
 
     def reaching_closedup_short(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
         Random. Just under the setup rate.
         """
-        if len([c for c in conditions if c.position_type == PositionType.SELL]) == 0: # Nothing to close up.
+        if not self._has_position(conditions, PositionType.SELL): # Nothing to close up.
             return False
 
-        return random.random() < self.closedup_rate
+        return self.rng.random() < self.closedup_rate
 
 class RandomLongInvestRule(RandomInvestRule):
 
-    def __init__(self, unit_number:int, losscut_rate:Decimal, tickers:List[str]):
-        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate, tickers = tickers, buy_ratio = 1.0)
+    def __init__(self, unit_number:int, losscut_rate:Decimal, tickers:List[str], setup_rate:Decimal = Decimal('0.1'), closedup_rate:Decimal = Decimal('0.1'), rng:random.Random = None):
+        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate, tickers = tickers, buy_ratio = 1.0, setup_rate = setup_rate, closedup_rate = closedup_rate, rng = rng)
 
     def reaching_have_short(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
@@ -518,8 +602,8 @@ class RandomLongInvestRule(RandomInvestRule):
 
 class BaseTrailInvestRule(BaseInvestRule):
 
-    def __init__(self, unit_number:int, losscut_rate:Decimal):
-        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate)
+    def __init__(self, unit_number:int, losscut_rate:Decimal, rng:random.Random = None):
+        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate, rng = rng)
 
     @abstractmethod
     def required_number_of_histrical_data(self) -> int:
@@ -560,9 +644,9 @@ class BaseTrailInvestRule(BaseInvestRule):
 class RandomTrailLongInvestRule(BaseTrailInvestRule):
     random_rule: RandomInvestRule
 
-    def __init__(self, unit_number:int, losscut_rate:Decimal, tickers:List[str]):
-        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate)
-        self.random_rule = RandomInvestRule(unit_number = unit_number, losscut_rate = losscut_rate, tickers = tickers, buy_ratio = 1.0)
+    def __init__(self, unit_number:int, losscut_rate:Decimal, tickers:List[str], setup_rate:Decimal = Decimal('0.1'), rng:random.Random = None):
+        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate, rng = rng)
+        self.random_rule = RandomInvestRule(unit_number = unit_number, losscut_rate = losscut_rate, tickers = tickers, buy_ratio = 1.0, setup_rate = setup_rate, rng = rng)
 
     def required_number_of_histrical_data(self) -> int:
         """
@@ -599,30 +683,39 @@ class GoldenTrailLongInvestRule(BaseTrailInvestRule):
     short_sma_term: int
     setup_rate:     Decimal
 
-    def __init__(self, unit_number:int, losscut_rate:Decimal):
-        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate)
-        self.long_sma_term  = int(25)
-        self.short_sma_term = int(5)
-        self.setup_rate     = Decimal('0.1')
+    def __init__(self, unit_number:int, losscut_rate:Decimal, long_sma_term:int = 25, short_sma_term:int = 5, setup_rate:Decimal = Decimal('0.1'), rng:random.Random = None):
+        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate, rng = rng)
+        self.long_sma_term  = long_sma_term
+        self.short_sma_term = short_sma_term
+        self.setup_rate     = setup_rate
 
     def required_number_of_histrical_data(self) -> int:
         """
         Required number of histrical data.
         """
-        return self.long_sma_term + 1
+        return max(self.long_sma_term, self.short_sma_term) + 1
+
+    def signal_expressions(self) -> Dict[str,Callable[[IndicatorCache,str],List[bool]]]:
+        return {'golden_cross': lambda cache, ticker: cache.crossed_over(ticker, 'close_price', self.short_sma_term, self.long_sma_term)}
 
     def reaching_have_long(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
         Under the Golden Cross.
         """
-        if len([c for c in conditions if c.position_type == PositionType.BUY]) > 0: 
+        if self._has_position(conditions, PositionType.BUY): 
             # Don't have position, if you already have another LONG position.
             return False
 
-        previous_statistics = Statistics(values = [s.close_price for s in sticks[1:]])
-        current_statistics  = Statistics(values = [s.close_price for s in sticks])
+        if len(sticks) < self.required_number_of_histrical_data():
+            return False
 
-        return previous_statistics.sma(25) > previous_statistics.sma(5) and current_statistics.sma(25) <= current_statistics.sma(5) and random.random() < self.setup_rate
+        signal = self._signal('golden_cross', sticks)
+        if signal is None:
+            previous_statistics = Statistics(values = [s.close_price for s in sticks[1:]])
+            current_statistics  = Statistics(values = [s.close_price for s in sticks])
+            signal = previous_statistics.sma(self.long_sma_term)[0] > previous_statistics.sma(self.short_sma_term)[0] and current_statistics.sma(self.long_sma_term)[0] <= current_statistics.sma(self.short_sma_term)[0]
+
+        return signal and self.rng.random() < self.setup_rate
 
     def reaching_closedup_long(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
@@ -647,11 +740,11 @@ class SerialStepupTrailLongInvestRule(BaseTrailInvestRule):
     number:     int
     setup_rate: Decimal
 
-    def __init__(self, unit_number:int, losscut_rate:Decimal):
-        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate)
-        self.term       = int(3)
-        self.number     = int(3)
-        self.setup_rate = Decimal('0.1')
+    def __init__(self, unit_number:int, losscut_rate:Decimal, term:int = 3, number:int = 3, setup_rate:Decimal = Decimal('0.1'), rng:random.Random = None):
+        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate, rng = rng)
+        self.term       = term
+        self.number     = number
+        self.setup_rate = setup_rate
 
     def required_number_of_histrical_data(self) -> int:
         """
@@ -659,25 +752,31 @@ class SerialStepupTrailLongInvestRule(BaseTrailInvestRule):
         """
         return self.term * self.number
 
+    def signal_expressions(self) -> Dict[str,Callable[[IndicatorCache,str],List[bool]]]:
+        return {'stepped_up': lambda cache, ticker: cache.stepped_up(ticker, self.term, self.number)}
+
     def reaching_have_long(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
         Under the Golden Cross.
         """
-        if len([c for c in conditions if c.position_type == PositionType.BUY]) > 0: 
+        if self._has_position(conditions, PositionType.BUY): 
             # Don't have position, if you already have another LONG position.
             return False
 
         if len(sticks) != self.required_number_of_histrical_data():
             return False
 
-        ath_of_high = []
-        atl_of_low  = []
-        for index in range(self.number):
-            window = sticks[(self.number - index - 1)*self.term:(self.number - index)*self.term]
-            ath_of_high.append(max([s.high_price for s in window]))
-            atl_of_low.append(min([s.low_price for s in window]))
+        signal = self._signal('stepped_up', sticks)
+        if signal is None:
+            ath_of_high = []
+            atl_of_low  = []
+            for index in range(self.number):
+                window = sticks[(self.number - index - 1)*self.term:(self.number - index)*self.term]
+                ath_of_high.append(max([s.high_price for s in window]))
+                atl_of_low.append(min([s.low_price for s in window]))
+            signal = all([a < b for (a, b) in list(zip(ath_of_high[0:-1], ath_of_high[1:]))]) and all([a < b for (a, b) in list(zip(atl_of_low[0:-1], atl_of_low[1:]))])
 
-        return all([a < b for (a, b) in list(zip(ath_of_high[0:-1], ath_of_high[1:]))]) and all([a < b for (a, b) in list(zip(atl_of_low[0:-1], atl_of_low[1:]))]) and random.random() < self.setup_rate
+        return signal and self.rng.random() < self.setup_rate
 
     def reaching_closedup_long(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
@@ -702,17 +801,17 @@ class BuyholdInvestRule(BaseInvestRule):
     exec_indexes:  Dict[str,int]
     counters:      Dict[str,int]
 
-    def __init__(self, unit_number:int, losscut_rate:Decimal, stick_numbers:Dict[str,int]):
-        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate)
+    def __init__(self, unit_number:int, losscut_rate:Decimal, stick_numbers:Dict[str,int], rng:random.Random = None):
+        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate, rng = rng)
         self.stick_numbers = stick_numbers
 
         self.exec_indexes = {}
         self.counters = {}
         while len(self.exec_indexes.keys()) < min(unit_number, len(stick_numbers.keys())):
-            target_num = int(len(stick_numbers.keys()) * random.random())
+            target_num = int(len(stick_numbers.keys()) * self.rng.random())
             for (index, (ticker, numbers)) in enumerate(stick_numbers.items()):
                 if index == target_num and not (ticker in self.exec_indexes):
-                    self.exec_indexes[ticker] = int(numbers * random.random())
+                    self.exec_indexes[ticker] = int(numbers * self.rng.random())
                     self.counters[ticker]     = int(0)
 
     def required_number_of_histrical_data(self) -> int:
@@ -725,7 +824,7 @@ class BuyholdInvestRule(BaseInvestRule):
         """
         Newest close price is ATH in the recent 20 day.
         """
-        if len([c for c in conditions if c.position_type == PositionType.BUY]) > 0: 
+        if self._has_position(conditions, PositionType.BUY): 
             # Don't have position, if you already have another LONG position.
             return False
 
@@ -760,8 +859,8 @@ class BuyholdInvestRule(BaseInvestRule):
 
 class TripleStepupTrailLongInvestRule(SerialStepupTrailLongInvestRule):
 
-    def __init__(self, unit_number:int, losscut_rate:Decimal):
-        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate)
+    def __init__(self, unit_number:int, losscut_rate:Decimal, term:int = 3, number:int = 3, setup_rate:Decimal = Decimal('0.1'), rng:random.Random = None):
+        super().__init__(unit_number = unit_number, losscut_rate = losscut_rate, term = term, number = number, setup_rate = setup_rate, rng = rng)
 
     def reaching_have_long(self, sticks: List[Candlestick], conditions: List[InvestCondition]) -> bool:
         """
@@ -769,11 +868,18 @@ class TripleStepupTrailLongInvestRule(SerialStepupTrailLongInvestRule):
         """
         result = super().reaching_have_long(sticks = sticks, conditions = conditions) # This inherits randomness.
 
-        volumes  = []
-        for index in range(self.number):
-            window = sticks[(self.number - index - 1)*self.term:(self.number - index)*self.term]
-            volumes.append([s.volume for s in window])
+        signal = self._signal('stepped_up_volumes', sticks)
+        if signal is None:
+            volumes  = []
+            for index in range(self.number):
+                window = sticks[(self.number - index - 1)*self.term:(self.number - index)*self.term]
+                volumes.append([s.volume for s in window])
+            signal = all([a < b for (a, b) in list(zip(volumes[0:-1], volumes[1:]))])
 
-        result &=  all([a < b for (a, b) in list(zip(volumes[0:-1], volumes[1:]))])
-        return result
+        return result and signal
+
+    def signal_expressions(self) -> Dict[str,Callable[[IndicatorCache,str],List[bool]]]:
+        expressions = super().signal_expressions()
+        expressions['stepped_up_volumes'] = lambda cache, ticker: cache.stepped_up_volumes(ticker, self.term, self.number)
+        return expressions
 
@@ -0,0 +1,141 @@
+from __future__ import annotations
+from abc import ABCMeta, abstractmethod
+from decimal import Decimal
+from enum import IntEnum, auto
+from typing import Any, ClassVar, List
+
+import numpy as np
+
+from app.domain.statistics import Statistics, ArrayStatistics
+
+class NumericBackendType(IntEnum):
+    DECIMAL: ClassVar[int] = auto()
+    FLOAT:   ClassVar[int] = auto()
+
+# ---------------------------------------------------------------------------------
+# Number type of the analytics. The values are converted by number() on the way in,
+# and back to Decimal by exact() on the way out, so the callers always see Decimal.
+# Money (cash, prices of the positions, commissions) never goes through the backend.
+# ---------------------------------------------------------------------------------
+class NumericBackend(metaclass=ABCMeta):
+    # The values can stay in the float arrays of CandlestickSeries.
+    vectorized: ClassVar[bool] = False
+
+    @abstractmethod
+    def number(self, value:Any) -> Any:
+        """
+        value:  Decimal or int
+        return (number: Any) the number of the backend.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def exact(self, value:Any) -> Decimal:
+        """
+        value:  Any the number of the backend.
+        return (value: Decimal)
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def array(self, values:List) -> np.ndarray:
+        """
+        values: List the numbers of the backend, or None.
+        return (array: np.ndarray) to compare the values at once. None is never equal to, greater or less than any value.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def sma(self, values:List, term:int) -> List:
+        raise NotImplementedError
+
+    @abstractmethod
+    def wma(self, values:List, term:int) -> List:
+        raise NotImplementedError
+
+    @abstractmethod
+    def ema(self, values:List, term:int) -> List:
+        raise NotImplementedError
+
+    @abstractmethod
+    def standard_deviation(self, values:List) -> Any:
+        raise NotImplementedError
+
+    def numbers(self, values:List) -> List:
+        return [self.number(value) for value in values]
+
+    def exacts(self, values:List) -> List[Decimal]:
+        return [self.exact(value) for value in values]
+
+# Exact, same as the Decimal arithmetic everywhere else. The values are kept as they are.
+class DecimalNumericBackend(NumericBackend):
+    def number(self, value:Any) -> Any:
+        return value
+
+    def numbers(self, values:List) -> List:
+        return list(values)
+
+    def exact(self, value:Any) -> Decimal:
+        return value
+
+    def array(self, values:List) -> np.ndarray:
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+    def sma(self, values:List, term:int) -> List[Decimal]:
+        return Statistics(values = values).sma(term = term)
+
+    def wma(self, values:List, term:int) -> List[Decimal]:
+        return Statistics(values = values).wma(term = term)
+
+    def ema(self, values:List, term:int) -> List[Decimal]:
+        return Statistics(values = values).ema(term = term)
+
+    def standard_deviation(self, values:List) -> Decimal:
+        return Statistics(values = values).standard_deviation()
+
+# Float64 on numpy. About 15 significant digits, which is enough to screen and rank.
+class FloatNumericBackend(NumericBackend):
+    vectorized: ClassVar[bool] = True
+
+    def number(self, value:Any) -> float:
+        return float(value)
+
+    def exact(self, value:Any) -> Decimal:
+        return Decimal(repr(float(value)))
+
+    def numbers(self, values:List) -> List[float]:
+        return np.asarray(values, dtype=np.float64).tolist()
+
+    def exacts(self, values:List) -> List[Decimal]:
+        return [Decimal(repr(value)) for value in values]
+
+    def array(self, values:List) -> np.ndarray:
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+    def sma(self, values:List, term:int) -> List[float]:
+        return ArrayStatistics(values = np.asarray(values, dtype=np.float64)).sma(term = term).tolist()
+
+    def wma(self, values:List, term:int) -> List[float]:
+        return ArrayStatistics(values = np.asarray(values, dtype=np.float64)).wma(term = term).tolist()
+
+    def ema(self, values:List, term:int) -> List[float]:
+        # The recurrence runs on Python floats, which is faster than indexing a 1-D array.
+        if len(values) < term:
+            return []
+        alpha  = 2.0/(term + 1)
+        last   = sum(values[0:term])/term
+        result = [last]
+        for value in values[term:]:
+            last = last + alpha*(value - last)
+            result.append(last)
+        return result
+
+    def standard_deviation(self, values:List) -> float:
+        return float(ArrayStatistics(values = np.asarray(values, dtype=np.float64)).standard_deviation())
+
+def make_numeric_backend(backend_type:NumericBackendType) -> NumericBackend:
+    if backend_type == NumericBackendType.FLOAT:
+        return FloatNumericBackend()
+    return DecimalNumericBackend()
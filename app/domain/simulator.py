@@ -1,10 +1,21 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import date
 from decimal import Decimal
-from typing import ClassVar, List, Dict
+from typing import Any, ClassVar, List, Dict
 
 from app.domain.stock import Candlestick
 from app.domain.invest import PositionType, InvestCondition, InvestRule, TurtleInvestRule, History, Commission
+from app.domain.indicator import IndicatorCache
+
+@dataclass
+class TickerReport:
+    trade_number:  int
+    win_number:    int
+    lose_number:   int
+    profit:        Decimal
+    commission:    Decimal
+    exposure_rate: Decimal
 
 @dataclass
 class SimulationReport:
@@ -18,35 +29,325 @@ class SimulationReport:
     histories:         Dict[str,List[History]]
     positions:         Dict[str,List[InvestCondition]]
     commission:        Decimal
+    max_drawdown:      Decimal = Decimal('0')
+    exposure_rate:     Decimal = Decimal('0')
+    sharpe_ratio:      Decimal = Decimal('0')
+    sortino_ratio:     Decimal = Decimal('0')
+    tickers:           Dict[str,TickerReport] = field(default_factory=dict)
+
+# ---------------------------------------------------------------------------------
+# Distribution of the reports of the repeated simulation.
+# ---------------------------------------------------------------------------------
+@dataclass
+class SimulationDistribution:
+    number:        int
+    probabilities: List[Decimal]
+    valuations:    List[Decimal]
+    win_rates:     List[Decimal]
+    payoff_ratios: List[Decimal]
+
+    @classmethod
+    def from_reports(cls, reports:List[SimulationReport], probabilities:List[Decimal]) -> SimulationDistribution:
+        return cls(
+                number        = len(reports),
+                probabilities = probabilities,
+                valuations    = cls.quantiles([r.current_valuation for r in reports], probabilities),
+                win_rates     = cls.quantiles([r.win_rate for r in reports], probabilities),
+                payoff_ratios = cls.quantiles([r.payoff_ratio for r in reports], probabilities)
+                )
+
+    @staticmethod
+    def quantiles(values:List[Decimal], probabilities:List[Decimal]) -> List[Decimal]:
+        """
+        Linear interpolation between the closest ranks.
+        """
+        if len(values) == 0:
+            return [Decimal('0') for _ in probabilities]
+
+        ordered = sorted(values)
+        result  = list()
+        for p in probabilities:
+            position = (len(ordered) - 1) * Decimal(p)
+            lower    = int(position)
+            upper    = min(lower + 1, len(ordered) - 1)
+            result.append(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower))
+        return result
+
+# ---------------------------------------------------------------------------------
+# Mean of the reports of the simulation with one combination of the parameters.
+# ---------------------------------------------------------------------------------
+@dataclass
+class SweepResult:
+    parameters:   Dict[str,Any]
+    number:       int
+    valuation:    Decimal
+    win_rate:     Decimal
+    payoff_ratio: Decimal
+    commission:   Decimal
+
+    @classmethod
+    def from_reports(cls, parameters:Dict[str,Any], reports:List[SimulationReport]) -> SweepResult:
+        number = Decimal(max(len(reports), 1))
+        return cls(
+                parameters   = parameters,
+                number       = len(reports),
+                valuation    = sum([r.current_valuation for r in reports], Decimal('0')) / number,
+                win_rate     = sum([r.win_rate for r in reports], Decimal('0')) / number,
+                payoff_ratio = sum([r.payoff_ratio for r in reports], Decimal('0')) / number,
+                commission   = sum([r.commission for r in reports], Decimal('0')) / number
+                )
+
+# ---------------------------------------------------------------------------------
+# Report of one window of the walk-forward simulation, and the summary of all windows.
+# ---------------------------------------------------------------------------------
+@dataclass
+class WalkForwardWindow:
+    index:      int
+    first_date: date
+    last_date:  date
+    report:     SimulationReport
+
+@dataclass
+class WalkForwardSummary:
+    number:          int
+    profitable_rate: Decimal
+    mean_return:     Decimal
+    mean_win_rate:   Decimal
+    mean_sharpe:     Decimal
+    worst_drawdown:  Decimal
+
+    @classmethod
+    def from_reports(cls, reports:List[SimulationReport]) -> WalkForwardSummary:
+        number  = Decimal(max(len(reports), 1))
+        returns = [Decimal('0') if r.principal == 0 else r.current_valuation/r.principal - 1 for r in reports]
+        return cls(
+                number          = len(reports),
+                profitable_rate = Decimal(len([r for r in returns if r > 0])) / number,
+                mean_return     = sum(returns, Decimal('0')) / number,
+                mean_win_rate   = sum([r.win_rate for r in reports], Decimal('0')) / number,
+                mean_sharpe     = sum([r.sharpe_ratio for r in reports], Decimal('0')) / number,
+                worst_drawdown  = max([r.max_drawdown for r in reports], default = Decimal('0'))
+                )
+
+# ---------------------------------------------------------------------------------
+# Open positions by ticker with the running aggregates over all tickers.
+# The aggregates are updated on each open and close, not recounted.
+# ---------------------------------------------------------------------------------
+class PositionBook:
+    positions:    Dict[str,List[InvestCondition]]
+    numbers:      Dict[PositionType,int]
+    amounts:      Dict[PositionType,Decimal]
+    volumes:      Dict[str,int]
+
+    def __init__(self, tickers:List[str]):
+        self.positions = {ticker: list() for ticker in tickers}
+        self.numbers   = {PositionType.BUY: 0, PositionType.SELL: 0}
+        self.amounts   = {PositionType.BUY: Decimal('0'), PositionType.SELL: Decimal('0')}
+        self.volumes   = {ticker: 0 for ticker in tickers}
+
+    def opened(self, ticker:str, condition:InvestCondition):
+        self.numbers[condition.position_type] += 1
+        self.amounts[condition.position_type] += condition.price * condition.volume
+        self.volumes[ticker] += condition.volume if condition.position_type == PositionType.BUY else -condition.volume
+
+    def closed(self, ticker:str, histories:List[History]):
+        for h in histories:
+            self.numbers[h.position_type] -= 1
+            self.amounts[h.position_type] -= h.open_price * h.volume
+            self.volumes[ticker] -= h.volume if h.position_type == PositionType.BUY else -h.volume
+
+    def exposed(self) -> bool:
+        return self.numbers[PositionType.BUY] + self.numbers[PositionType.SELL] > 0
+
+    def long_number(self) -> int:
+        return self.numbers[PositionType.BUY]
+
+    def short_number(self) -> int:
+        return self.numbers[PositionType.SELL]
+
+    def long_amount(self) -> Decimal:
+        return self.amounts[PositionType.BUY]
+
+    def short_amount(self) -> Decimal:
+        return self.amounts[PositionType.SELL]
+
+# ---------------------------------------------------------------------------------
+# Summary of the simulation in one pass over the histories, the positions and the
+# valuations of each day. History.profit() and the commission are computed once per
+# history.
+# ---------------------------------------------------------------------------------
+class ReportBuilder:
+    TRADING_DAYS: ClassVar[int] = 252
 
-class InvestSimulator:
     principal:  Decimal
-    rule:       InvestRule
     commission: Commission
-    sticks:     Dict[str,List[Candlestick]]
-    cash:       Decimal
-    conditions: Dict[str,List[InvestCondition]]
-    histories:  Dict[str,List[History]]
-
-    def __init__(self, rule:InvestRule, sticks:Dict[str,List[Candlestick]], cash:Decimal, commission:Commission):
-        self.rule       = rule
-        self.sticks     = sticks
-        self.cash       = cash
-        self.principal  = cash
-        self.conditions = {}
-        self.histories  = {}
+
+    def __init__(self, principal:Decimal, commission:Commission):
+        self.principal  = principal
         self.commission = commission
 
+    def build(self, cash:Decimal, histories:Dict[str,List[History]], positions:Dict[str,List[InvestCondition]], sticks:Dict[str,Candlestick], valuations:List[Decimal], exposed_number:int = 0, exposures:Dict[str,int] = None, steps:Dict[str,int] = None) -> SimulationReport:
+        """
+        cash:           Decimal
+        histories:      Dict[str,List[History]]
+        positions:      Dict[str,List[InvestCondition]]
+        sticks:         Dict[str,Candlestick] the latest candlestick of each ticker.
+        valuations:     List[Decimal] the valuation at the start and after each day.
+        exposed_number: int the number of days with any open position.
+        exposures:      Dict[str,int] the number of days with an open position of each ticker.
+        steps:          Dict[str,int] the number of days simulated of each ticker.
+        return (report: SimulationReport)
+        """
+        exposures = {} if exposures is None else exposures
+        steps     = {} if steps is None else steps
+
+        tickers     = {}
+        profit_sum  = loss_sum = commission = Decimal('0')
+        win_number  = lose_number = 0
+        for (ticker, ticker_histories) in histories.items():
+            t = TickerReport(
+                    trade_number  = len(ticker_histories),
+                    win_number    = 0,
+                    lose_number   = 0,
+                    profit        = Decimal('0'),
+                    commission    = Decimal('0'),
+                    exposure_rate = self.rate(exposures.get(ticker, 0), steps.get(ticker, 0))
+                    )
+            for h in ticker_histories:
+                profit = h.profit()
+                if profit > 0:
+                    t.win_number += 1
+                    profit_sum   += profit
+                elif profit < 0:
+                    t.lose_number += 1
+                    loss_sum      += profit
+                t.profit     += profit
+                t.commission += self.commission.amount(delivery_price = h.open_price*h.volume) + self.commission.amount(delivery_price = h.close_price*h.volume)
+
+            win_number  += t.win_number
+            lose_number += t.lose_number
+            commission  += t.commission
+            tickers[ticker] = t
+
+        long_value = short_value = Decimal('0')
+        for (ticker, conditions) in positions.items():
+            for c in conditions:
+                if c.position_type == PositionType.BUY:
+                    long_value  += sticks[ticker].close_price * c.volume
+                else:
+                    short_value += sticks[ticker].close_price * c.volume
+                amount      = self.commission.amount(delivery_price = c.price*c.volume)
+                commission += amount
+                if ticker in tickers:
+                    tickers[ticker].commission += amount
+
+        mean_profit = Decimal('0') if win_number == 0 else profit_sum/Decimal(win_number)
+        mean_loss   = Decimal('0') if lose_number == 0 else loss_sum/Decimal(lose_number)
+        (max_drawdown, sharpe_ratio, sortino_ratio) = self.risk(valuations)
+
+        return SimulationReport(
+                principal         = self.principal,
+                current_valuation = cash + long_value - short_value,
+                mean_profit       = mean_profit,
+                mean_loss         = mean_loss,
+                win_rate          = self.rate(win_number, win_number + lose_number),
+                lose_rate         = self.rate(lose_number, win_number + lose_number),
+                payoff_ratio      = Decimal('0') if mean_loss == Decimal('0') else mean_profit/abs(mean_loss),
+                histories         = histories,
+                positions         = positions,
+                commission        = commission,
+                max_drawdown      = max_drawdown,
+                exposure_rate     = self.rate(exposed_number, len(valuations) - 1),
+                sharpe_ratio      = sharpe_ratio,
+                sortino_ratio     = sortino_ratio,
+                tickers           = tickers
+                )
+
+    def risk(self, valuations:List[Decimal]) -> (Decimal, Decimal, Decimal):
+        """
+        valuations: List[Decimal]
+        return (max_drawdown: Decimal, sharpe_ratio: Decimal, sortino_ratio: Decimal) the ratios of the daily returns, annualized.
+        """
+        max_drawdown = Decimal('0')
+        returns      = list()
+        peak         = previous = None
+        for v in valuations:
+            peak = v if peak is None else max(peak, v)
+            if peak > 0:
+                max_drawdown = max(max_drawdown, (peak - v)/peak)
+            if previous is not None and previous != 0:
+                returns.append(v/previous - 1)
+            previous = v
+
+        if len(returns) == 0:
+            return (max_drawdown, Decimal('0'), Decimal('0'))
+
+        number    = Decimal(len(returns))
+        mean      = sum(returns, Decimal('0'))/number
+        deviation = (sum([(r - mean)**2 for r in returns], Decimal('0'))/number).sqrt()
+        downside  = (sum([r**2 for r in returns if r < 0], Decimal('0'))/number).sqrt()
+        annual    = Decimal(self.TRADING_DAYS).sqrt()
+
+        return (
+                max_drawdown,
+                Decimal('0') if deviation == 0 else mean/deviation*annual,
+                Decimal('0') if downside == 0 else mean/downside*annual
+                )
+
+    @staticmethod
+    def rate(number:int, total:int) -> Decimal:
+        return Decimal('0') if total == 0 else Decimal(number)/Decimal(total)
+
+class InvestSimulator:
+    principal:      Decimal
+    rule:           InvestRule
+    commission:     Commission
+    sticks:         Dict[str,List[Candlestick]]
+    cash:           Decimal
+    conditions:     Dict[str,List[InvestCondition]]
+    histories:      Dict[str,List[History]]
+    cache:          IndicatorCache
+    valuations:     List[Decimal]
+    exposed_number: int
+    exposures:      Dict[str,int]
+    steps:          Dict[str,int]
+
+    def __init__(self, rule:InvestRule, sticks:Dict[str,List[Candlestick]], cash:Decimal, commission:Commission, cache:IndicatorCache = None):
+        self.rule           = rule
+        self.sticks         = sticks
+        self.cash           = cash
+        self.principal      = cash
+        self.conditions     = {}
+        self.histories      = {}
+        self.commission     = commission
+        self.cache          = IndicatorCache(sticks) if cache is None else cache
+        self.valuations     = []
+        self.exposed_number = 0
+        self.exposures      = {}
+        self.steps          = {}
+
     def simulate(self):
         required_list_number = self.rule.required_number_of_histrical_data()
         previous_target_sticks = {}
 
-        for ticker in self.sticks.keys():
-            self.conditions[ticker]        = list()
+        self.rule.prepare(self.cache)
+
+        book = PositionBook(tickers = list(self.sticks.keys()))
+        self.conditions = book.positions
+
+        # Market value of the open positions of each ticker at its latest close price.
+        marks        = {}
+        market_value = Decimal('0')
+        for (ticker, sticks) in self.sticks.items():
             self.histories[ticker]         = list()
+            self.exposures[ticker]         = 0
+            self.steps[ticker]             = 0
+            marks[ticker]                  = Decimal('0')
             previous_target_sticks[ticker] = list()
 
         max_sticks = max([len(s) for s in self.sticks.values()])
+        self.valuations     = [self.cash]
+        self.exposed_number = 0
 
         for i in range(max_sticks):
             for (ticker, sticks) in self.sticks.items():
@@ -55,33 +356,56 @@ class InvestSimulator:
                     continue
 
                 target_sticks = sticks[start_index:start_index + required_list_number]
-                unit = self.rule.exposure_unit(
-                        conditions = [c for conditions in self.conditions.values() for c in conditions],
-                        cash       = self.cash
+                conditions    = book.positions[ticker]
+                unit = self.rule.exposure_unit_by_aggregate(
+                        long_number  = book.long_number(),
+                        short_amount = book.short_amount(),
+                        cash         = self.cash
                         )
 
-                (_, histories, self.cash) = self.rule.losscut_long(target_sticks, self.conditions[ticker], self.cash)
+                (_, histories, self.cash) = self.rule.losscut_long(target_sticks, conditions, self.cash)
                 self.histories[ticker].extend(histories)
+                book.closed(ticker, histories)
 
-                (_, histories, self.cash) = self.rule.losscut_short(target_sticks, self.conditions[ticker], self.cash)
+                (_, histories, self.cash) = self.rule.losscut_short(target_sticks, conditions, self.cash)
                 self.histories[ticker].extend(histories)
+                book.closed(ticker, histories)
 
-                if self.rule.reaching_have_long(previous_target_sticks[ticker], self.conditions[ticker]):
-                    (_, self.cash) = self.rule.have_long(target_sticks, self.conditions[ticker], self.cash, unit)
+                if self.rule.reaching_have_long(previous_target_sticks[ticker], conditions):
+                    (ok, self.cash) = self.rule.have_long(target_sticks, conditions, self.cash, unit)
+                    if ok:
+                        book.opened(ticker, conditions[-1])
 
-                if self.rule.reaching_have_short(previous_target_sticks[ticker], self.conditions[ticker]):
-                    (_, self.cash) = self.rule.have_short(target_sticks, self.conditions[ticker], self.cash, unit)
+                if self.rule.reaching_have_short(previous_target_sticks[ticker], conditions):
+                    (ok, self.cash) = self.rule.have_short(target_sticks, conditions, self.cash, unit)
+                    if ok:
+                        book.opened(ticker, conditions[-1])
 
-                if self.rule.reaching_closedup_long(previous_target_sticks[ticker], self.conditions[ticker]):
-                    (_, histories, self.cash) = self.rule.closedup_long(target_sticks, self.conditions[ticker], self.cash)
+                if self.rule.reaching_closedup_long(previous_target_sticks[ticker], conditions):
+                    (_, histories, self.cash) = self.rule.closedup_long(target_sticks, conditions, self.cash)
                     self.histories[ticker].extend(histories)
+                    book.closed(ticker, histories)
 
-                if self.rule.reaching_closedup_short(previous_target_sticks[ticker], self.conditions[ticker]):
-                    (_, histories, self.cash) = self.rule.closedup_short(target_sticks, self.conditions[ticker], self.cash)
+                if self.rule.reaching_closedup_short(previous_target_sticks[ticker], conditions):
+                    (_, histories, self.cash) = self.rule.closedup_short(target_sticks, conditions, self.cash)
                     self.histories[ticker].extend(histories)
+                    book.closed(ticker, histories)
+
+                self.steps[ticker] += 1
+                if len(conditions) > 0:
+                    self.exposures[ticker] += 1
+                volume = book.volumes[ticker]
+                if volume != 0 or marks[ticker] != 0:
+                    mark          = target_sticks[0].close_price * volume
+                    market_value += mark - marks[ticker]
+                    marks[ticker] = mark
 
                 previous_target_sticks[ticker] = target_sticks
 
+            self.valuations.append(self.cash + market_value)
+            if book.exposed():
+                self.exposed_number += 1
+
     def evaluate(self, sticks: Dict[str,Candlestick]) -> Decimal:
         long_value = short_value = Decimal('0')
         for (k, s) in sticks.items(): 
@@ -90,50 +414,14 @@ class InvestSimulator:
 
         return self.cash + long_value - short_value
 
-    def mean_profit(self) -> Decimal:
-        profit_list = [h.profit() for histories in self.histories.values() for h in histories if h.profit() > 0]
-        return Decimal('0') if len(profit_list) == 0 else sum(profit_list)/Decimal(len(profit_list))
-
-    def mean_loss(self) -> Decimal:
-        loss_list = [h.profit() for histories in self.histories.values() for h in histories if h.profit() < 0]
-        return Decimal('0') if len(loss_list) == 0 else sum(loss_list)/Decimal(len(loss_list))
-
-    def payoff_ratio(self) -> Decimal:
-        return Decimal('0') if self.mean_loss() == Decimal('0') else self.mean_profit()/abs(self.mean_loss())
-
-    def win_rate(self) -> Decimal:
-        profit_list = [h.profit() for histories in self.histories.values() for h in histories if h.profit() > 0]
-        loss_list = [h.profit() for histories in self.histories.values() for h in histories if h.profit() < 0]
-        return Decimal('0') if len(profit_list)+len(loss_list) == 0 else Decimal(len(profit_list))/Decimal(len(profit_list)+len(loss_list))
-
-    def lose_rate(self) -> Decimal:
-        profit_list = [h.profit() for histories in self.histories.values() for h in histories if h.profit() > 0]
-        loss_list = [h.profit() for histories in self.histories.values() for h in histories if h.profit() < 0]
-        return Decimal('0') if len(profit_list)+len(loss_list) == 0 else Decimal(len(loss_list))/Decimal(len(profit_list)+len(loss_list))
-
-    def commission_amount(self) -> Decimal:
-        past_open  = sum([self.commission.amount(
-            delivery_price = h.open_price*h.volume) for histories in self.histories.values() for h in histories]
-            )
-        past_close = sum([self.commission.amount(
-            delivery_price = h.close_price*h.volume) for histories in self.histories.values() for h in histories]
-            )
-        current_open = sum([self.commission.amount(
-            delivery_price = c.price*c.volume) for conditions in self.conditions.values() for c in conditions]
-            )
-
-        return past_open + past_close + current_open
-
     def report(self, sticks: Dict[str,Candlestick]) -> SimulationReport:
-        return SimulationReport(
-                principal         = self.principal,
-                current_valuation = self.evaluate(sticks = sticks),
-                mean_profit       = self.mean_profit(),
-                mean_loss         = self.mean_loss(),
-                win_rate          = self.win_rate(),
-                lose_rate         = self.lose_rate(),
-                payoff_ratio      = self.payoff_ratio(),
-                histories         = self.histories,
-                positions         = self.conditions,
-                commission        = self.commission_amount()
+        return ReportBuilder(principal = self.principal, commission = self.commission).build(
+                cash           = self.cash,
+                histories      = self.histories,
+                positions      = self.conditions,
+                sticks         = sticks,
+                valuations     = self.valuations,
+                exposed_number = self.exposed_number,
+                exposures      = self.exposures,
+                steps          = self.steps
                 )
@@ -1,6 +1,9 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from decimal import Decimal
+from typing import List
+
+import numpy as np
 
 @dataclass
 class EnvelopeData:
@@ -18,11 +21,12 @@ class Statistics:
         if len(self.values) < term:
             return result
 
-        for i in range(len(self.values)-term+1):
-            value = Decimal('0')
-            for j in range(term):
-                value = value + self.values[i + j]/term
-            result.append(value)
+        # Running sum keeps exact Decimal arithmetic in O(n).
+        window = sum(self.values[0:term], Decimal('0'))
+        result.append(window/term)
+        for i in range(term, len(self.values)):
+            window = window + self.values[i] - self.values[i - term]
+            result.append(window/term)
         
         return result
 
@@ -32,11 +36,15 @@ class Statistics:
         if len(self.values) < term:
             return result
 
-        for i in range(len(self.values)-term+1):
-            value = Decimal('0')
-            for j in range(term):
-                value = value + self.values[i + j]*(j + 1)
-            result.append(value/sum(range(1, term+1)))
+        # Sliding by one decreases every weight by one and adds the new value with weight `term`.
+        divisor  = sum(range(1, term+1))
+        window   = sum(self.values[0:term], Decimal('0'))
+        weighted = sum([value*(j + 1) for (j, value) in enumerate(self.values[0:term])], Decimal('0'))
+        result.append(weighted/divisor)
+        for i in range(term, len(self.values)):
+            weighted = weighted - window + self.values[i]*term
+            window   = window + self.values[i] - self.values[i - term]
+            result.append(weighted/divisor)
         
         return result
 
@@ -72,3 +80,44 @@ class Statistics:
 
     def standard_deviation(self) -> Decimal:
         return self.variance()**Decimal('0.5')
+
+# Float64 version of Statistics. 2-D values are treated as rows of tickers and calculated at once along the last axis.
+@dataclass
+class ArrayStatistics:
+    values: np.ndarray
+
+    def sma(self, term:int) -> np.ndarray:
+        values = np.asarray(self.values, dtype=np.float64)
+        if values.shape[-1] < term:
+            return values[..., 0:0]
+
+        cumsum = np.cumsum(values, axis=-1)
+        cumsum = np.concatenate([np.zeros(values.shape[:-1] + (1,)), cumsum], axis=-1)
+        return (cumsum[..., term:] - cumsum[..., :-term])/term
+
+    def wma(self, term:int) -> np.ndarray:
+        values = np.asarray(self.values, dtype=np.float64)
+        if values.shape[-1] < term:
+            return values[..., 0:0]
+
+        weights = np.arange(1, term + 1, dtype=np.float64)
+        return np.lib.stride_tricks.sliding_window_view(values, term, axis=-1) @ weights / weights.sum()
+
+    def ema(self, term:int) -> np.ndarray:
+        values = np.asarray(self.values, dtype=np.float64)
+        if values.shape[-1] < term:
+            return values[..., 0:0]
+
+        alpha  = 2.0/(term + 1)
+        result = np.empty(values.shape[:-1] + (values.shape[-1] - term + 1,))
+        result[..., 0] = values[..., 0:term].mean(axis=-1)
+        for i in range(1, result.shape[-1]):
+            result[..., i] = result[..., i - 1] + alpha*(values[..., term + i - 1] - result[..., i - 1])
+
+        return result
+
+    def mean(self) -> np.ndarray:
+        return np.asarray(self.values, dtype=np.float64).mean(axis=-1)
+
+    def standard_deviation(self) -> np.ndarray:
+        return np.asarray(self.values, dtype=np.float64).std(axis=-1)
@@ -1,16 +1,40 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import ClassVar
+from typing import ClassVar, List, Dict, Iterator, Sequence, Tuple
 from decimal import Decimal, ROUND_UP
 from datetime import date
 from enum import IntEnum, auto
+from functools import lru_cache, total_ordering
+from sys import intern
+
+import numpy as np
+
+from app.domain.numeric import NumericBackend, DecimalNumericBackend
 
 class Interval(IntEnum):
     DAILY:   ClassVar[int] = auto()
     UNKNOWN: ClassVar[int] = auto()
 
-@dataclass(order = True)
+# The shared object of the date. Every ticker has the same trading days, so millions of
+# sticks share a few thousand date objects. Only the most recently used dates (about 60
+# years of trading days) are kept, so a long running process does not grow with every date.
+@lru_cache(maxsize = 1 << 14)
+def _shared_date(value:date) -> date:
+    return value
+
+# ---------------------------------------------------------------------------------
+# A candlestick without the instance dict. The code and market strings are interned,
+# so millions of sticks share a few string objects. The prices are quantized on the
+# first read of any of them, and the raw values are dropped then. The equality and
+# the order are the same as the dataclass (order = True) with patched not compared.
+# ---------------------------------------------------------------------------------
+@total_ordering
 class Candlestick:
+    PRICE_QUANTUM: ClassVar[Decimal]         = Decimal('.0000001')
+    PRICE_NAMES:   ClassVar[Tuple[str, ...]] = ('open_price', 'close_price', 'high_price', 'low_price')
+
+    __slots__ = ('code', 'market', 'date', 'open_price', 'close_price', 'high_price', 'low_price', 'volume', 'interval', 'patched', '_prices')
+
     code:        str
     market:      str
     date:        date
@@ -22,40 +46,212 @@ class Candlestick:
     volume:      int
 
     interval:    Interval
-    patched:     bool = field(compare = False, default = False)
+    patched:     bool
 
     def __init__(self, code, market, date, open_price, close_price, high_price, low_price, volume, interval, patched=False):
-        self.code        = code
-        self.market      = market
-        self.date        = date
-
-        self.open_price  = open_price.quantize(Decimal('.0000001'), rounding=ROUND_UP)
-        self.close_price = close_price.quantize(Decimal('.0000001'), rounding=ROUND_UP)
-        self.high_price  = high_price.quantize(Decimal('.0000001'), rounding=ROUND_UP)
-        self.low_price   = low_price.quantize(Decimal('.0000001'), rounding=ROUND_UP)
+        self.code        = intern(code)
+        self.market      = intern(market)
+        self.date        = _shared_date(date)
+
+        self._prices     = (open_price, close_price, high_price, low_price)
         self.volume      = volume
 
         self.interval    = interval
         self.patched     = patched
 
+    @classmethod
+    def from_row(cls, row:Sequence, interval:Interval = Interval.DAILY) -> Candlestick:
+        """
+        row:      Sequence (code, market, date, open_price, close_price, high_price, low_price, volume, patched)
+        interval: Interval
+        return (candlestick: Candlestick)
+        """
+        stick = cls.__new__(cls)
+        (code, market, date, open_price, close_price, high_price, low_price, stick.volume, patched) = row
+        stick.code     = intern(code)
+        stick.market   = intern(market)
+        stick.date     = _shared_date(date)
+        stick._prices  = (open_price, close_price, high_price, low_price)
+        stick.interval = interval
+        stick.patched  = bool(patched)
+        return stick
+
+    def __getattr__(self, name):
+        # Called only while the price slots are not set yet. The prices are read only after the construction.
+        prices = self._prices
+        if prices is None or name not in Candlestick.PRICE_NAMES:
+            raise AttributeError(name)
+        quantum = Candlestick.PRICE_QUANTUM
+        self.open_price  = prices[0].quantize(quantum, rounding=ROUND_UP)
+        self.close_price = prices[1].quantize(quantum, rounding=ROUND_UP)
+        self.high_price  = prices[2].quantize(quantum, rounding=ROUND_UP)
+        self.low_price   = prices[3].quantize(quantum, rounding=ROUND_UP)
+        self._prices     = None
+        return object.__getattribute__(self, name)
+
+    def _key(self) -> tuple:
+        return (self.code, self.market, self.date, self.open_price, self.close_price, self.high_price, self.low_price, self.volume, self.interval)
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __lt__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._key() < other._key()
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return (self.code, self.market, self.date, self.open_price, self.close_price, self.high_price, self.low_price, self.volume, self.interval, self.patched)
+
+    def __setstate__(self, state):
+        (code, market, date, open_price, close_price, high_price, low_price, volume, interval, patched) = state
+        self.code        = intern(code)
+        self.market      = intern(market)
+        self.date        = _shared_date(date)
+        self.open_price  = open_price
+        self.close_price = close_price
+        self.high_price  = high_price
+        self.low_price   = low_price
+        self.volume      = volume
+        self.interval    = interval
+        self.patched     = patched
+        self._prices     = None
+
+    def __repr__(self) -> str:
+        return f"Candlestick(code={self.code!r}, market={self.market!r}, date={self.date!r}, open_price={self.open_price!r}, close_price={self.close_price!r}, high_price={self.high_price!r}, low_price={self.low_price!r}, volume={self.volume!r}, interval={self.interval!r}, patched={self.patched!r})"
+
+# Columnar candlesticks of one ticker in ascending date order. Slicing returns views of the arrays.
+@dataclass
+class CandlestickSeries:
+    code:         str
+    market:       str
+    dates:        np.ndarray # datetime64[D]
+    open_prices:  np.ndarray # float64
+    close_prices: np.ndarray # float64
+    high_prices:  np.ndarray # float64
+    low_prices:   np.ndarray # float64
+    volumes:      np.ndarray # int64
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, key: slice) -> CandlestickSeries:
+        return CandlestickSeries(
+                code         = self.code,
+                market       = self.market,
+                dates        = self.dates[key],
+                open_prices  = self.open_prices[key],
+                close_prices = self.close_prices[key],
+                high_prices  = self.high_prices[key],
+                low_prices   = self.low_prices[key],
+                volumes      = self.volumes[key]
+                )
+
+    @classmethod
+    def from_columns(cls, code:str, market:str, dates:List[date], open_prices:List[float], close_prices:List[float], high_prices:List[float], low_prices:List[float], volumes:List[int]) -> CandlestickSeries:
+        return cls(
+                code         = code,
+                market       = market,
+                dates        = np.array(dates, dtype='datetime64[D]'),
+                open_prices  = np.array(open_prices, dtype=np.float64),
+                close_prices = np.array(close_prices, dtype=np.float64),
+                high_prices  = np.array(high_prices, dtype=np.float64),
+                low_prices   = np.array(low_prices, dtype=np.float64),
+                volumes      = np.array(volumes, dtype=np.int64)
+                )
+
+    @classmethod
+    def from_candlesticks(cls, candlesticks:List[Candlestick]) -> CandlestickSeries:
+        sticks = sorted(candlesticks, key=lambda x: x.date)
+        return cls.from_columns(
+                code         = sticks[0].code if len(sticks) > 0 else '',
+                market       = sticks[0].market if len(sticks) > 0 else '',
+                dates        = [stick.date for stick in sticks],
+                open_prices  = [float(stick.open_price) for stick in sticks],
+                close_prices = [float(stick.close_price) for stick in sticks],
+                high_prices  = [float(stick.high_price) for stick in sticks],
+                low_prices   = [float(stick.low_price) for stick in sticks],
+                volumes      = [stick.volume for stick in sticks]
+                )
+
+    def to_candlesticks(self) -> List[Candlestick]:
+        """
+        return (candlesticks: List[Candlestick]) newest first, same as the repository returns.
+        """
+        return [Candlestick(
+            code        = self.code,
+            market      = self.market,
+            date        = self.dates[i].astype(date),
+            open_price  = Decimal(repr(float(self.open_prices[i]))),
+            close_price = Decimal(repr(float(self.close_prices[i]))),
+            high_price  = Decimal(repr(float(self.high_prices[i]))),
+            low_price   = Decimal(repr(float(self.low_prices[i]))),
+            volume      = int(self.volumes[i]),
+            interval    = Interval.DAILY
+            ) for i in reversed(range(len(self.dates)))]
+
+# Candlestick series of many tickers keyed by code.
+@dataclass
+class Universe:
+    series: Dict[str, CandlestickSeries] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def __iter__(self) -> Iterator[CandlestickSeries]:
+        return iter(self.series.values())
+
+    def __getitem__(self, code:str) -> CandlestickSeries:
+        return self.series[code]
+
+    def __contains__(self, code:str) -> bool:
+        return code in self.series
+
+    def add(self, series:CandlestickSeries):
+        self.series[series.code] = series
+
+    def codes(self) -> List[str]:
+        return list(self.series.keys())
+
+    def stack(self, column:str, length:int) -> (List[str], np.ndarray):
+        """
+        column: 'close_prices', 'volumes', ...
+        length: int
+        return (codes: List[str], values: np.ndarray) values[i] is the last `length` values of codes[i]. Tickers with fewer values are left out.
+        """
+        codes = [code for (code, series) in self.series.items() if len(series) >= length]
+        if len(codes) == 0:
+            return (codes, np.empty((0, length)))
+        return (codes, np.stack([getattr(self.series[code], column)[len(self.series[code]) - length:] for code in codes]))
+
 @dataclass
 class Atr:
     candlesticks: List[Candlestick]
+    numeric:      NumericBackend = field(default_factory=DecimalNumericBackend)
 
-    def calculate(self) -> List[Decimal]:
-        previous = self.candlesticks[0]
+    def calculate(self) -> List:
+        """
+        return (atr: List) in the numbers of the backend.
+        """
+        previous = self.numeric.number(self.candlesticks[0].close_price)
+        highs    = self.numeric.numbers([value.high_price for value in self.candlesticks])
+        lows     = self.numeric.numbers([value.low_price for value in self.candlesticks])
 
         result = list()
-        for value in self.candlesticks:
+        for (high, low) in zip(highs, lows):
             result.append(
-                    max([abs(value.high_price - previous.close_price), abs(value.low_price - previous.close_price), abs(value.high_price - value.low_price)])
+                    max([abs(high - previous), abs(low - previous), abs(high - low)])
                     )
             
         return result
 
     def average(self, term:int) -> List[Decimal]:
         atr_list = self.calculate()
-        return [sum(atr_list[i:i+term])/Decimal(term) for i in range(len(atr_list) - term + 1)]
+        return self.numeric.exacts(self.numeric.sma(atr_list, term))
 
 
 @dataclass
@@ -70,3 +266,19 @@ class Term:
     market:     str
     first_date: date
     last_date:  date
+
+@dataclass
+class Ingestion:
+    path:      str
+    size:      int
+    hash:      str
+    row_count: int
+
+# The dates of a ticker loaded without a gap, so an incremental load skips the rows between them.
+@dataclass
+class Watermark:
+    first_date: date
+    last_date:  date
+
+    def contains(self, target:date) -> bool:
+        return target != None and self.first_date <= target <= self.last_date
@@ -1,5 +1,6 @@
 from abc import ABCMeta, abstractmethod
-from typing import Dict
+from decimal import Decimal
+from typing import Dict, List, Tuple
 
 class CacheDriver(metaclass=ABCMeta):
     @abstractmethod
@@ -13,3 +14,43 @@ class CacheDriver(metaclass=ABCMeta):
     @abstractmethod
     def get_dictionary(self, key:str) -> Dict:
         raise NotImplementedError
+
+    # ---------------------------------------------------------------------------------
+    # Ranked score sets. The scores are kept as float (double), highest first.
+    # ---------------------------------------------------------------------------------
+    @abstractmethod
+    def clear_ranking(self, key:str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_ranking(self, key:str, scores:Dict[str,Decimal]) -> bool:
+        """
+        key:    str
+        scores: Dict[str,Decimal] added to the ranking, or overwriting the scores of the same members.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_ranking(self, key:str, limit:int, offset:int = 0) -> List[Tuple[str,Decimal]]:
+        """
+        key:    str
+        limit:  int
+        offset: int
+        return (scores: List[Tuple[str,Decimal]]) (member, score) in descending order of the score.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_ranking(self, key:str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def compose_ranking(self, key:str, coefficient:Decimal, additional:Dict[str,Decimal]) -> bool:
+        """
+        Compose the ranking in one atomic step. Concurrent compositions into the same key are applied one after another.
+        key:         str
+        coefficient: Decimal multiplied to every score.
+        additional:  Dict[str,Decimal] multiplied to the score of the same member. The members not in it are removed, unless it is empty.
+                     When the ranking is empty, it is filled with these scores multiplied by the coefficient instead.
+        """
+        raise NotImplementedError
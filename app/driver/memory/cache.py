@@ -0,0 +1,75 @@
+from app.driver.cache import CacheDriver
+from threading import Lock
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+class MemoryCacheDriver(CacheDriver):
+
+    def __init__(self):
+        self.store    = dict()
+        self.rankings = dict()
+        # The rankings are replaced under the lock, so the readers see either the old or the new one.
+        self.lock     = Lock()
+
+    # ---------------------------------------------------------------------------------
+    # Save dictionary.
+    # ---------------------------------------------------------------------------------
+    def save_dictionary(self, key:str, value:Dict) -> bool:
+        self.store.setdefault(key, dict()).update({k: str(v) for (k, v) in value.items()})
+
+    # ---------------------------------------------------------------------------------
+    # Get dictionary.
+    # ---------------------------------------------------------------------------------
+    def get_dictionary(self, key:str) -> Dict:
+        return dict(self.store.get(key, dict()))
+
+    # ---------------------------------------------------------------------------------
+    # Clear dictionary.
+    # ---------------------------------------------------------------------------------
+    def clear_dictionary(self, key:str) -> bool:
+        self.store.pop(key, None)
+
+    # ---------------------------------------------------------------------------------
+    # Clear ranking.
+    # ---------------------------------------------------------------------------------
+    def clear_ranking(self, key:str) -> bool:
+        with self.lock:
+            self.rankings.pop(key, None)
+
+    # ---------------------------------------------------------------------------------
+    # Save ranking.
+    # ---------------------------------------------------------------------------------
+    def save_ranking(self, key:str, scores:Dict[str,Decimal]) -> bool:
+        with self.lock:
+            self.rankings[key] = {**self.rankings.get(key, dict()), **{k: float(v) for (k, v) in scores.items()}}
+
+    # ---------------------------------------------------------------------------------
+    # Get ranking. Ties are ordered by the member descending, same as ZREVRANGE.
+    # ---------------------------------------------------------------------------------
+    def get_ranking(self, key:str, limit:int, offset:int = 0) -> List[Tuple[str,Decimal]]:
+        ranking = sorted(self.rankings.get(key, dict()).items(), key=lambda x: (x[1], x[0]), reverse=True)
+        return [(member, Decimal(repr(score))) for (member, score) in ranking[offset:offset+max(limit, 0)]]
+
+    # ---------------------------------------------------------------------------------
+    # Count ranking.
+    # ---------------------------------------------------------------------------------
+    def count_ranking(self, key:str) -> int:
+        return len(self.rankings.get(key, dict()))
+
+    # ---------------------------------------------------------------------------------
+    # Compose ranking.
+    # ---------------------------------------------------------------------------------
+    def compose_ranking(self, key:str, coefficient:Decimal, additional:Dict[str,Decimal]) -> bool:
+        coefficient = float(coefficient)
+        with self.lock:
+            ranking = self.rankings.get(key, dict())
+            if len(ranking) == 0:
+                result = {k: float(v) * coefficient for (k, v) in additional.items()}
+            elif len(additional) == 0:
+                result = {k: v * coefficient for (k, v) in ranking.items()}
+            else:
+                result = {k: v * coefficient * float(additional[k]) for (k, v) in ranking.items() if k in additional}
+            if len(result) > 0:
+                self.rankings[key] = result
+            else:
+                self.rankings.pop(key, None)
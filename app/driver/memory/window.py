@@ -0,0 +1,54 @@
+from app.driver.window import WindowCacheDriver
+from threading import Lock
+from time import monotonic
+from typing import Dict, List, Optional
+
+class MemoryWindowCacheDriver(WindowCacheDriver):
+
+    def __init__(self):
+        self.versions = dict()
+        self.blobs    = dict()
+        self.lock     = Lock()
+
+    # ---------------------------------------------------------------------------------
+    # Get versions.
+    # ---------------------------------------------------------------------------------
+    def get_versions(self, names:List[str]) -> List[int]:
+        return [self.versions.get(name, 0) for name in names]
+
+    # ---------------------------------------------------------------------------------
+    # Bump versions.
+    # ---------------------------------------------------------------------------------
+    def bump_versions(self, names:List[str]) -> List[int]:
+        result = list()
+        with self.lock:
+            for name in names:
+                self.versions[name] = self.versions.get(name, 0) + 1
+                result.append(self.versions[name])
+        return result
+
+    # ---------------------------------------------------------------------------------
+    # Get blobs. The expired ones are dropped on the read.
+    # ---------------------------------------------------------------------------------
+    def get_blobs(self, keys:List[str]) -> List[Optional[bytes]]:
+        now    = monotonic()
+        result = list()
+        with self.lock:
+            for key in keys:
+                (blob, expiry) = self.blobs.get(key, (None, now))
+                if blob is not None and expiry <= now:
+                    self.blobs.pop(key, None)
+                    blob = None
+                result.append(blob)
+        return result
+
+    # ---------------------------------------------------------------------------------
+    # Save blobs. The windows of the old versions are never read again, so the expired
+    # blobs are purged here, as Redis does with the expiry of the keys.
+    # ---------------------------------------------------------------------------------
+    def save_blobs(self, blobs:Dict[str,bytes], ttl:int) -> bool:
+        now = monotonic()
+        with self.lock:
+            for key in [key for (key, (_, expiry)) in self.blobs.items() if expiry <= now]:
+                del self.blobs[key]
+            self.blobs.update({key: (blob, now + ttl) for (key, blob) in blobs.items()})
@@ -1,17 +1,69 @@
 from app.driver.cache import CacheDriver
 import redis
-from typing import Dict
+from decimal import Decimal
+from typing import Dict, List, Tuple
 
-class RedisCacheDriver(CacheDriver): 
+class RedisCacheDriver(CacheDriver):
+    # Members are sent to ZADD in chunks, all in one pipeline.
+    CHUNK_SIZE = 1000
+
+    # Compose the ranking in one step on the server. ARGV = [coefficient, member, score, member, score, ...]
+    # The script runs atomically, so concurrent compositions into the same key never lose scores, and the
+    # readers never see the key half written. ZADD and ZREM are sent in chunks to stay in the Lua stack limit.
+    COMPOSE_SCRIPT = """
+    local coefficient = tonumber(ARGV[1])
+    local additional  = {}
+    for i = 2, #ARGV, 2 do
+        additional[ARGV[i]] = tonumber(ARGV[i+1])
+    end
+    local added   = {}
+    local removed = {}
+    local function flush(force)
+        if #added >= 2000 or (force and #added > 0) then
+            redis.call('ZADD', KEYS[1], unpack(added))
+            added = {}
+        end
+        if #removed >= 1000 or (force and #removed > 0) then
+            redis.call('ZREM', KEYS[1], unpack(removed))
+            removed = {}
+        end
+    end
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        for i = 2, #ARGV, 2 do
+            table.insert(added, string.format('%.17g', additional[ARGV[i]] * coefficient))
+            table.insert(added, ARGV[i])
+            flush(false)
+        end
+    else
+        local intersect = #ARGV > 1
+        local members   = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+        for i = 1, #members, 2 do
+            local score = tonumber(members[i+1]) * coefficient
+            if not intersect then
+                table.insert(added, string.format('%.17g', score))
+                table.insert(added, members[i])
+            elseif additional[members[i]] then
+                table.insert(added, string.format('%.17g', score * additional[members[i]]))
+                table.insert(added, members[i])
+            else
+                table.insert(removed, members[i])
+            end
+            flush(false)
+        end
+    end
+    flush(true)
+    return redis.call('ZCARD', KEYS[1])
+    """
 
     def __init__(self, server:str, port:str):
         self.conn = redis.StrictRedis(host=server, port=port, db=0, decode_responses=True)
+        self.compose_script = self.conn.register_script(RedisCacheDriver.COMPOSE_SCRIPT)
 
     # ---------------------------------------------------------------------------------
     # Save dictionary.
     # ---------------------------------------------------------------------------------
     def save_dictionary(self, key:str, value:Dict) -> bool:
-        self.conn.hmset(key, value)
+        self.conn.hset(key, mapping=value)
 
     # ---------------------------------------------------------------------------------
     # Get dictionary.
@@ -25,3 +77,41 @@ class RedisCacheDriver(CacheDriver):
     def clear_dictionary(self, key:str) -> bool:
         self.conn.delete(key)
 
+    # ---------------------------------------------------------------------------------
+    # Clear ranking.
+    # ---------------------------------------------------------------------------------
+    def clear_ranking(self, key:str) -> bool:
+        self.conn.delete(key)
+
+    # ---------------------------------------------------------------------------------
+    # Save ranking.
+    # ---------------------------------------------------------------------------------
+    def save_ranking(self, key:str, scores:Dict[str,Decimal]) -> bool:
+        items = [(member, float(score)) for (member, score) in scores.items()]
+        pipe  = self.conn.pipeline(transaction=False)
+        for i in range(0, len(items), RedisCacheDriver.CHUNK_SIZE):
+            pipe.zadd(key, dict(items[i:i+RedisCacheDriver.CHUNK_SIZE]))
+        pipe.execute()
+
+    # ---------------------------------------------------------------------------------
+    # Get ranking. Only the page is read from the server.
+    # ---------------------------------------------------------------------------------
+    def get_ranking(self, key:str, limit:int, offset:int = 0) -> List[Tuple[str,Decimal]]:
+        if limit <= 0:
+            return []
+        return [(member, Decimal(repr(score))) for (member, score) in self.conn.zrevrange(key, offset, offset + limit - 1, withscores=True)]
+
+    # ---------------------------------------------------------------------------------
+    # Count ranking.
+    # ---------------------------------------------------------------------------------
+    def count_ranking(self, key:str) -> int:
+        return self.conn.zcard(key)
+
+    # ---------------------------------------------------------------------------------
+    # Compose ranking.
+    # ---------------------------------------------------------------------------------
+    def compose_ranking(self, key:str, coefficient:Decimal, additional:Dict[str,Decimal]) -> bool:
+        args = [repr(float(coefficient))]
+        for (member, score) in additional.items():
+            args.extend([member, repr(float(score))])
+        self.compose_script(keys=[key], args=args)
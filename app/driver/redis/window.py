@@ -0,0 +1,49 @@
+from app.driver.window import WindowCacheDriver
+import redis
+from typing import Dict, List, Optional
+
+class RedisWindowCacheDriver(WindowCacheDriver):
+    # Keys sent in one MGET, and blobs in one pipeline round trip.
+    CHUNK_SIZE   = 1000
+    VERSIONS_KEY = 'window:versions'
+
+    def __init__(self, server:str, port:str):
+        # The blobs are binary, so the responses are not decoded.
+        self.conn = redis.StrictRedis(host=server, port=port, db=0, decode_responses=False)
+
+    # ---------------------------------------------------------------------------------
+    # Get versions.
+    # ---------------------------------------------------------------------------------
+    def get_versions(self, names:List[str]) -> List[int]:
+        if len(names) == 0:
+            return []
+        return [0 if value is None else int(value) for value in self.conn.hmget(RedisWindowCacheDriver.VERSIONS_KEY, names)]
+
+    # ---------------------------------------------------------------------------------
+    # Bump versions. All of them at once in MULTI/EXEC.
+    # ---------------------------------------------------------------------------------
+    def bump_versions(self, names:List[str]) -> List[int]:
+        pipe = self.conn.pipeline(transaction=True)
+        for name in names:
+            pipe.hincrby(RedisWindowCacheDriver.VERSIONS_KEY, name, 1)
+        return pipe.execute()
+
+    # ---------------------------------------------------------------------------------
+    # Get blobs.
+    # ---------------------------------------------------------------------------------
+    def get_blobs(self, keys:List[str]) -> List[Optional[bytes]]:
+        pipe = self.conn.pipeline(transaction=False)
+        for i in range(0, len(keys), RedisWindowCacheDriver.CHUNK_SIZE):
+            pipe.mget(keys[i:i+RedisWindowCacheDriver.CHUNK_SIZE])
+        return [blob for blobs in pipe.execute() for blob in blobs]
+
+    # ---------------------------------------------------------------------------------
+    # Save blobs.
+    # ---------------------------------------------------------------------------------
+    def save_blobs(self, blobs:Dict[str,bytes], ttl:int) -> bool:
+        pipe = self.conn.pipeline(transaction=False)
+        for (i, (key, blob)) in enumerate(blobs.items()):
+            pipe.set(key, blob, ex=ttl)
+            if (i + 1) % RedisWindowCacheDriver.CHUNK_SIZE == 0:
+                pipe.execute()
+        pipe.execute()
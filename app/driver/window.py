@@ -0,0 +1,39 @@
+from abc import ABCMeta, abstractmethod
+from typing import Dict, List, Optional
+
+# ---------------------------------------------------------------------------------
+# Shared store of the packed candlestick windows, and of the version counters which
+# make the old windows unreachable when the candlesticks are written.
+# ---------------------------------------------------------------------------------
+class WindowCacheDriver(metaclass=ABCMeta):
+    @abstractmethod
+    def get_versions(self, names:List[str]) -> List[int]:
+        """
+        names:  List[str]
+        return (versions: List[int]) in the same order, 0 for the names never bumped.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def bump_versions(self, names:List[str]) -> List[int]:
+        """
+        names:  List[str]
+        return (versions: List[int]) the versions after the increment.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_blobs(self, keys:List[str]) -> List[Optional[bytes]]:
+        """
+        keys:   List[str]
+        return (blobs: List[Optional[bytes]]) in the same order, None for the missing keys.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_blobs(self, blobs:Dict[str,bytes], ttl:int) -> bool:
+        """
+        blobs: Dict[str,bytes]
+        ttl:   int seconds to keep them.
+        """
+        raise NotImplementedError
@@ -0,0 +1,110 @@
+from app.repository.stock            import StockRepository
+from app.repository.transaction      import TxContext
+from app.repository.inputdata.stock  import *
+from app.repository.outputdata.stock import *
+
+# ---------------------------------------------------------------------------------
+# StockRepository which hands every call to another one. The cache tiers extend it
+# and override only the reads they keep and the writes they have to know.
+# ---------------------------------------------------------------------------------
+class StockRepositoryDecorator(StockRepository):
+    repository: StockRepository
+
+    def __init__(self, repository:StockRepository):
+        self.repository = repository
+
+    def find(self, ctx: TxContext, input_data:FindInput) -> FindOutput:
+        return self.repository.find(ctx, input_data)
+
+    def find_tag(self, ctx: TxContext, input_data:FindTagInput) -> FindTagOutput:
+        return self.repository.find_tag(ctx, input_data)
+
+    def find_tags(self, ctx: TxContext, input_data:FindTagsInput) -> FindTagsOutput:
+        return self.repository.find_tags(ctx, input_data)
+
+    def save(self, ctx: TxContext, input_data:SaveInput) -> SaveOutput:
+        return self.repository.save(ctx, input_data)
+
+    def find_bulk(self, ctx: TxContext, input_data:FindBulkInput) -> FindBulkOutput:
+        return self.repository.find_bulk(ctx, input_data)
+
+    def save_bulk(self, ctx: TxContext, input_data:SaveBulkInput) -> SaveBulkOutput:
+        return self.repository.save_bulk(ctx, input_data)
+
+    def find_ingestion(self, ctx: TxContext, input_data:FindIngestionInput) -> FindIngestionOutput:
+        return self.repository.find_ingestion(ctx, input_data)
+
+    def save_ingestion(self, ctx: TxContext, input_data:SaveIngestionInput) -> SaveIngestionOutput:
+        return self.repository.save_ingestion(ctx, input_data)
+
+    def get_watermarks(self, ctx: TxContext, input_data:GetWatermarksInput) -> GetWatermarksOutput:
+        return self.repository.get_watermarks(ctx, input_data)
+
+    def save_watermarks(self, ctx: TxContext, input_data:SaveWatermarksInput) -> SaveWatermarksOutput:
+        return self.repository.save_watermarks(ctx, input_data)
+
+    def save_tag(self, ctx: TxContext, input_data:SaveTagInput) -> SaveTagOutput:
+        return self.repository.save_tag(ctx, input_data)
+
+    def remove_ones_all(self, ctx: TxContext, input_data:RemoveOnesAllInput) -> RemoveOnesAllOutput:
+        return self.repository.remove_ones_all(ctx, input_data)
+
+    def get(self, ctx: TxContext, input_data:GetInput) -> GetOutput:
+        return self.repository.get(ctx, input_data)
+
+    def get_ones_all(self, ctx: TxContext, input_data:GetOnesAllInput) -> GetOnesAllOutput:
+        return self.repository.get_ones_all(ctx, input_data)
+
+    def get_all(self, ctx: TxContext, input_data:GetAllInput) -> GetAllOutput:
+        return self.repository.get_all(ctx, input_data)
+
+    def stream_all(self, ctx: TxContext, input_data:StreamAllInput) -> StreamAllOutput:
+        return self.repository.stream_all(ctx, input_data)
+
+    def get_endpoints(self, ctx: TxContext, input_data:GetEndpointsInput) -> GetEndpointsOutput:
+        return self.repository.get_endpoints(ctx, input_data)
+
+    def get_each(self, ctx: TxContext, input_data:GetEachInput) -> GetEachOutput:
+        return self.repository.get_each(ctx, input_data)
+
+    def get_each_offsets(self, ctx: TxContext, input_data:GetEachOffsetsInput) -> GetEachOffsetsOutput:
+        return self.repository.get_each_offsets(ctx, input_data)
+
+    def get_range(self, ctx: TxContext, input_data:GetRangeInput) -> GetRangeOutput:
+        return self.repository.get_range(ctx, input_data)
+
+    def get_range_series(self, ctx: TxContext, input_data:GetRangeSeriesInput) -> GetRangeSeriesOutput:
+        return self.repository.get_range_series(ctx, input_data)
+
+    def search_tickers(self, ctx: TxContext, input_data:SearchTickersInput) -> SearchTickersOutput:
+        return self.repository.search_tickers(ctx, input_data)
+
+    def get_tickers(self, ctx: TxContext, input_data:GetTickersInput) -> GetTickersOutput:
+        return self.repository.get_tickers(ctx, input_data)
+
+    def search_markets(self, ctx: TxContext, input_data:SearchMarketsInput) -> SearchMarketsOutput:
+        return self.repository.search_markets(ctx, input_data)
+
+    def search_tags(self, ctx: TxContext, input_data:SearchTagsInput) -> SearchTagsOutput:
+        return self.repository.search_tags(ctx, input_data)
+
+    def get_stockdatainfo(self, ctx: TxContext, input_data:GetStockdatainfoInput) -> GetStockdatainfoOutput:
+        return self.repository.get_stockdatainfo(ctx, input_data)
+
+    def save_delisting(self, ctx: TxContext, input_data:SaveDelistingInput) -> SaveDelistingOutput:
+        return self.repository.save_delisting(ctx, input_data)
+
+    def find_delisting(self, ctx: TxContext, input_data:FindDelistingInput) -> FindDelistingOutput:
+        return self.repository.find_delisting(ctx, input_data)
+
+    def get_delistings_ones_all(self, ctx: TxContext, input_data:GetDelistingsOnesAllInput) -> GetDelistingsOnesAllOutput:
+        return self.repository.get_delistings_ones_all(ctx, input_data)
+
+    def remove_delistings_ones_all(self, ctx: TxContext, input_data:RemoveDelistingsOnesAllInput) -> RemoveDelistingsOnesAllOutput:
+        return self.repository.remove_delistings_ones_all(ctx, input_data)
+
+    def get_all_term(self, ctx: TxContext, input_data:GetAllTermInput) -> GetAllTermOutput:
+        return self.repository.get_all_term(ctx, input_data)
+
+    def remove_tag(self, ctx: TxContext, input_data:RemoveTagInput) -> RemoveTagOutput:
+        return self.repository.remove_tag(ctx, input_data)
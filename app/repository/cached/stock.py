@@ -0,0 +1,212 @@
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import fields
+from typing import Any, Callable, Dict, List, Set, Tuple
+from weakref import WeakSet
+
+from app.repository.stock            import StockRepository
+from app.repository.cached.decorator import StockRepositoryDecorator
+from app.repository.transaction      import TxContext
+from app.repository.inputdata.stock  import *
+from app.repository.outputdata.stock import *
+
+# ---------------------------------------------------------------------------------
+# In-process LRU cache of the reads around another StockRepository.
+# The results are keyed on the input dataclasses, and each of them is registered in
+# the scopes it depends on: a ticker, a market ('' is every market) or everything.
+# A write of (code, market) drops the results of the ticker, of the market, of every
+# market and of everything. The results are shared, so the callers must not change them.
+# The writes of the other processes are not seen until the results are evicted.
+# ---------------------------------------------------------------------------------
+class CachedStockRepository(StockRepositoryDecorator):
+    capacity:   int
+    size:       int
+    hits:       int
+    misses:     int
+    entries:    OrderedDict
+    scopes:     Dict[Tuple,Set[Tuple]]
+    writers:    WeakSet
+
+    def __init__(self, repository:StockRepository, capacity:int):
+        """
+        repository: StockRepository
+        capacity:   int the number of the values (candlesticks, tags, ...) kept at once.
+        """
+        super().__init__(repository)
+        self.capacity   = capacity
+        self.size       = 0
+        self.hits       = 0
+        self.misses     = 0
+        self.entries    = OrderedDict()
+        self.scopes     = dict()
+        # The transactions which wrote. Their reads may see the uncommitted rows, so they are not kept.
+        self.writers    = WeakSet()
+
+    # ---------------------------------------------------------------------------------
+    # Reads.
+    # ---------------------------------------------------------------------------------
+    def find(self, ctx: TxContext, input_data:FindInput) -> FindOutput:
+        return self._cached(ctx, 'find', input_data, [self._ticker(input_data.code, input_data.market)], self.repository.find)
+
+    def find_tag(self, ctx: TxContext, input_data:FindTagInput) -> FindTagOutput:
+        return self._cached(ctx, 'find_tag', input_data, [self._ticker(input_data.code, input_data.market)], self.repository.find_tag)
+
+    def find_tags(self, ctx: TxContext, input_data:FindTagsInput) -> FindTagsOutput:
+        return self._cached(ctx, 'find_tags', input_data, [self._market(input_data.market)], self.repository.find_tags)
+
+    def get(self, ctx: TxContext, input_data:GetInput) -> GetOutput:
+        return self._cached(ctx, 'get', input_data, [self._ticker(input_data.code, input_data.market)], self.repository.get)
+
+    def get_ones_all(self, ctx: TxContext, input_data:GetOnesAllInput) -> GetOnesAllOutput:
+        return self._cached(ctx, 'get_ones_all', input_data, [self._ticker(input_data.code, input_data.market)], self.repository.get_ones_all)
+
+    def get_all(self, ctx: TxContext, input_data:GetAllInput) -> GetAllOutput:
+        return self._cached(ctx, 'get_all', input_data, [self._market(input_data.market)], self.repository.get_all)
+
+    def get_endpoints(self, ctx: TxContext, input_data:GetEndpointsInput) -> GetEndpointsOutput:
+        return self._cached(ctx, 'get_endpoints', input_data, [self._market(input_data.market)], self.repository.get_endpoints)
+
+    def get_each(self, ctx: TxContext, input_data:GetEachInput) -> GetEachOutput:
+        return self._cached(ctx, 'get_each', input_data, [self._market(input_data.market)], self.repository.get_each)
+
+    def get_each_offsets(self, ctx: TxContext, input_data:GetEachOffsetsInput) -> GetEachOffsetsOutput:
+        return self._cached(ctx, 'get_each_offsets', input_data, [self._market(input_data.market)], self.repository.get_each_offsets)
+
+    def get_range(self, ctx: TxContext, input_data:GetRangeInput) -> GetRangeOutput:
+        return self._cached(ctx, 'get_range', input_data, [self._range(input_data.code, input_data.market)], self.repository.get_range)
+
+    def get_range_series(self, ctx: TxContext, input_data:GetRangeSeriesInput) -> GetRangeSeriesOutput:
+        return self._cached(ctx, 'get_range_series', input_data, [self._range(input_data.code, input_data.market)], self.repository.get_range_series)
+
+    def search_tickers(self, ctx: TxContext, input_data:SearchTickersInput) -> SearchTickersOutput:
+        return self._cached(ctx, 'search_tickers', input_data, [('all',)], self.repository.search_tickers)
+
+    def get_tickers(self, ctx: TxContext, input_data:GetTickersInput) -> GetTickersOutput:
+        return self._cached(ctx, 'get_tickers', input_data, [self._market(input_data.market)], self.repository.get_tickers)
+
+    def search_markets(self, ctx: TxContext, input_data:SearchMarketsInput) -> SearchMarketsOutput:
+        return self._cached(ctx, 'search_markets', input_data, [('all',)], self.repository.search_markets)
+
+    def search_tags(self, ctx: TxContext, input_data:SearchTagsInput) -> SearchTagsOutput:
+        return self._cached(ctx, 'search_tags', input_data, [('all',)], self.repository.search_tags)
+
+    def get_stockdatainfo(self, ctx: TxContext, input_data:GetStockdatainfoInput) -> GetStockdatainfoOutput:
+        return self._cached(ctx, 'get_stockdatainfo', input_data, [self._ticker(input_data.code, input_data.market)], self.repository.get_stockdatainfo)
+
+    def find_delisting(self, ctx: TxContext, input_data:FindDelistingInput) -> FindDelistingOutput:
+        return self._cached(ctx, 'find_delisting', input_data, [self._ticker(input_data.code, input_data.market)], self.repository.find_delisting)
+
+    def get_delistings_ones_all(self, ctx: TxContext, input_data:GetDelistingsOnesAllInput) -> GetDelistingsOnesAllOutput:
+        return self._cached(ctx, 'get_delistings_ones_all', input_data, [self._ticker(input_data.code, input_data.market)], self.repository.get_delistings_ones_all)
+
+    def get_all_term(self, ctx: TxContext, input_data:GetAllTermInput) -> GetAllTermOutput:
+        return self._cached(ctx, 'get_all_term', input_data, [('all',)], self.repository.get_all_term)
+
+    # The ingestion reads (find_bulk, find_ingestion, get_watermarks) are used once for
+    # each file, and stream_all is there not to hold the whole market, so they are not kept.
+
+    # ---------------------------------------------------------------------------------
+    # Writes.
+    # ---------------------------------------------------------------------------------
+    def save(self, ctx: TxContext, input_data:SaveInput) -> SaveOutput:
+        self._written(ctx, [(input_data.candlestick.code, input_data.candlestick.market)])
+        return self.repository.save(ctx, input_data)
+
+    def save_bulk(self, ctx: TxContext, input_data:SaveBulkInput) -> SaveBulkOutput:
+        self._written(ctx, set([(stick.code, stick.market) for stick in input_data.candlesticks]))
+        return self.repository.save_bulk(ctx, input_data)
+
+    def save_tag(self, ctx: TxContext, input_data:SaveTagInput) -> SaveTagOutput:
+        self._written(ctx, [(input_data.stock.code, input_data.stock.market)])
+        return self.repository.save_tag(ctx, input_data)
+
+    def remove_tag(self, ctx: TxContext, input_data:RemoveTagInput) -> RemoveTagOutput:
+        # Any ticker may have had the tag.
+        self.writers.add(ctx)
+        self.clear()
+        return self.repository.remove_tag(ctx, input_data)
+
+    def remove_ones_all(self, ctx: TxContext, input_data:RemoveOnesAllInput) -> RemoveOnesAllOutput:
+        self._written(ctx, [(input_data.code, input_data.market)])
+        return self.repository.remove_ones_all(ctx, input_data)
+
+    def save_delisting(self, ctx: TxContext, input_data:SaveDelistingInput) -> SaveDelistingOutput:
+        self._written(ctx, [(input_data.delisting.code, input_data.delisting.market)])
+        return self.repository.save_delisting(ctx, input_data)
+
+    def remove_delistings_ones_all(self, ctx: TxContext, input_data:RemoveDelistingsOnesAllInput) -> RemoveDelistingsOnesAllOutput:
+        self._written(ctx, [(input_data.code, input_data.market)])
+        return self.repository.remove_delistings_ones_all(ctx, input_data)
+
+    # ---------------------------------------------------------------------------------
+    # Drop the results which may have changed by the write of the tickers.
+    # ---------------------------------------------------------------------------------
+    def invalidate(self, code:str, market:str):
+        for scope in [('ticker', code, market), ('ticker', code, ''), ('market', market), ('market', ''), ('all',)]:
+            for key in list(self.scopes.get(scope, [])):
+                self._remove(key)
+
+    def clear(self):
+        self.entries.clear()
+        self.scopes.clear()
+        self.size = 0
+
+    def _written(self, ctx: TxContext, tickers):
+        self.writers.add(ctx)
+        for (code, market) in tickers:
+            self.invalidate(code, market)
+
+    def _cached(self, ctx: TxContext, name:str, input_data:Any, scopes:List[Tuple], read:Callable) -> Any:
+        key = (name,) + tuple([_frozen(getattr(input_data, f.name)) for f in fields(input_data)])
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key][0]
+
+        self.misses += 1
+        output = read(ctx, input_data)
+        if ctx in self.writers:
+            return output
+
+        size = _size(output)
+        if size > self.capacity:
+            return output
+        self.entries[key] = (output, size, scopes)
+        self.size += size
+        for scope in scopes:
+            self.scopes.setdefault(scope, set()).add(key)
+        while self.size > self.capacity:
+            self._remove(next(iter(self.entries)))
+        return output
+
+    def _remove(self, key:Tuple):
+        (_, size, scopes) = self.entries.pop(key)
+        self.size -= size
+        for scope in scopes:
+            self.scopes[scope].discard(key)
+            if len(self.scopes[scope]) == 0:
+                del self.scopes[scope]
+
+    def _ticker(self, code:str, market:str) -> Tuple:
+        return ('ticker', code, market)
+
+    def _market(self, market:str) -> Tuple:
+        return ('market', market)
+
+    def _range(self, code:str, market:str) -> Tuple:
+        return self._market(market) if code == '' else self._ticker(code, market)
+
+def _frozen(value:Any) -> Any:
+    return tuple(value) if isinstance(value, list) else value
+
+# The number of the values in the output, which the capacity is counted in.
+def _size(value:Any) -> int:
+    if isinstance(value, Universe):
+        return sum([len(series) for series in value])
+    if isinstance(value, dict):
+        return sum([_size(v) for v in value.values()])
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    if hasattr(value, '__dataclass_fields__'):
+        return max(sum([_size(getattr(value, f.name)) for f in fields(value)]), 1)
+    return 1
@@ -0,0 +1,237 @@
+from __future__ import annotations
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+from weakref import WeakSet
+import struct
+import zlib
+
+import numpy as np
+
+from app.driver.window               import WindowCacheDriver
+from app.repository.stock            import StockRepository
+from app.repository.cached.decorator import StockRepositoryDecorator
+from app.repository.transaction      import TxContext
+from app.repository.inputdata.stock  import *
+from app.repository.outputdata.stock import *
+
+# Header of a packed window: magic, compressed flag, the number of the arrays.
+HEADER       = struct.Struct('<4sBB')
+ARRAY_HEADER = struct.Struct('<cI')
+MAGIC        = b'CSW1'
+
+# The prices of get_range are kept exactly as fixed point integers of the quantum of Candlestick.
+PRICE_SCALE  = 7
+
+def pack_arrays(arrays:List[np.ndarray], compress:bool = False) -> bytes:
+    """
+    arrays:   List[np.ndarray] 1-D arrays of int64, float64 or uint8.
+    compress: bool
+    return (blob: bytes)
+    """
+    body = b''.join([ARRAY_HEADER.pack(array.dtype.char.encode(), len(array)) + np.ascontiguousarray(array).tobytes() for array in arrays])
+    return HEADER.pack(MAGIC, 1 if compress else 0, len(arrays)) + (zlib.compress(body, 1) if compress else body)
+
+def unpack_arrays(blob:bytes) -> List[np.ndarray]:
+    """
+    blob:   bytes made by pack_arrays.
+    return (arrays: List[np.ndarray]) read-only views of the blob, without copying when it is not compressed.
+    """
+    (magic, compressed, number) = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError('not a packed window')
+    body   = zlib.decompress(blob[HEADER.size:]) if compressed else memoryview(blob)[HEADER.size:]
+    offset = 0
+    result = list()
+    for _ in range(number):
+        (char, length) = ARRAY_HEADER.unpack_from(body, offset)
+        offset += ARRAY_HEADER.size
+        dtype   = np.dtype(char.decode())
+        result.append(np.frombuffer(body, dtype=dtype, count=length, offset=offset))
+        offset += dtype.itemsize * length
+    return result
+
+# ---------------------------------------------------------------------------------
+# Second cache tier of the candlestick windows of get_range and get_range_series,
+# shared by the clients through the WindowCacheDriver.
+# Each window is the last `limit` candlesticks of a ticker until to_date, packed into
+# one blob. The key of a window has the version of the ticker, and the key of the
+# tickers of a query has the versions of the market (or of the ticker). The versions
+# are bumped after the commit of every write, so the old entries are never read
+# again and just expire.
+# ---------------------------------------------------------------------------------
+class WindowCachedStockRepository(StockRepositoryDecorator):
+    driver:   WindowCacheDriver
+    ttl:      int
+    compress: bool
+    writers:  WeakSet
+
+    def __init__(self, repository:StockRepository, driver:WindowCacheDriver, ttl:int, compress:bool = False):
+        """
+        repository: StockRepository
+        driver:     WindowCacheDriver
+        ttl:        int seconds to keep the windows.
+        compress:   bool compress the windows with zlib.
+        """
+        super().__init__(repository)
+        self.driver   = driver
+        self.ttl      = ttl
+        self.compress = compress
+        # The transactions which wrote. Their reads may see the uncommitted rows, so they are not shared.
+        self.writers  = WeakSet()
+
+    # ---------------------------------------------------------------------------------
+    # Reads.
+    # ---------------------------------------------------------------------------------
+    def get_range(self, ctx: TxContext, input_data:GetRangeInput) -> GetRangeOutput:
+        if input_data.to_date == None:
+            return self.repository.get_range(ctx, input_data)
+
+        def read(code:str, market:str, tags:List[str]) -> List[Tuple[Tuple[str,str],List[np.ndarray]]]:
+            output = self.repository.get_range(ctx, GetRangeInput(code = code, market = market, tags = tags, to_date = input_data.to_date, limit = input_data.limit))
+            tickers = dict()
+            for sticks in output.candlesticks.values():
+                for stick in sticks:
+                    tickers.setdefault((stick.code, stick.market), []).append(stick)
+            return [(ticker, _range_columns(sticks)) for (ticker, sticks) in tickers.items()]
+
+        result = dict()
+        for ((code, market), columns) in self._windows(ctx, 'range', input_data.code, input_data.market, input_data.tags, input_data.to_date, input_data.limit, read):
+            result.setdefault(code, []).extend(_range_candlesticks(code, market, columns))
+
+        return GetRangeOutput(
+                candlesticks = result
+                )
+
+    def get_range_series(self, ctx: TxContext, input_data:GetRangeSeriesInput) -> GetRangeSeriesOutput:
+        if input_data.to_date == None:
+            return self.repository.get_range_series(ctx, input_data)
+
+        def read(code:str, market:str, tags:List[str]) -> List[Tuple[Tuple[str,str],List[np.ndarray]]]:
+            output = self.repository.get_range_series(ctx, GetRangeSeriesInput(code = code, market = market, tags = tags, to_date = input_data.to_date, limit = input_data.limit))
+            return [((series.code, series.market), [series.dates.astype(np.int64), series.open_prices, series.close_prices, series.high_prices, series.low_prices, series.volumes]) for series in output.universe]
+
+        universe = Universe()
+        for ((code, market), columns) in self._windows(ctx, 'series', input_data.code, input_data.market, input_data.tags, input_data.to_date, input_data.limit, read):
+            universe.add(CandlestickSeries(
+                code         = code,
+                market       = market,
+                dates        = columns[0].view('datetime64[D]'),
+                open_prices  = columns[1],
+                close_prices = columns[2],
+                high_prices  = columns[3],
+                low_prices   = columns[4],
+                volumes      = columns[5]
+                ))
+
+        return GetRangeSeriesOutput(
+                universe = universe
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Writes. The versions are bumped after the commit, so a reader never keeps the
+    # rows of before the commit under the new versions.
+    # ---------------------------------------------------------------------------------
+    def save(self, ctx: TxContext, input_data:SaveInput) -> SaveOutput:
+        self._written(ctx, [(input_data.candlestick.code, input_data.candlestick.market)])
+        return self.repository.save(ctx, input_data)
+
+    def save_bulk(self, ctx: TxContext, input_data:SaveBulkInput) -> SaveBulkOutput:
+        self._written(ctx, set([(stick.code, stick.market) for stick in input_data.candlesticks]))
+        return self.repository.save_bulk(ctx, input_data)
+
+    def save_tag(self, ctx: TxContext, input_data:SaveTagInput) -> SaveTagOutput:
+        self._written(ctx, [(input_data.stock.code, input_data.stock.market)])
+        return self.repository.save_tag(ctx, input_data)
+
+    def remove_tag(self, ctx: TxContext, input_data:RemoveTagInput) -> RemoveTagOutput:
+        # Any ticker may have had the tag.
+        self.writers.add(ctx)
+        ctx.on_commit(lambda: self.driver.bump_versions(['*']))
+        return self.repository.remove_tag(ctx, input_data)
+
+    def remove_ones_all(self, ctx: TxContext, input_data:RemoveOnesAllInput) -> RemoveOnesAllOutput:
+        self._written(ctx, [(input_data.code, input_data.market)])
+        return self.repository.remove_ones_all(ctx, input_data)
+
+    def save_delisting(self, ctx: TxContext, input_data:SaveDelistingInput) -> SaveDelistingOutput:
+        self._written(ctx, [(input_data.delisting.code, input_data.delisting.market)])
+        return self.repository.save_delisting(ctx, input_data)
+
+    def remove_delistings_ones_all(self, ctx: TxContext, input_data:RemoveDelistingsOnesAllInput) -> RemoveDelistingsOnesAllOutput:
+        self._written(ctx, [(input_data.code, input_data.market)])
+        return self.repository.remove_delistings_ones_all(ctx, input_data)
+
+    def _written(self, ctx: TxContext, tickers):
+        self.writers.add(ctx)
+        names = set([':'])
+        for (code, market) in tickers:
+            names.add(f"{market}:{code}")
+            names.add(f"{market}:")
+        ctx.on_commit(lambda: self.driver.bump_versions(sorted(names)))
+
+    # ---------------------------------------------------------------------------------
+    # Windows of the query. The tickers of the query and the windows are read from the
+    # driver, and only the missing windows are read from the repository. When the
+    # tickers of the query are not known, the whole query is read and kept.
+    # ---------------------------------------------------------------------------------
+    def _windows(self, ctx: TxContext, kind:str, code:str, market:str, tags:List[str], to_date:date, limit:int, read:Callable) -> List[Tuple[Tuple[str,str],List[np.ndarray]]]:
+        shape = f"{kind}:{to_date.isoformat()}:{limit}"
+        if market == '':
+            scopes = [':', '*']
+        elif code == '':
+            scopes = [f"{market}:", '*']
+        else:
+            scopes = [f"{market}:{code}", '*']
+        versions    = self.driver.get_versions(scopes)
+        members_key = f"window:members:{shape}:{market}:{code}:{','.join(sorted(tags))}:{'.'.join(map(str, versions))}"
+
+        members = self.driver.get_blobs([members_key])[0]
+        if members == None:
+            windows  = read(code, market, tags)
+            tickers  = [ticker for (ticker, _) in windows]
+            keys     = self._keys(shape, tickers)
+            # A write committed while reading bumped the versions of the scopes. Then the rows may be older than the versions.
+            if ctx not in self.writers and self.driver.get_versions(scopes) == versions:
+                blobs = {key: pack_arrays(columns, self.compress) for (key, (_, columns)) in zip(keys, windows)}
+                blobs[members_key] = '\n'.join([f"{c}\t{m}" for (c, m) in tickers]).encode()
+                self.driver.save_blobs(blobs, self.ttl)
+            return windows
+
+        tickers = [tuple(line.split('\t')) for line in members.decode().split('\n') if line != '']
+        keys    = self._keys(shape, tickers)
+        blobs   = self.driver.get_blobs(keys)
+
+        result  = list()
+        missing = dict()
+        for (ticker, key, blob) in zip(tickers, keys, blobs):
+            if blob == None:
+                for (_, columns) in read(ticker[0], ticker[1], []):
+                    missing[key] = pack_arrays(columns, self.compress)
+                    result.append((ticker, columns))
+            else:
+                result.append((ticker, unpack_arrays(blob)))
+        if len(missing) > 0 and ctx not in self.writers:
+            self.driver.save_blobs(missing, self.ttl)
+        return result
+
+    def _keys(self, shape:str, tickers:List[Tuple[str,str]]) -> List[str]:
+        versions = self.driver.get_versions([f"{market}:{code}" for (code, market) in tickers])
+        return [f"window:{shape}:{market}:{code}:{version}" for ((code, market), version) in zip(tickers, versions)]
+
+def _range_columns(sticks:List[Candlestick]) -> List[np.ndarray]:
+    scale = Decimal(10) ** PRICE_SCALE
+    return [
+            np.array([stick.date for stick in sticks], dtype='datetime64[D]').astype(np.int64),
+            np.array([int(stick.open_price * scale) for stick in sticks], dtype=np.int64),
+            np.array([int(stick.close_price * scale) for stick in sticks], dtype=np.int64),
+            np.array([int(stick.high_price * scale) for stick in sticks], dtype=np.int64),
+            np.array([int(stick.low_price * scale) for stick in sticks], dtype=np.int64),
+            np.array([stick.volume for stick in sticks], dtype=np.int64),
+            np.array([stick.patched for stick in sticks], dtype=np.uint8)
+            ]
+
+def _range_candlesticks(code:str, market:str, columns:List[np.ndarray]) -> List[Candlestick]:
+    (dates, open_prices, close_prices, high_prices, low_prices, volumes, patched) = columns
+    prices = [[Decimal(value).scaleb(-PRICE_SCALE) for value in array.tolist()] for array in (open_prices, close_prices, high_prices, low_prices)]
+    return [Candlestick.from_row(row) for row in zip([code] * len(dates), [market] * len(dates), dates.view('datetime64[D]').tolist(), *prices, volumes.tolist(), patched.tolist())]
@@ -0,0 +1,24 @@
+from app.repository.export           import StockExportRepository
+from app.repository.columnar.store   import write_market
+from app.repository.inputdata.stock  import *
+from app.repository.outputdata.stock import *
+
+# ---------------------------------------------------------------------------------
+# Export the candlesticks into the columnar files read by ColumnarStockRepository.
+# ---------------------------------------------------------------------------------
+class ColumnarStockExportRepository(StockExportRepository):
+    root: str
+
+    def __init__(self, root:str):
+        """
+        root: str the directory the markets are exported into.
+        """
+        self.root = root
+
+    def export_market(self, input_data:ExportMarketInput) -> ExportMarketOutput:
+        (tickers, candlesticks) = write_market(self.root, input_data.market, input_data.candlesticks, input_data.tags)
+
+        return ExportMarketOutput(
+                tickers      = tickers,
+                candlesticks = candlesticks
+                )
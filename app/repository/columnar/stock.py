@@ -0,0 +1,411 @@
+from __future__ import annotations
+from datetime import date
+from decimal import Decimal
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.util.exception import InvalidDataAppException, DataNotfoundAppException
+
+from app.repository.stock            import StockRepository
+from app.repository.transaction      import TxContext
+from app.repository.columnar.store   import MarketColumns, list_markets, current_generation, open_market
+
+from app.domain.stock import Candlestick, CandlestickSeries, Universe, Term
+
+from app.repository.inputdata.stock  import *
+from app.repository.outputdata.stock import *
+
+# ---------------------------------------------------------------------------------
+# Read-only StockRepository on the columnar files exported from the database.
+# The columns are memory-mapped, so a read is a slice of the rows of each ticker and
+# no query is sent. The prices are the quantized prices of Candlestick as float64.
+# The delistings, the ingestions and the tags without tickers are not exported, and
+# the writes raise InvalidDataAppException. The export is picked up at the next read.
+# ---------------------------------------------------------------------------------
+class ColumnarStockRepository(StockRepository):
+    root:    str
+    markets: Dict[str,MarketColumns]
+    lock:    Lock
+
+    def __init__(self, root:str):
+        """
+        root: str the directory the markets are exported into.
+        """
+        self.root    = root
+        self.markets = dict()
+        self.lock    = Lock()
+
+    # ---------------------------------------------------------------------------------
+    # Find candlestick.
+    # ---------------------------------------------------------------------------------
+    def find(self, ctx: TxContext, input_data:FindInput) -> FindOutput:
+        result = None
+        for (columns, code, start, end) in self._ticker(input_data.code, input_data.market):
+            i = start + int(np.searchsorted(columns.dates[start:end], np.datetime64(input_data.date, 'D')))
+            if i < end and columns.dates[i] == np.datetime64(input_data.date, 'D'):
+                result = _candlesticks(columns, code, i, i + 1)[0]
+
+        return FindOutput(
+                candlestick = result
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Find tags.
+    # ---------------------------------------------------------------------------------
+    def find_tag(self, ctx: TxContext, input_data:FindTagInput) -> FindTagOutput:
+        columns = self._market(input_data.market)
+
+        return FindTagOutput(
+                tags = [] if columns == None else list(columns.tags.get(input_data.code, []))
+                )
+
+    def find_tags(self, ctx: TxContext, input_data:FindTagsInput) -> FindTagsOutput:
+        columns = self._market(input_data.market)
+
+        return FindTagsOutput(
+                tags = {} if columns == None else {code: list(tags) for (code, tags) in columns.tags.items() if len(tags) > 0}
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Find candlesticks by keys.
+    # ---------------------------------------------------------------------------------
+    def find_bulk(self, ctx: TxContext, input_data:FindBulkInput) -> FindBulkOutput:
+        result = dict()
+        for (code, market, day) in input_data.keys:
+            stick = self.find(ctx, FindInput(code = code, market = market, date = day)).candlestick
+            if stick != None:
+                result[(code, market, day)] = stick
+
+        return FindBulkOutput(
+                candlesticks = result
+                )
+
+    # ---------------------------------------------------------------------------------
+    # The ingestions are not exported.
+    # ---------------------------------------------------------------------------------
+    def find_ingestion(self, ctx: TxContext, input_data:FindIngestionInput) -> FindIngestionOutput:
+        return FindIngestionOutput(
+                ingestion = None
+                )
+
+    def get_watermarks(self, ctx: TxContext, input_data:GetWatermarksInput) -> GetWatermarksOutput:
+        return GetWatermarksOutput(
+                watermarks = dict()
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Get candlesticks from from_date to to_date, oldest first.
+    # ---------------------------------------------------------------------------------
+    def get(self, ctx: TxContext, input_data:GetInput) -> GetOutput:
+        result = list()
+        for (columns, code, start, end) in self._ticker(input_data.code, input_data.market):
+            (start, end) = _between(columns, start, end, input_data.from_date, input_data.to_date)
+            result.extend(_candlesticks(columns, code, start, end)[::-1])
+
+        return GetOutput(
+                candlesticks = result
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Get one's all candlesticks in target code, newest first.
+    # ---------------------------------------------------------------------------------
+    def get_ones_all(self, ctx: TxContext, input_data:GetOnesAllInput) -> GetOnesAllOutput:
+        result = list()
+        for (columns, code, start, end) in self._ticker(input_data.code, input_data.market):
+            (start, end) = _between(columns, start, end, input_data.from_date, input_data.to_date)
+            result.extend(_candlesticks(columns, code, start, end))
+
+        return GetOnesAllOutput(
+                candlesticks = result
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Get all candlesticks in target market.
+    # ---------------------------------------------------------------------------------
+    def get_all(self, ctx: TxContext, input_data:GetAllInput) -> GetAllOutput:
+        output = self.stream_all(ctx, StreamAllInput(
+            market    = input_data.market,
+            tags      = input_data.tags,
+            from_date = input_data.from_date,
+            to_date   = input_data.to_date
+            ))
+
+        return GetAllOutput(
+                candlesticks = {code: sticks for (code, sticks) in output.candlesticks}
+                )
+
+    def stream_all(self, ctx: TxContext, input_data:StreamAllInput) -> StreamAllOutput:
+        tickers = self._tickers('', input_data.market, input_data.tags)
+
+        def generate():
+            for (columns, code, start, end) in tickers:
+                (start, end) = _between(columns, start, end, input_data.from_date, input_data.to_date)
+                if end > start:
+                    yield (code, _candlesticks(columns, code, start, end))
+
+        return StreamAllOutput(
+                candlesticks = generate()
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Get the first and the last candlesticks of each ticker in the term.
+    # ---------------------------------------------------------------------------------
+    def get_endpoints(self, ctx: TxContext, input_data:GetEndpointsInput) -> GetEndpointsOutput:
+        result = dict()
+        for (columns, code, start, end) in self._tickers('', input_data.market, input_data.tags):
+            (start, end) = _between(columns, start, end, input_data.from_date, input_data.to_date)
+            if end > start:
+                result[code] = GetEndpointsOutput.Endpoints(
+                        first = _candlesticks(columns, code, start, start + 1)[0],
+                        last  = _candlesticks(columns, code, end - 1, end)[0]
+                        )
+
+        return GetEndpointsOutput(
+                endpoints = result
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Get each candlesticks at the offsets from today in target market.
+    # ---------------------------------------------------------------------------------
+    def get_each(self, ctx: TxContext, input_data:GetEachInput) -> GetEachOutput:
+        output = self.get_each_offsets(ctx, GetEachOffsetsInput(
+            market  = input_data.market,
+            tags    = input_data.tags,
+            offsets = [input_data.offset],
+            today   = input_data.today
+            ))
+
+        return GetEachOutput(
+                candlesticks = output.candlesticks[input_data.offset]
+                )
+
+    def get_each_offsets(self, ctx: TxContext, input_data:GetEachOffsetsInput) -> GetEachOffsetsOutput:
+        result = {offset: dict() for offset in input_data.offsets}
+        for (columns, code, start, end) in self._tickers('', input_data.market, input_data.tags):
+            (start, end) = _between(columns, start, end, None, input_data.today)
+            for offset in input_data.offsets:
+                if end - 1 - offset >= start:
+                    result[offset][code] = _candlesticks(columns, code, end - 1 - offset, end - offset)[0]
+
+        return GetEachOffsetsOutput(
+                candlesticks = result
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Get the last `limit` candlesticks of each ticker until to_date.
+    # ---------------------------------------------------------------------------------
+    def get_range(self, ctx: TxContext, input_data:GetRangeInput) -> GetRangeOutput:
+        result = dict()
+        for (columns, code, start, end) in self._tickers(input_data.code, input_data.market, input_data.tags):
+            (start, end) = _between(columns, start, end, None, input_data.to_date)
+            if end > start:
+                result.setdefault(code, []).extend(_candlesticks(columns, code, max(start, end - input_data.limit), end))
+
+        return GetRangeOutput(
+                candlesticks = result
+                )
+
+    def get_range_series(self, ctx: TxContext, input_data:GetRangeSeriesInput) -> GetRangeSeriesOutput:
+        universe = Universe()
+        for (columns, code, start, end) in self._tickers(input_data.code, input_data.market, input_data.tags):
+            (start, end) = _between(columns, start, end, None, input_data.to_date)
+            if end > start:
+                start = max(start, end - input_data.limit)
+                universe.add(CandlestickSeries(
+                    code         = code,
+                    market       = columns.market,
+                    dates        = columns.dates[start:end],
+                    open_prices  = columns.open[start:end],
+                    close_prices = columns.close[start:end],
+                    high_prices  = columns.high[start:end],
+                    low_prices   = columns.low[start:end],
+                    volumes      = columns.volume[start:end]
+                    ))
+
+        return GetRangeSeriesOutput(
+                universe = universe
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Search tickers, markets and tags. The keyword is matched ignoring the case as LIKE.
+    # ---------------------------------------------------------------------------------
+    def search_tickers(self, ctx: TxContext, input_data:SearchTickersInput) -> SearchTickersOutput:
+        keyword = input_data.keyword.lower()
+
+        return SearchTickersOutput(
+                tickers = [SearchTickersOutput.Ticker(
+                    code   = code,
+                    market = columns.market
+                    ) for (columns, code, _, _) in self._tickers('', '', []) if keyword in code.lower()]
+                )
+
+    def search_markets(self, ctx: TxContext, input_data:SearchMarketsInput) -> SearchMarketsOutput:
+        keyword = input_data.keyword.lower()
+
+        return SearchMarketsOutput(
+                markets = [market for market in list_markets(self.root) if keyword in market.lower()]
+                )
+
+    def search_tags(self, ctx: TxContext, input_data:SearchTagsInput) -> SearchTagsOutput:
+        keyword = input_data.keyword.lower()
+
+        tags = set()
+        for market in list_markets(self.root):
+            for names in self._market(market).tags.values():
+                tags.update(names)
+
+        return SearchTagsOutput(
+                tags = sorted([tag for tag in tags if keyword in tag.lower()])
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Get stock data info.
+    # ---------------------------------------------------------------------------------
+    def get_stockdatainfo(self, ctx: TxContext, input_data:GetStockdatainfoInput) -> GetStockdatainfoOutput:
+        tickers = self._ticker(input_data.code, input_data.market)
+        if len(tickers) == 0 or tickers[0][2] == tickers[0][3]:
+            raise DataNotfoundAppException()
+
+        (columns, _, start, end) = tickers[0]
+        return GetStockdatainfoOutput(
+                first_date      = columns.dates[start].astype(date),
+                last_date       = columns.dates[end - 1].astype(date),
+                close_price_ath = _decimal(columns.close[start:end].max()),
+                close_price_atl = _decimal(columns.close[start:end].min()),
+                high_price_ath  = _decimal(columns.high[start:end].max()),
+                low_price_atl   = _decimal(columns.low[start:end].min())
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Get tickers in target market.
+    # ---------------------------------------------------------------------------------
+    def get_tickers(self, ctx: TxContext, input_data:GetTickersInput) -> GetTickersOutput:
+        columns = self._market(input_data.market)
+
+        return GetTickersOutput(
+                tickers = [] if columns == None else [GetTickersOutput.Ticker(
+                    code   = code,
+                    market = columns.market
+                    ) for code in columns.codes]
+                )
+
+    # ---------------------------------------------------------------------------------
+    # The delistings are not exported.
+    # ---------------------------------------------------------------------------------
+    def find_delisting(self, ctx: TxContext, input_data:FindDelistingInput) -> FindDelistingOutput:
+        return FindDelistingOutput(
+                delisting = None
+                )
+
+    def get_delistings_ones_all(self, ctx: TxContext, input_data:GetDelistingsOnesAllInput) -> GetDelistingsOnesAllOutput:
+        return GetDelistingsOnesAllOutput(
+                delistings = []
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Get all term information of candlesticks.
+    # ---------------------------------------------------------------------------------
+    def get_all_term(self, ctx: TxContext, input_data:GetAllTermInput) -> GetAllTermOutput:
+        return GetAllTermOutput(
+                terms = [Term(
+                    code       = code,
+                    market     = columns.market,
+                    first_date = columns.dates[start].astype(date),
+                    last_date  = columns.dates[end - 1].astype(date)
+                    ) for (columns, code, start, end) in self._tickers('', '', []) if end > start]
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Writes. The data is changed in the database and exported again.
+    # ---------------------------------------------------------------------------------
+    def save(self, ctx: TxContext, input_data:SaveInput) -> SaveOutput:
+        raise InvalidDataAppException()
+
+    def save_bulk(self, ctx: TxContext, input_data:SaveBulkInput) -> SaveBulkOutput:
+        raise InvalidDataAppException()
+
+    def save_ingestion(self, ctx: TxContext, input_data:SaveIngestionInput) -> SaveIngestionOutput:
+        raise InvalidDataAppException()
+
+    def save_watermarks(self, ctx: TxContext, input_data:SaveWatermarksInput) -> SaveWatermarksOutput:
+        raise InvalidDataAppException()
+
+    def save_tag(self, ctx: TxContext, input_data:SaveTagInput) -> SaveTagOutput:
+        raise InvalidDataAppException()
+
+    def remove_ones_all(self, ctx: TxContext, input_data:RemoveOnesAllInput) -> RemoveOnesAllOutput:
+        raise InvalidDataAppException()
+
+    def save_delisting(self, ctx: TxContext, input_data:SaveDelistingInput) -> SaveDelistingOutput:
+        raise InvalidDataAppException()
+
+    def remove_delistings_ones_all(self, ctx: TxContext, input_data:RemoveDelistingsOnesAllInput) -> RemoveDelistingsOnesAllOutput:
+        raise InvalidDataAppException()
+
+    def remove_tag(self, ctx: TxContext, input_data:RemoveTagInput) -> RemoveTagOutput:
+        raise InvalidDataAppException()
+
+    # ---------------------------------------------------------------------------------
+    # The columns of the market, opened again when a new generation is exported.
+    # ---------------------------------------------------------------------------------
+    def _market(self, market:str) -> Optional[MarketColumns]:
+        generation = None if market == '' else current_generation(self.root, market)
+        if generation == None:
+            return None
+        with self.lock:
+            columns = self.markets.get(market)
+            if columns == None or columns.generation != generation:
+                columns = open_market(self.root, market, generation)
+                self.markets[market] = columns
+        return columns
+
+    # ---------------------------------------------------------------------------------
+    # The rows of the ticker. The market is not a filter here, so '' is no market.
+    # ---------------------------------------------------------------------------------
+    def _ticker(self, code:str, market:str) -> List[Tuple[MarketColumns,str,int,int]]:
+        columns = self._market(market)
+        span    = None if columns == None else columns.span(code)
+        return [] if span == None else [(columns, code, span[0], span[1])]
+
+    # ---------------------------------------------------------------------------------
+    # The rows of the tickers of the query, ordered by (code, market) as the database.
+    # '' is every market and every code.
+    # ---------------------------------------------------------------------------------
+    def _tickers(self, code:str, market:str, tags:List[str]) -> List[Tuple[MarketColumns,str,int,int]]:
+        markets = list_markets(self.root) if market == '' else [market]
+
+        result = list()
+        for columns in [self._market(market) for market in markets]:
+            if columns == None:
+                continue
+            for ticker in ([code] if code != '' else columns.codes):
+                span = columns.span(ticker)
+                if span == None:
+                    continue
+                if tags != [] and not any([tag in tags for tag in columns.tags.get(ticker, [])]):
+                    continue
+                result.append((columns, ticker, span[0], span[1]))
+
+        if len(markets) > 1:
+            result.sort(key=lambda x: (x[1], x[0].market))
+        return result
+
+# The rows from from_date to to_date in start:end. None is not bounded.
+def _between(columns:MarketColumns, start:int, end:int, from_date:Optional[date], to_date:Optional[date]) -> Tuple[int,int]:
+    dates = columns.dates[start:end]
+    first = 0 if from_date == None else int(np.searchsorted(dates, np.datetime64(from_date, 'D'), side='left'))
+    last  = len(dates) if to_date == None else int(np.searchsorted(dates, np.datetime64(to_date, 'D'), side='right'))
+    return (start + first, start + max(first, last))
+
+# The candlesticks of the rows start:end, newest first as the database returns.
+def _candlesticks(columns:MarketColumns, code:str, start:int, end:int) -> List[Candlestick]:
+    length = end - start
+    rows   = slice(end - 1, start - 1 if start > 0 else None, -1)
+    prices = [[Decimal(repr(value)) for value in array[rows].tolist()] for array in (columns.open, columns.close, columns.high, columns.low)]
+    return [Candlestick.from_row(row) for row in zip([code] * length, [columns.market] * length, columns.dates[rows].tolist(), *prices, columns.volume[rows].tolist(), columns.patched[rows].astype(bool).tolist())]
+
+# Decimal of the price as Float(asdecimal=True) of the database makes it.
+def _decimal(value:float) -> Decimal:
+    return Decimal('%.10f' % value)
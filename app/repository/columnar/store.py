@@ -0,0 +1,167 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from app.domain.stock import Candlestick
+
+# The columns of a market, one raw little endian file each, in the order of (ticker, date).
+COLUMNS = (
+        ('dates',   np.dtype('<i8')), # days since 1970-01-01
+        ('open',    np.dtype('<f8')),
+        ('close',   np.dtype('<f8')),
+        ('high',    np.dtype('<f8')),
+        ('low',     np.dtype('<f8')),
+        ('volume',  np.dtype('<i8')),
+        ('patched', np.dtype('u1'))
+        )
+FORMAT  = 1
+CURRENT = 'CURRENT'
+
+# ---------------------------------------------------------------------------------
+# Memory-mapped columns of one market.
+# Each ticker has the rows offsets[i]:offsets[i+1] of every column, oldest first.
+# The files are never changed after they are written, so the arrays are shared
+# read-only by the readers.
+# ---------------------------------------------------------------------------------
+class MarketColumns:
+    market:     str
+    generation: str
+    codes:      List[str]
+    tags:       Dict[str,List[str]]
+    index:      Dict[str,int]
+    offsets:    np.ndarray # int64
+    dates:      np.ndarray # datetime64[D]
+    open:       np.ndarray # float64
+    close:      np.ndarray # float64
+    high:       np.ndarray # float64
+    low:        np.ndarray # float64
+    volume:     np.ndarray # int64
+    patched:    np.ndarray # uint8
+
+    def __init__(self, directory:str, market:str, generation:str):
+        """
+        directory:  str the directory of the generation.
+        market:     str
+        generation: str
+        """
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['format'] != FORMAT:
+            raise ValueError(f"unknown columnar format {meta['format']} in {directory}")
+
+        self.market     = market
+        self.generation = generation
+        self.codes      = meta['codes']
+        self.tags       = meta['tags']
+        self.index      = {code: i for (i, code) in enumerate(self.codes)}
+        self.offsets    = _map(os.path.join(directory, 'offsets.bin'), np.dtype('<i8'), len(self.codes) + 1)
+        for (name, dtype) in COLUMNS:
+            setattr(self, name, _map(os.path.join(directory, name + '.bin'), dtype, meta['rows']))
+        self.dates = self.dates.view('datetime64[D]')
+
+    def span(self, code:str) -> Optional[Tuple[int,int]]:
+        """
+        code:   str
+        return (span: Optional[Tuple[int,int]]) the rows of the ticker, or None when it is not in the market.
+        """
+        i = self.index.get(code)
+        if i == None:
+            return None
+        return (int(self.offsets[i]), int(self.offsets[i + 1]))
+
+def _map(path:str, dtype:np.dtype, length:int) -> np.ndarray:
+    # mmap can not map an empty file.
+    if length == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+
+# ---------------------------------------------------------------------------------
+# Generations of a market directory. A new export is written into a new directory,
+# and then CURRENT is replaced to point it, so the readers see either the old or
+# the new one. The previous generation is kept for the readers still opening it.
+# ---------------------------------------------------------------------------------
+def list_markets(root:str) -> List[str]:
+    if not os.path.isdir(root):
+        return []
+    return sorted([name for name in os.listdir(root) if os.path.isfile(os.path.join(root, name, CURRENT))])
+
+def current_generation(root:str, market:str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, market, CURRENT), encoding='utf-8') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+def open_market(root:str, market:str, generation:str) -> MarketColumns:
+    return MarketColumns(os.path.join(root, market, generation), market, generation)
+
+def write_market(root:str, market:str, candlesticks:Iterable[Tuple[str,List[Candlestick]]], tags:Dict[str,List[str]]) -> Tuple[int,int]:
+    """
+    root:         str
+    market:       str
+    candlesticks: Iterable[Tuple[str,List[Candlestick]]] (code, candlesticks newest first) ordered by the code, as StockRepository.stream_all yields.
+    tags:         Dict[str,List[str]] the tags of each code.
+    return (tickers: int, rows: int)
+    """
+    if market in ('', '.', '..') or os.sep in market:
+        raise ValueError(f"invalid market name '{market}'")
+
+    previous   = current_generation(root, market)
+    generation = str(time.time_ns())
+    directory  = os.path.join(root, market, generation)
+    os.makedirs(directory)
+
+    # A failed export leaves the current generation as it is, and its own directory is removed.
+    try:
+        # The columns are appended ticker by ticker, so the market is never held in memory at once.
+        codes   = list()
+        offsets = [0]
+        files   = {name: open(os.path.join(directory, name + '.bin'), 'wb') for (name, _) in COLUMNS}
+        try:
+            for (code, sticks) in candlesticks:
+                sticks = sticks[::-1]
+                columns = {
+                        'dates':   np.array([stick.date for stick in sticks], dtype='datetime64[D]').astype(np.int64),
+                        'open':    np.array([float(stick.open_price) for stick in sticks]),
+                        'close':   np.array([float(stick.close_price) for stick in sticks]),
+                        'high':    np.array([float(stick.high_price) for stick in sticks]),
+                        'low':     np.array([float(stick.low_price) for stick in sticks]),
+                        'volume':  np.array([stick.volume for stick in sticks]),
+                        'patched': np.array([bool(stick.patched) for stick in sticks])
+                        }
+                for (name, dtype) in COLUMNS:
+                    columns[name].astype(dtype).tofile(files[name])
+                codes.append(code)
+                offsets.append(offsets[-1] + len(sticks))
+        finally:
+            for f in files.values():
+                f.close()
+
+        np.array(offsets, dtype='<i8').tofile(os.path.join(directory, 'offsets.bin'))
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'format': FORMAT,
+                'market': market,
+                'rows':   offsets[-1],
+                'codes':  codes,
+                'tags':   {code: tags.get(code, []) for code in codes}
+                }, f)
+
+        current = os.path.join(root, market, CURRENT)
+        with open(current + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(generation)
+        os.replace(current + '.tmp', current)
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+    for name in os.listdir(os.path.join(root, market)):
+        if name not in (generation, previous, CURRENT) and os.path.isdir(os.path.join(root, market, name)):
+            shutil.rmtree(os.path.join(root, market, name), ignore_errors=True)
+
+    return (len(codes), offsets[-1])
@@ -0,0 +1,14 @@
+from abc import ABCMeta, abstractmethod
+
+from app.repository.inputdata.stock  import *
+from app.repository.outputdata.stock import *
+
+class StockExportRepository(metaclass=ABCMeta):
+    @abstractmethod
+    def export_market(self, input_data:ExportMarketInput) -> ExportMarketOutput:
+        """
+        Replace the exported candlesticks of the market with the given ones.
+        input_data: ExportMarketInput candlesticks grouped by ticker, newest first, as StockRepository.stream_all yields.
+        return (output: ExportMarketOutput)
+        """
+        raise NotImplementedError
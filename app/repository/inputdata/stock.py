@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Tuple, Dict, Iterable
 from datetime import date
 
 from app.domain.stock import *
@@ -15,10 +15,38 @@ class FindTagInput:
     code:   str
     market: str
 
+@dataclass
+class FindTagsInput:
+    market: str
+
 @dataclass
 class SaveInput:
     candlestick: Candlestick
 
+@dataclass
+class FindBulkInput:
+    keys: List[Tuple[str, str, date]]
+
+@dataclass
+class SaveBulkInput:
+    candlesticks: List[Candlestick]
+
+@dataclass
+class FindIngestionInput:
+    path: str
+
+@dataclass
+class SaveIngestionInput:
+    ingestion: Ingestion
+
+@dataclass
+class GetWatermarksInput:
+    tickers: List[Tuple[str, str]]
+
+@dataclass
+class SaveWatermarksInput:
+    watermarks: Dict[Tuple[str, str], Watermark]
+
 @dataclass
 class SaveTagInput:
     stock: Stock
@@ -44,6 +72,20 @@ class GetAllInput:
     from_date: date
     to_date:   date
 
+@dataclass
+class StreamAllInput:
+    market:    str
+    tags:      List[str]
+    from_date: date
+    to_date:   date
+
+@dataclass
+class GetEndpointsInput:
+    market:    str
+    tags:      List[str]
+    from_date: date
+    to_date:   date
+
 @dataclass
 class GetEachInput:
     market: str
@@ -51,6 +93,13 @@ class GetEachInput:
     offset: int
     today:  date
 
+@dataclass
+class GetEachOffsetsInput:
+    market:  str
+    tags:    List[str]
+    offsets: List[int]
+    today:   date
+
 @dataclass
 class GetRangeInput:
     code:    str
@@ -59,6 +108,14 @@ class GetRangeInput:
     to_date: date
     limit:   str
 
+@dataclass
+class GetRangeSeriesInput:
+    code:    str
+    market:  str
+    tags:    List[str]
+    to_date: date
+    limit:   int
+
 @dataclass
 class SearchTickersInput:
     keyword: str
@@ -114,3 +171,9 @@ class GetAllTermInput:
 @dataclass
 class RemoveTagInput:
     tagname: str
+
+@dataclass
+class ExportMarketInput:
+    market:       str
+    candlesticks: Iterable[Tuple[str, List[Candlestick]]]
+    tags:         Dict[str, List[str]]
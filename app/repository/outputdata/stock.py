@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import List, Dict, Tuple, Iterator
 
 from app.domain.stock import *
 
@@ -11,10 +11,38 @@ class FindOutput:
 class FindTagOutput:
     tags: List[str]
 
+@dataclass
+class FindTagsOutput:
+    tags: Dict[str, List[str]]
+
 @dataclass
 class SaveOutput:
     pass
 
+@dataclass
+class FindBulkOutput:
+    candlesticks: Dict[Tuple[str, str, date], Candlestick]
+
+@dataclass
+class SaveBulkOutput:
+    pass
+
+@dataclass
+class FindIngestionOutput:
+    ingestion: Ingestion
+
+@dataclass
+class SaveIngestionOutput:
+    pass
+
+@dataclass
+class GetWatermarksOutput:
+    watermarks: Dict[Tuple[str, str], Watermark]
+
+@dataclass
+class SaveWatermarksOutput:
+    pass
+
 @dataclass
 class SaveTagOutput:
     pass
@@ -31,14 +59,35 @@ class GetOnesAllOutput:
 class GetAllOutput:
     candlesticks: Dict[str, List[Candlestick]]
 
+@dataclass
+class StreamAllOutput:
+    candlesticks: Iterator[Tuple[str, List[Candlestick]]]
+
+@dataclass
+class GetEndpointsOutput:
+    @dataclass
+    class Endpoints:
+        first: Candlestick
+        last:  Candlestick
+
+    endpoints: Dict[str, Endpoints]
+
 @dataclass
 class GetEachOutput:
     candlesticks: Dict[str, Candlestick]
 
+@dataclass
+class GetEachOffsetsOutput:
+    candlesticks: Dict[int, Dict[str, Candlestick]]
+
 @dataclass
 class GetRangeOutput:
     candlesticks: Dict[str, Candlestick]
 
+@dataclass
+class GetRangeSeriesOutput:
+    universe: Universe
+
 @dataclass
 class SearchTickersOutput:
     @dataclass
@@ -101,3 +150,8 @@ class GetAllTermOutput:
 @dataclass
 class RemoveTagOutput:
     pass
+
+@dataclass
+class ExportMarketOutput:
+    tickers:      int
+    candlesticks: int
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import (Column, String, Date, Integer, Float, Boolean, ForeignKey)
+from sqlalchemy import (Column, String, Date, Integer, BigInteger, Float, Boolean, ForeignKey)
 
 Base = declarative_base()
 
@@ -57,3 +57,25 @@ class DtoDelisting(Base):
 
     def __repr__(self):
         return "<Delistings(code='%s', market='%s', date='%s', open_price='%s', close_price='%s', high_price='%s', low_price='%s', volume='%s', patched='%s')>" % (self.code, self.market, self.date, self.open_price, self.high_price, self.low_price, self.volume, self.patched)
+
+class DtoIngestion(Base):
+    __tablename__ = 'ingestions'
+
+    path         = Column('path', String(512), primary_key=True)
+    size         = Column('size', BigInteger)
+    hash         = Column('hash', String(64))
+    row_count    = Column('row_count', Integer)
+
+    def __repr__(self):
+        return "<DtoIngestion(path='%s', size='%s', hash='%s', row_count='%s')>" % (self.path, self.size, self.hash, self.row_count)
+
+class DtoIngestionWatermark(Base):
+    __tablename__ = 'ingestion_watermarks'
+
+    code         = Column('code', String(20), primary_key=True)
+    market       = Column('market', String(20), primary_key=True)
+    first_date   = Column('first_date', Date)
+    last_date    = Column('last_date', Date)
+
+    def __repr__(self):
+        return "<DtoIngestionWatermark(code='%s', market='%s', first_date='%s', last_date='%s')>" % (self.code, self.market, self.first_date, self.last_date)
@@ -1,11 +1,14 @@
-from app.repository.sqlalchemy.dto.stock import DtoCandlestick, DtoTag, DtoStockTag, DtoDelisting
-from sqlalchemy import func, and_
+from app.repository.sqlalchemy.dto.stock import DtoCandlestick, DtoTag, DtoStockTag, DtoDelisting, DtoIngestion, DtoIngestionWatermark
+from sqlalchemy import func, and_, or_, tuple_, text, literal_column, type_coerce, Float
+from sqlalchemy.dialects.mysql      import insert as mysql_insert
+from sqlalchemy.dialects.sqlite     import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
 from app.util.exception import InvalidDataAppException
 
 from app.repository.stock import StockRepository
 from app.repository.transaction import TxContext
 
-from app.domain.stock import Candlestick, Interval
+from app.domain.stock import Candlestick, CandlestickSeries, Universe, Interval, Ingestion, Watermark
 
 from app.repository.inputdata.stock  import *
 from app.repository.outputdata.stock import *
@@ -66,6 +69,28 @@ class SqlalchemyStockRepository(StockRepository):
                 tags = result
                 )
 
+    # ---------------------------------------------------------------------------------
+    # Find tags of every ticker in the market at once.
+    # ---------------------------------------------------------------------------------
+    def find_tags(self, ctx: TxContext, input_data:FindTagsInput) -> FindTagsOutput:
+        market = input_data.market
+
+        tx = ctx.get_tx()
+        dto_tags = tx.query(DtoStockTag.code, DtoTag.name).join(DtoTag, DtoStockTag.tag_id == DtoTag.id).filter(
+                DtoStockTag.market == market
+                ).order_by(
+                DtoStockTag.code,
+                DtoTag.id
+                )
+
+        result = dict()
+        for dto_tag in dto_tags:
+            result.setdefault(dto_tag.code, []).append(dto_tag.name)
+
+        return FindTagsOutput(
+                tags = result
+                )
+
     # ---------------------------------------------------------------------------------
     # Create candlestick.
     # ---------------------------------------------------------------------------------
@@ -96,6 +121,181 @@ class SqlalchemyStockRepository(StockRepository):
 
         return SaveOutput()
 
+    # ---------------------------------------------------------------------------------
+    # Find candlesticks by keys in one query.
+    # ---------------------------------------------------------------------------------
+    def find_bulk(self, ctx: TxContext, input_data:FindBulkInput) -> FindBulkOutput:
+        keys = input_data.keys
+
+        if len(keys) == 0:
+            return FindBulkOutput(candlesticks = dict())
+
+        # Group dates by ticker so the filter can use the primary key index.
+        dates = dict()
+        for code, market, date in keys:
+            dates.setdefault((code, market), set()).add(date)
+
+        filters = [and_(
+            DtoCandlestick.code   == code,
+            DtoCandlestick.market == market,
+            DtoCandlestick.date.in_(list(ticker_dates))
+            ) for (code, market), ticker_dates in dates.items()]
+
+        tx = ctx.get_tx()
+        dto_candlesticks = tx.query(DtoCandlestick).filter(or_(*filters))
+
+        result = dict()
+        for dto in dto_candlesticks:
+            result[(dto.code, dto.market, dto.date)] = Candlestick(
+                    code        = dto.code,
+                    market      = dto.market,
+                    date        = dto.date,
+                    open_price  = dto.open_price,
+                    close_price = dto.close_price,
+                    high_price  = dto.high_price,
+                    low_price   = dto.low_price,
+                    volume      = dto.volume,
+                    interval    = Interval.DAILY,
+                    patched     = dto.patched
+                    )
+
+        return FindBulkOutput(
+                candlesticks = result
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Create or update candlesticks with multi-row upsert.
+    # ---------------------------------------------------------------------------------
+    def save_bulk(self, ctx: TxContext, input_data:SaveBulkInput) -> SaveBulkOutput:
+        candlesticks = input_data.candlesticks
+
+        # Later rows win over earlier rows of the same key, same as repeated save.
+        rows = dict()
+        for candlestick in candlesticks:
+            rows[(candlestick.code, candlestick.market, candlestick.date)] = {
+                    'code':    candlestick.code,
+                    'market':  candlestick.market,
+                    'date':    candlestick.date,
+                    'open':    candlestick.open_price,
+                    'close':   candlestick.close_price,
+                    'high':    candlestick.high_price,
+                    'low':     candlestick.low_price,
+                    'volume':  candlestick.volume,
+                    'patched': candlestick.patched
+                    }
+        if len(rows) == 0:
+            return SaveBulkOutput()
+
+        tx = ctx.get_tx()
+        table   = DtoCandlestick.__table__
+        updates = ['open', 'close', 'high', 'low', 'volume']
+        dialect = tx.get_bind().dialect.name
+
+        if dialect == 'mysql':
+            stmt = mysql_insert(table).values(list(rows.values()))
+            stmt = stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in updates})
+        elif dialect in ('sqlite', 'postgresql'):
+            insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+            stmt = insert(table).values(list(rows.values()))
+            stmt = stmt.on_conflict_do_update(
+                    index_elements = ['code', 'market', 'date'],
+                    set_           = {name: stmt.excluded[name] for name in updates}
+                    )
+        else:
+            for candlestick in candlesticks:
+                self.save(ctx, SaveInput(candlestick = candlestick))
+            return SaveBulkOutput()
+
+        tx.execute(stmt)
+
+        return SaveBulkOutput()
+
+    # ---------------------------------------------------------------------------------
+    # Find ingestion manifest of the file.
+    # ---------------------------------------------------------------------------------
+    def find_ingestion(self, ctx: TxContext, input_data:FindIngestionInput) -> FindIngestionOutput:
+        path = input_data.path
+
+        tx = ctx.get_tx()
+        dto_ingestion = tx.query(DtoIngestion).get(path)
+        if dto_ingestion == None:
+            return FindIngestionOutput(
+                    ingestion = None
+                    )
+
+        return FindIngestionOutput(
+                ingestion = Ingestion(
+                    path      = dto_ingestion.path,
+                    size      = dto_ingestion.size,
+                    hash      = dto_ingestion.hash,
+                    row_count = dto_ingestion.row_count
+                    )
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Create or update ingestion manifest of the file.
+    # ---------------------------------------------------------------------------------
+    def save_ingestion(self, ctx: TxContext, input_data:SaveIngestionInput) -> SaveIngestionOutput:
+        ingestion = input_data.ingestion
+
+        tx = ctx.get_tx()
+        dto_ingestion = tx.query(DtoIngestion).get(ingestion.path)
+
+        if dto_ingestion == None:
+            tx.add(DtoIngestion( 
+                path      = ingestion.path, 
+                size      = ingestion.size, 
+                hash      = ingestion.hash, 
+                row_count = ingestion.row_count
+                ))
+        else:
+            dto_ingestion.size      = ingestion.size
+            dto_ingestion.hash      = ingestion.hash
+            dto_ingestion.row_count = ingestion.row_count
+
+        return SaveIngestionOutput()
+
+    # ---------------------------------------------------------------------------------
+    # Get the loaded dates of tickers.
+    # ---------------------------------------------------------------------------------
+    def get_watermarks(self, ctx: TxContext, input_data:GetWatermarksInput) -> GetWatermarksOutput:
+        tickers = input_data.tickers
+
+        if len(tickers) == 0:
+            return GetWatermarksOutput(watermarks = dict())
+
+        tx = ctx.get_tx()
+        dto_watermarks = tx.query(DtoIngestionWatermark).filter(or_(*[and_(
+            DtoIngestionWatermark.code   == code,
+            DtoIngestionWatermark.market == market
+            ) for (code, market) in set(tickers)]))
+
+        return GetWatermarksOutput(
+                watermarks = {(dto.code, dto.market): Watermark(first_date = dto.first_date, last_date = dto.last_date) for dto in dto_watermarks}
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Replace the loaded dates of tickers.
+    # ---------------------------------------------------------------------------------
+    def save_watermarks(self, ctx: TxContext, input_data:SaveWatermarksInput) -> SaveWatermarksOutput:
+        watermarks = input_data.watermarks
+
+        tx = ctx.get_tx()
+        for ((code, market), watermark) in watermarks.items():
+            dto_watermark = tx.query(DtoIngestionWatermark).get((code, market))
+            if dto_watermark == None:
+                tx.add(DtoIngestionWatermark(
+                    code       = code,
+                    market     = market,
+                    first_date = watermark.first_date,
+                    last_date  = watermark.last_date
+                    ))
+            else:
+                dto_watermark.first_date = watermark.first_date
+                dto_watermark.last_date  = watermark.last_date
+
+        return SaveWatermarksOutput()
+
     # ---------------------------------------------------------------------------------
     # Create tags.
     # ---------------------------------------------------------------------------------
@@ -206,39 +406,154 @@ class SqlalchemyStockRepository(StockRepository):
     # Get all candlesticks in target market.
     # ---------------------------------------------------------------------------------
     def get_all(self, ctx: TxContext, input_data:GetAllInput) -> GetAllOutput:
+        output = self.stream_all(ctx, StreamAllInput(
+            market    = input_data.market,
+            tags      = input_data.tags,
+            from_date = input_data.from_date,
+            to_date   = input_data.to_date
+            ))
+
+        return GetAllOutput(
+                candlesticks = {code: sticks for (code, sticks) in output.candlesticks}
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Stream all candlesticks in target market grouped by ticker. Consume it in the transaction.
+    # ---------------------------------------------------------------------------------
+    def stream_all(self, ctx: TxContext, input_data:StreamAllInput) -> StreamAllOutput:
         market    = input_data.market
         tags      = input_data.tags
         from_date = input_data.from_date
         to_date   = input_data.to_date
 
-        filters   = []
-        filters.append(and_(
-            DtoCandlestick.date   >= from_date, 
-            DtoCandlestick.date   <= to_date
-            ))
+        tx = ctx.get_tx()
+        filters = self._candlestick_filters(tx, '', market, tags, to_date)
+        if from_date != None: 
+            filters.append(and_(DtoCandlestick.date >= from_date))
+
+        query = tx.query(DtoCandlestick).filter(
+                *filters
+                ).order_by(DtoCandlestick.code.asc(), DtoCandlestick.market.asc(), DtoCandlestick.date.desc())
+
+        def generate():
+            key    = None
+            sticks = []
+            for dto in query.yield_per(1000):
+                if key != (dto.code, dto.market):
+                    if len(sticks) > 0:
+                        yield (key[0], sticks)
+                    key    = (dto.code, dto.market)
+                    sticks = []
+                sticks.append(
+                        Candlestick( 
+                            code        = dto.code,
+                            market      = dto.market,
+                            date        = dto.date,
+                            open_price  = dto.open_price,
+                            close_price = dto.close_price,
+                            high_price  = dto.high_price,
+                            low_price   = dto.low_price,
+                            volume      = dto.volume,
+                            patched     = dto.patched,
+                            interval    = Interval.DAILY
+                            )
+                        )
+            if len(sticks) > 0:
+                yield (key[0], sticks)
+
+        return StreamAllOutput(
+                candlesticks = generate()
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Get the first and the last candlesticks of each ticker in the term.
+    # ---------------------------------------------------------------------------------
+    def get_endpoints(self, ctx: TxContext, input_data:GetEndpointsInput) -> GetEndpointsOutput:
+        market    = input_data.market
+        tags      = input_data.tags
+        from_date = input_data.from_date
+        to_date   = input_data.to_date
 
         tx = ctx.get_tx()
-        query = tx.query(DtoCandlestick)
-        if market != '':
-            filters.append(and_(DtoCandlestick.market == market))
+        filters = self._candlestick_filters(tx, '', market, tags, to_date)
+        filters.append(and_(DtoCandlestick.date >= from_date))
+
+        terms = tx.query(
+                DtoCandlestick.code.label('code'),
+                DtoCandlestick.market.label('market'),
+                func.min(DtoCandlestick.date).label('first_date'),
+                func.max(DtoCandlestick.date).label('last_date')
+                ).filter(*filters).group_by(DtoCandlestick.code, DtoCandlestick.market).subquery()
+
+        dto_candlesticks = tx.query(DtoCandlestick, terms.c.first_date).join(terms, and_(
+            DtoCandlestick.code   == terms.c.code,
+            DtoCandlestick.market == terms.c.market,
+            or_(DtoCandlestick.date == terms.c.first_date, DtoCandlestick.date == terms.c.last_date)
+            ))
 
-        if tags != []:
-            filters.append(and_(DtoTag.name.in_(tags)))
-            query = query.join(DtoStockTag, and_( 
-                DtoStockTag.code == DtoCandlestick.code, 
-                DtoStockTag.market == DtoCandlestick.market
-                )).join(DtoTag, DtoStockTag.tag_id == DtoTag.id)
+        first_sticks = dict()
+        last_sticks  = dict()
+        for (dto, first_date) in dto_candlesticks:
+            stick = Candlestick( 
+                    code        = dto.code,
+                    market      = dto.market,
+                    date        = dto.date,
+                    open_price  = dto.open_price,
+                    close_price = dto.close_price,
+                    high_price  = dto.high_price,
+                    low_price   = dto.low_price,
+                    volume      = dto.volume,
+                    patched     = dto.patched,
+                    interval    = Interval.DAILY
+                    )
+            # A ticker with only one stick in the term has the same first and last.
+            if dto.date == first_date:
+                first_sticks[dto.code] = stick
+            if dto.date != first_date or dto.code not in last_sticks:
+                last_sticks[dto.code] = stick
+
+        return GetEndpointsOutput(
+                endpoints = {code: GetEndpointsOutput.Endpoints(
+                    first = first_sticks[code],
+                    last  = last_sticks[code]
+                    ) for code in first_sticks.keys()}
+                )
 
-        dto_candlesticks = query.filter(
-                    *filters
-                ).order_by(DtoCandlestick.code.asc(), DtoCandlestick.date.desc())
+    # ---------------------------------------------------------------------------------
+    # Get each candlesticks in target market.
+    # ---------------------------------------------------------------------------------
+    def get_each(self, ctx: TxContext, input_data:GetEachInput) -> GetEachOutput:
+        output = self.get_each_offsets(ctx, GetEachOffsetsInput(
+            market  = input_data.market,
+            tags    = input_data.tags,
+            offsets = [input_data.offset],
+            today   = input_data.today
+            ))
 
-        result = dict()
-        for dto in dto_candlesticks:
-            if dto.code not in result:
-                result[dto.code] = list()
-            result[dto.code].append(
-                    Candlestick( 
+        return GetEachOutput(
+                candlesticks = output.candlesticks[input_data.offset]
+                )
+
+    # ---------------------------------------------------------------------------------
+    # Get each candlesticks at the offsets from today in target market.
+    # ---------------------------------------------------------------------------------
+    def get_each_offsets(self, ctx: TxContext, input_data:GetEachOffsetsInput) -> GetEachOffsetsOutput:
+        market  = input_data.market
+        tags    = input_data.tags
+        offsets = input_data.offsets
+        today   = input_data.today
+
+        tx = ctx.get_tx()
+        filters = self._candlestick_filters(tx, '', market, tags, today)
+
+        result = {offset: dict() for offset in offsets}
+        if self._supports_window_function(tx):
+            ranked = self._ranked_candlesticks(tx, filters)
+            dto_candlesticks = tx.query(ranked).filter(
+                    ranked.c.row_number.in_([offset + 1 for offset in offsets])
+                    )
+            for dto in dto_candlesticks:
+                result[dto.row_number - 1][dto.code] = Candlestick( 
                         code        = dto.code,
                         market      = dto.market,
                         date        = dto.date,
@@ -250,63 +565,42 @@ class SqlalchemyStockRepository(StockRepository):
                         patched     = dto.patched,
                         interval    = Interval.DAILY
                         )
+            return GetEachOffsetsOutput(
+                    candlesticks = result
                     )
-        return GetOutput(
-                candlesticks = result
-                )
-
-    # ---------------------------------------------------------------------------------
-    # Get each candlesticks in target market.
-    # ---------------------------------------------------------------------------------
-    def get_each(self, ctx: TxContext, input_data:GetEachInput) -> GetEachOutput:
-        market    = input_data.market
-        tags      = input_data.tags
-        offset    = input_data.offset 
-        today     = input_data.today
 
-        filters   = []
-
-        if market != '': 
-            filters.append(and_(DtoCandlestick.market == market))
-
-        tx = ctx.get_tx()
-        query = tx.query(DtoCandlestick.code, DtoCandlestick.market)
-
-        if tags != []:
-            filters.append(and_(DtoTag.name.in_(tags)))
-            query = query.join(DtoStockTag, and_( 
-                DtoStockTag.code == DtoCandlestick.code, 
-                DtoStockTag.market == DtoCandlestick.market
-                )).join(DtoTag, DtoStockTag.tag_id == DtoTag.id)
-
-        dto_codes = query.filter(
-                *filters
-                ).group_by(DtoCandlestick.code, DtoCandlestick.market).all()
+        # MySQL 5.7 has no window function. Pick the dates at the offsets from the date list of each ticker, then fetch them by keys.
+        dto_dates = self._recent_dates(tx, filters, max(offsets) + 1)
+        positions = dict()
+        for dto in dto_dates:
+            dates = dto.dates.split(',')
+            for offset in offsets:
+                if offset < len(dates):
+                    positions[(dto.code, dto.market, date.fromisoformat(dates[offset]))] = offset
+        if len(positions) == 0:
+            return GetEachOffsetsOutput(
+                    candlesticks = result
+                    )
 
-        result = dict()
-        for dto_code in dto_codes:
-            dto_candlestick = tx.query(DtoCandlestick).filter(
-                    DtoCandlestick.code   == dto_code[0],
-                    DtoCandlestick.market == dto_code[1],
-                    DtoCandlestick.date   <= today, 
-                    ).order_by(DtoCandlestick.date.desc()).offset(offset).limit(1).first()
-            if dto_candlestick == None:
-                continue
-
-            result[dto_candlestick.code] = Candlestick( 
-                    code        = dto_candlestick.code,
-                    market      = dto_candlestick.market,
-                    date        = dto_candlestick.date,
-                    open_price  = dto_candlestick.open_price,
-                    close_price = dto_candlestick.close_price,
-                    high_price  = dto_candlestick.high_price,
-                    low_price   = dto_candlestick.low_price,
-                    volume      = dto_candlestick.volume,
-                    patched     = dto_candlestick.patched,
+        dto_candlesticks = tx.query(DtoCandlestick).filter(
+                tuple_(DtoCandlestick.code, DtoCandlestick.market, DtoCandlestick.date).in_(list(positions.keys()))
+                )
+        for dto in dto_candlesticks:
+            offset = positions[(dto.code, dto.market, dto.date)]
+            result[offset][dto.code] = Candlestick( 
+                    code        = dto.code,
+                    market      = dto.market,
+                    date        = dto.date,
+                    open_price  = dto.open_price,
+                    close_price = dto.close_price,
+                    high_price  = dto.high_price,
+                    low_price   = dto.low_price,
+                    volume      = dto.volume,
+                    patched     = dto.patched,
                     interval    = Interval.DAILY
                     )
 
-        return GetEachOutput(
+        return GetEachOffsetsOutput(
                 candlesticks = result
                 )
 
@@ -320,55 +614,60 @@ class SqlalchemyStockRepository(StockRepository):
         to_date = input_data.to_date 
         limit   = input_data.limit 
 
-        filters   = []
-
-        if code != '': 
-            filters.append(and_(DtoCandlestick.code == code))
-
-        if market != '': 
-            filters.append(and_(DtoCandlestick.market == market))
-
         tx = ctx.get_tx()
-        query = tx.query(DtoCandlestick.code, DtoCandlestick.market)
-
-        if tags != []:
-            filters.append(and_(DtoTag.name.in_(tags)))
-            query = query.join(DtoStockTag, and_( 
-                DtoStockTag.code == DtoCandlestick.code, 
-                DtoStockTag.market == DtoCandlestick.market
-                )).join(DtoTag, DtoStockTag.tag_id == DtoTag.id)
-
-        dto_codes = query.filter(
-                *filters
-                ).group_by(DtoCandlestick.code, DtoCandlestick.market).all()
+        query = self._range_query(tx, self._candlestick_filters(tx, code, market, tags, to_date), limit, False)
 
+        # Rows come ordered by ticker, so they are grouped while streaming.
+        # The rows are (code, market, date, open, close, high, low, volume, patched) tuples.
         result = dict()
-        for dto_code in dto_codes:
-            dto_candlesticks = tx.query(DtoCandlestick).filter(
-                    DtoCandlestick.code   == dto_code[0],
-                    DtoCandlestick.market == dto_code[1],
-                    DtoCandlestick.date   <= to_date
-                    ).order_by(DtoCandlestick.date.desc()).limit(limit).all()
-            if len(dto_candlesticks) == 0:
-                continue
-
-            result[dto_code[0]] = [Candlestick( 
-                    code        = dto.code,
-                    market      = dto.market,
-                    date        = dto.date,
-                    open_price  = dto.open_price,
-                    close_price = dto.close_price,
-                    high_price  = dto.high_price,
-                    low_price   = dto.low_price,
-                    volume      = dto.volume,
-                    patched     = dto.patched,
-                    interval    = Interval.DAILY
-                    ) for dto in dto_candlesticks]
+        for row in query.yield_per(1000):
+            if row.code not in result:
+                result[row.code] = list()
+            result[row.code].append(Candlestick.from_row(row))
 
         return GetRangeOutput(
                 candlesticks = result
                 )
 
+    # ---------------------------------------------------------------------------------
+    # Get range candlesticks in target market as columnar series.
+    # ---------------------------------------------------------------------------------
+    def get_range_series(self, ctx: TxContext, input_data:GetRangeSeriesInput) -> GetRangeSeriesOutput:
+        code    = input_data.code
+        market  = input_data.market
+        tags    = input_data.tags
+        to_date = input_data.to_date 
+        limit   = input_data.limit 
+
+        tx = ctx.get_tx()
+        query = self._range_query(tx, self._candlestick_filters(tx, code, market, tags, to_date), limit, True)
+
+        # Rows are collected into columns per ticker without making candlestick objects.
+        universe = Universe()
+        key     = None
+        columns = None
+        def add(key, columns):
+            universe.add(CandlestickSeries.from_columns(key[0], key[1], *[column[::-1] for column in columns]))
+
+        for row in query.yield_per(1000):
+            if key != (row.code, row.market):
+                if key != None:
+                    add(key, columns)
+                key     = (row.code, row.market)
+                columns = ([], [], [], [], [], [])
+            columns[0].append(row.date)
+            columns[1].append(row.open_price)
+            columns[2].append(row.close_price)
+            columns[3].append(row.high_price)
+            columns[4].append(row.low_price)
+            columns[5].append(row.volume)
+        if key != None:
+            add(key, columns)
+
+        return GetRangeSeriesOutput(
+                universe = universe
+                )
+
     # ---------------------------------------------------------------------------------
     # Search tickers.
     # ---------------------------------------------------------------------------------
@@ -540,6 +839,7 @@ class SqlalchemyStockRepository(StockRepository):
         tx = ctx.get_tx()
         _ = tx.query(DtoStockTag).filter(DtoStockTag.code == code, DtoStockTag.market == market).delete()
         _ = tx.query(DtoCandlestick).filter(DtoCandlestick.code == code, DtoCandlestick.market == market).delete()
+        _ = tx.query(DtoIngestionWatermark).filter(DtoIngestionWatermark.code == code, DtoIngestionWatermark.market == market).delete()
 
         return RemoveOnesAllOutput()
 
@@ -637,3 +937,115 @@ class SqlalchemyStockRepository(StockRepository):
             _ = tx.query(DtoStockTag).filter(DtoStockTag.tag_id == tag.id).delete()
 
         return RemoveTagOutput()
+
+    # ---------------------------------------------------------------------------------
+    # Make filters of candlesticks. Tags are matched with EXISTS so rows are not duplicated.
+    # ---------------------------------------------------------------------------------
+    def _candlestick_filters(self, tx, code:str, market:str, tags:List[str], to_date:date) -> List:
+        filters = []
+        if code != '': 
+            filters.append(and_(DtoCandlestick.code == code))
+
+        if market != '': 
+            filters.append(and_(DtoCandlestick.market == market))
+
+        if to_date != None: 
+            filters.append(and_(DtoCandlestick.date <= to_date))
+
+        if tags != []:
+            filters.append(tx.query(DtoStockTag).join(DtoTag, DtoStockTag.tag_id == DtoTag.id).filter(
+                DtoStockTag.code   == DtoCandlestick.code,
+                DtoStockTag.market == DtoCandlestick.market,
+                DtoTag.name.in_(tags)
+                ).exists())
+
+        return filters
+
+    # ---------------------------------------------------------------------------------
+    # Check the database supports window function. MySQL supports it from 8.0 and MariaDB from 10.2.
+    # ---------------------------------------------------------------------------------
+    def _supports_window_function(self, tx) -> bool:
+        dialect = tx.connection().dialect
+        version = dialect.server_version_info or ()
+        if dialect.name == 'mysql':
+            return version >= ((10, 2) if getattr(dialect, 'is_mariadb', False) else (8, 0))
+        if dialect.name == 'sqlite':
+            return version >= (3, 25)
+        return True
+
+    # ---------------------------------------------------------------------------------
+    # Subquery of candlesticks numbered from the newest in each ticker.
+    # ---------------------------------------------------------------------------------
+    def _ranked_candlesticks(self, tx, filters:List):
+        return tx.query(
+                DtoCandlestick.code.label('code'),
+                DtoCandlestick.market.label('market'),
+                DtoCandlestick.date.label('date'),
+                DtoCandlestick.open_price.label('open_price'),
+                DtoCandlestick.close_price.label('close_price'),
+                DtoCandlestick.high_price.label('high_price'),
+                DtoCandlestick.low_price.label('low_price'),
+                DtoCandlestick.volume.label('volume'),
+                DtoCandlestick.patched.label('patched'),
+                func.row_number().over(
+                    partition_by = (DtoCandlestick.code, DtoCandlestick.market),
+                    order_by     = DtoCandlestick.date.desc()
+                    ).label('row_number')
+                ).filter(*filters).subquery()
+
+    # ---------------------------------------------------------------------------------
+    # Query of the last `limit` candlesticks of each ticker ordered by ticker and date desc.
+    # ---------------------------------------------------------------------------------
+    def _range_query(self, tx, filters:List, limit:int, float_prices:bool):
+        price = (lambda column: type_coerce(column, Float).label(column.key)) if float_prices else (lambda column: column)
+
+        if self._supports_window_function(tx):
+            ranked = self._ranked_candlesticks(tx, filters)
+            return tx.query(
+                    ranked.c.code,
+                    ranked.c.market,
+                    ranked.c.date,
+                    price(ranked.c.open_price),
+                    price(ranked.c.close_price),
+                    price(ranked.c.high_price),
+                    price(ranked.c.low_price),
+                    ranked.c.volume,
+                    ranked.c.patched
+                    ).filter(
+                        ranked.c.row_number <= limit
+                    ).order_by(ranked.c.code.asc(), ranked.c.market.asc(), ranked.c.date.desc())
+
+        # MySQL 5.7 has no window function. Join each ticker with the date of its limit-th newest stick.
+        # The filters are applied again to bound the newest stick by to_date.
+        dates = self._recent_dates(tx, filters, limit).subquery()
+        first_date = func.substring_index(func.substring_index(dates.c.dates, ',', limit), ',', -1)
+        return tx.query(
+                DtoCandlestick.code.label('code'),
+                DtoCandlestick.market.label('market'),
+                DtoCandlestick.date.label('date'),
+                price(DtoCandlestick.open_price.label('open_price')),
+                price(DtoCandlestick.close_price.label('close_price')),
+                price(DtoCandlestick.high_price.label('high_price')),
+                price(DtoCandlestick.low_price.label('low_price')),
+                DtoCandlestick.volume.label('volume'),
+                DtoCandlestick.patched.label('patched')
+                ).join(dates, and_(
+                    DtoCandlestick.code   == dates.c.code,
+                    DtoCandlestick.market == dates.c.market,
+                    DtoCandlestick.date   >= first_date
+                )).filter(
+                    *filters
+                ).order_by(DtoCandlestick.code.asc(), DtoCandlestick.market.asc(), DtoCandlestick.date.desc())
+
+    # ---------------------------------------------------------------------------------
+    # Comma separated dates of each ticker from the newest (for MySQL 5.7).
+    # ---------------------------------------------------------------------------------
+    def _recent_dates(self, tx, filters:List, count:int):
+        # 'YYYY-MM-DD,' is 11 characters. Longer lists are truncated by MySQL.
+        tx.execute(text('SET SESSION group_concat_max_len = :length'), {'length': max(count * 11, 1024)})
+
+        return tx.query(
+                DtoCandlestick.code.label('code'),
+                DtoCandlestick.market.label('market'),
+                func.group_concat(literal_column('`date` ORDER BY `date` DESC')).label('dates')
+                ).filter(*filters).group_by(DtoCandlestick.code, DtoCandlestick.market)
@@ -1,19 +1,26 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import StaticPool
 
 from app.repository.transaction import TxContext, Transaction
-from typing import Any
+from app.repository.sqlalchemy.dto.stock import Base
+from typing import Any, List
 
 class SqlclchemyTxContext(TxContext):
     tx: Any
+    committed: List[Any]
 
     def __init__(self, tx: Any):
         self.tx = tx
+        self.committed = []
 
     def get_tx(self) -> Any:
         return self.tx
+
+    def on_commit(self, func: Any):
+        self.committed.append(func)
     
 
 class SqlalchemyTransaction(Transaction):
@@ -22,11 +29,28 @@ class SqlalchemyTransaction(Transaction):
     sql_engine: Engine
     sql_sessions: Session
 
-    def __init__(self, target_url:str, pool_recycle:int):
+    def __init__(self, target_url:str, pool_recycle:int, create_schema:bool = False):
+        """
+        target_url:    str SQLAlchemy url. sqlite:// is an in-memory database, and sqlite:///path/to/file.db is a file.
+        pool_recycle:  int
+        create_schema: bool create the tables which do not exist yet.
+        """
         self.target_url = target_url
         self.pool_recycle = pool_recycle
-        self.sql_engine = create_engine(self.target_url, pool_recycle=self.pool_recycle)
+        self.sql_engine = create_engine(self.target_url, **self._engine_options())
         self.sql_sessions = sessionmaker(bind=self.sql_engine, expire_on_commit=False)
+        if create_schema:
+            Base.metadata.create_all(self.sql_engine)
+
+    def _engine_options(self) -> dict:
+        url = make_url(self.target_url)
+        if url.get_backend_name() != 'sqlite':
+            return {'pool_recycle': self.pool_recycle}
+        options = {'connect_args': {'check_same_thread': False}}
+        if url.database in (None, '', ':memory:'):
+            # Every connection to an in-memory database is a new empty one, so all sessions share one connection.
+            options['poolclass'] = StaticPool
+        return options
 
     def do_in_tx(self, func: Any) -> Any:
         ctx = SqlclchemyTxContext(tx = self.sql_sessions())
@@ -41,4 +65,11 @@ class SqlalchemyTransaction(Transaction):
         finally:
             ctx.get_tx().close()
 
+        # The data is committed already, so a failing hook neither fails the transaction nor skips the other hooks.
+        for committed in ctx.committed:
+            try:
+                committed()
+            except Exception as e:
+                print(e)
+
         return result
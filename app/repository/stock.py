@@ -13,10 +13,38 @@ class StockRepository(metaclass=ABCMeta):
     def find_tag(self, ctx: TxContext, input_data:FindTagInput) -> FindTagOutput:
         raise NotImplementedError
 
+    @abstractmethod
+    def find_tags(self, ctx: TxContext, input_data:FindTagsInput) -> FindTagsOutput:
+        raise NotImplementedError
+
     @abstractmethod
     def save(self, ctx: TxContext, input_data:SaveInput) -> SaveOutput:
         raise NotImplementedError
 
+    @abstractmethod
+    def find_bulk(self, ctx: TxContext, input_data:FindBulkInput) -> FindBulkOutput:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_bulk(self, ctx: TxContext, input_data:SaveBulkInput) -> SaveBulkOutput:
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_ingestion(self, ctx: TxContext, input_data:FindIngestionInput) -> FindIngestionOutput:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_ingestion(self, ctx: TxContext, input_data:SaveIngestionInput) -> SaveIngestionOutput:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_watermarks(self, ctx: TxContext, input_data:GetWatermarksInput) -> GetWatermarksOutput:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_watermarks(self, ctx: TxContext, input_data:SaveWatermarksInput) -> SaveWatermarksOutput:
+        raise NotImplementedError
+
     @abstractmethod
     def save_tag(self, ctx: TxContext, input_data:SaveTagInput) -> SaveTagOutput:
         raise NotImplementedError
@@ -37,14 +65,30 @@ class StockRepository(metaclass=ABCMeta):
     def get_all(self, ctx: TxContext, input_data:GetAllInput) -> GetAllOutput:
         raise NotImplementedError
 
+    @abstractmethod
+    def stream_all(self, ctx: TxContext, input_data:StreamAllInput) -> StreamAllOutput:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_endpoints(self, ctx: TxContext, input_data:GetEndpointsInput) -> GetEndpointsOutput:
+        raise NotImplementedError
+
     @abstractmethod
     def get_each(self, ctx: TxContext, input_data:GetEachInput) -> GetEachOutput:
         raise NotImplementedError
 
+    @abstractmethod
+    def get_each_offsets(self, ctx: TxContext, input_data:GetEachOffsetsInput) -> GetEachOffsetsOutput:
+        raise NotImplementedError
+
     @abstractmethod
     def get_range(self, ctx: TxContext, input_data:GetRangeInput) -> GetRangeOutput:
         raise NotImplementedError
 
+    @abstractmethod
+    def get_range_series(self, ctx: TxContext, input_data:GetRangeSeriesInput) -> GetRangeSeriesOutput:
+        raise NotImplementedError
+
     @abstractmethod
     def search_tickers(self, ctx: TxContext, input_data:SearchTickersInput) -> SearchTickersOutput:
         raise NotImplementedError
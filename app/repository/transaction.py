@@ -6,6 +6,13 @@ class TxContext(metaclass=ABCMeta):
     def get_tx(self) -> Any:
         raise NotImplementedError
 
+    @abstractmethod
+    def on_commit(self, func: Any):
+        """
+        func: Callable called with no argument after the transaction is committed. Not called on the rollback.
+        """
+        raise NotImplementedError
+
 
 class Transaction(metaclass=ABCMeta):
 
@@ -1,5 +1,11 @@
 from app.util.exception import InvalidDataAppException, FatalAppException, DataNotfoundAppException, InconsistencyDataException
+from typing import Any
+from concurrent.futures import ProcessPoolExecutor
+import dataclasses
 import datetime
+import itertools
+import random
+import numpy as np
 
 from app.usecase.inputdata.stock  import *
 from app.usecase.outputdata.stock import *
@@ -11,24 +17,117 @@ import app.repository.inputdata.stock  as stock_repository_inputdata
 
 from app.usecase.stock           import StockUsecase
 from app.repository.stock        import StockRepository
+from app.repository.export       import StockExportRepository
 from app.repository.transaction  import TxContext, Transaction
 
 from app.driver.cache            import CacheDriver
 
-from app.domain.stock            import Candlestick, Atr
-from app.domain.statistics       import Statistics
+from app.domain.stock            import Candlestick, Atr, Watermark
 from app.domain.analyze          import RankingOrder
-from app.domain.simulator        import InvestSimulator
+from app.domain.simulator        import InvestSimulator, SimulationDistribution, SweepResult, WalkForwardWindow, WalkForwardSummary
+from app.domain.indicator        import IndicatorCache
+from app.domain.numeric          import NumericBackend, DecimalNumericBackend
+
+# ---------------------------------------------------------------------------------
+# Make the invest rule. The rules use the global random generator unless rng is given,
+# and the default parameters of the rule unless parameters are given.
+# ---------------------------------------------------------------------------------
+def make_invest_rule(rule_type:InvestRuleType, unit:int, losscut_rate:Decimal, candlesticks:Dict[str,List[Candlestick]], rng:random.Random = None, parameters:Dict[str,Any] = None) -> InvestRule:
+    parameters  = {} if parameters is None else parameters
+    invest_rule = None
+    if rule_type == InvestRuleType.TURTLE:
+        invest_rule = TurtleInvestRule(unit_number = unit, losscut_rate = losscut_rate, rng = rng, **parameters)
+    elif rule_type == InvestRuleType.RANDOM:
+        tickers = [ticker for (ticker, sticks) in candlesticks.items()]
+        invest_rule = RandomInvestRule(unit_number = unit, losscut_rate = losscut_rate, tickers = tickers, rng = rng, **parameters)
+    elif rule_type == InvestRuleType.RANDOM_LONG:
+        tickers = [ticker for (ticker, sticks) in candlesticks.items()]
+        invest_rule = RandomLongInvestRule(unit_number = unit, losscut_rate = losscut_rate, tickers = tickers, rng = rng, **parameters)
+    elif rule_type == InvestRuleType.RANDOM_TRAIL:
+        tickers = [ticker for (ticker, sticks) in candlesticks.items()]
+        invest_rule = RandomTrailLongInvestRule(unit_number = unit, losscut_rate = losscut_rate, tickers = tickers, rng = rng, **parameters)
+    elif rule_type == InvestRuleType.GOLDEN_TRAIL:
+        invest_rule = GoldenTrailLongInvestRule(unit_number = unit, losscut_rate = losscut_rate, rng = rng, **parameters)
+    elif rule_type == InvestRuleType.SERIAL_STEPUP_TRAIL:
+        invest_rule = SerialStepupTrailLongInvestRule(unit_number = unit, losscut_rate = losscut_rate, rng = rng, **parameters)
+    elif rule_type == InvestRuleType.TRIPLE_STEPUP_TRAIL:
+        invest_rule = TripleStepupTrailLongInvestRule(unit_number = unit, losscut_rate = losscut_rate, rng = rng, **parameters)
+    elif rule_type == InvestRuleType.BUYHOLD:
+        stick_numbers = {ticker: len(sticks) for (ticker, sticks) in candlesticks.items()}
+        invest_rule = BuyholdInvestRule(unit_number = unit, losscut_rate = losscut_rate, stick_numbers = stick_numbers, rng = rng, **parameters)
+    else:
+        # TODO
+        pass
+
+    return invest_rule
+
+# ---------------------------------------------------------------------------------
+# Simulation worker. The candlesticks are sent once per process by the initializer,
+# and each run has its own generator seeded from (seed, index). The indicators are
+# cached per process and shared by all the runs in it.
+# ---------------------------------------------------------------------------------
+simulation_candlesticks: Dict[str,List[Candlestick]] = {}
+simulation_cache:        IndicatorCache              = None
+
+def init_simulation_worker(candlesticks:Dict[str,List[Candlestick]], numeric:NumericBackend = None):
+    global simulation_candlesticks, simulation_cache
+    simulation_candlesticks = candlesticks
+    simulation_cache        = IndicatorCache(candlesticks, numeric)
+
+# The runs in the console process release the candlesticks and the indicators after them,
+# since nothing else holds them there.
+def reset_simulation_worker():
+    global simulation_candlesticks, simulation_cache
+    simulation_candlesticks = {}
+    simulation_cache        = None
+
+# ---------------------------------------------------------------------------------
+# The window of `term` candlesticks of each ticker, `offset` candlesticks before the
+# newest one. The lists are newest first, so the window is a slice of each list.
+# ---------------------------------------------------------------------------------
+def window_candlesticks(candlesticks:Dict[str,List[Candlestick]], offset:int, term:int) -> Dict[str,List[Candlestick]]:
+    return {ticker: sticks[offset:offset + term] for (ticker, sticks) in candlesticks.items() if len(sticks) > offset}
+
+def simulate_seeded_trade_rule(rule_type:InvestRuleType, unit:int, losscut_rate:Decimal, principal:Decimal, commission:Commission, seed:int, index:int, detail:bool, parameters:Dict[str,Any] = None, offset:int = 0, term:int = None) -> SimulationReport:
+    rng = random.Random(seed * 1000003 + index)
+    # The indicators of the whole candlesticks serve the windows too, as they are looked up by date.
+    candlesticks = simulation_candlesticks if term is None else window_candlesticks(simulation_candlesticks, offset, term)
+    simulator = InvestSimulator(
+            rule       = make_invest_rule(rule_type = rule_type, unit = unit, losscut_rate = losscut_rate, candlesticks = candlesticks, rng = rng, parameters = parameters),
+            sticks     = candlesticks,
+            cash       = principal,
+            commission = commission,
+            cache      = simulation_cache
+            )
+    simulator.simulate()
+
+    report = simulator.report(sticks = {k: v[0] for (k,v) in candlesticks.items()})
+    # Histories and positions are dropped unless required, not to send them back between the processes.
+    return report if detail else dataclasses.replace(report, histories = {}, positions = {})
+
+def sweep_seeded_trade_rule(rule_type:InvestRuleType, parameters:Dict[str,Any], principal:Decimal, commission:Commission, seed:int, loop_num:int) -> SweepResult:
+    rule_parameters = {k: v for (k, v) in parameters.items() if k not in ['unit', 'losscut_rate']}
+    reports = [simulate_seeded_trade_rule(rule_type, parameters['unit'], parameters['losscut_rate'], principal, commission, seed, index, False, rule_parameters) for index in range(loop_num)]
+    return SweepResult.from_reports(parameters = parameters, reports = reports)
 
 class DefaultStockInteractor(StockUsecase):
     stock_repository:  StockRepository
     transaction:       Transaction
     cache_driver:      CacheDriver
-
-    def __init__(self, stock_repository: StockRepository, transaction: Transaction, cache_driver: CacheDriver):
-        self.stock_repository = stock_repository
-        self.transaction      = transaction
-        self.cache_driver     = cache_driver
+    batch_size:        int
+    numeric:           NumericBackend
+    stock_export_repository:  StockExportRepository
+    export_source_repository: StockRepository
+
+    def __init__(self, stock_repository: StockRepository, transaction: Transaction, cache_driver: CacheDriver, batch_size: int = 1000, numeric: NumericBackend = None, stock_export_repository: StockExportRepository = None, export_source_repository: StockRepository = None):
+        self.stock_repository         = stock_repository
+        self.transaction              = transaction
+        self.cache_driver             = cache_driver
+        self.batch_size               = batch_size
+        self.numeric                  = DecimalNumericBackend() if numeric is None else numeric
+        self.stock_export_repository  = stock_export_repository
+        # The database the export reads, when stock_repository is the store it writes into.
+        self.export_source_repository = stock_repository if export_source_repository is None else export_source_repository
 
     # ---------------------------------------------------------------------------------
     # Create candlestick.
@@ -36,6 +135,14 @@ class DefaultStockInteractor(StockUsecase):
     def create_candlestick(self, input_data: CreateCandlestickInput) -> CreateCandlestickOutput:
         candlesticks = input_data.candlesticks
         safe         = input_data.safe
+        bulk         = input_data.bulk
+
+        if bulk:
+            self.create_candlestick_chunks(CreateCandlestickChunksInput(
+                safe   = safe,
+                chunks = (candlesticks[index:index + self.batch_size] for index in range(0, len(candlesticks), self.batch_size))
+                ))
+            return CreateCandlestickOutput()
 
         # Application Logic.
         def task(ctx: TxContext):
@@ -67,6 +174,159 @@ class DefaultStockInteractor(StockUsecase):
 
         return output_data
 
+    # ---------------------------------------------------------------------------------
+    # Create candlesticks from chunks in one transaction.
+    # ---------------------------------------------------------------------------------
+    def create_candlestick_chunks(self, input_data: CreateCandlestickChunksInput) -> CreateCandlestickChunksOutput:
+        chunks         = input_data.chunks
+        safe           = input_data.safe
+        incremental    = input_data.incremental
+        skip_conflicts = input_data.skip_conflicts
+
+        # Application Logic.
+        def task(ctx: TxContext):
+            can_continue = True
+            count   = 0
+            skipped = 0
+            errordata = {'present': [], 'newer': []}
+            loaded_from = dict(input_data.loaded_from)
+            for chunk in chunks:
+                for index in range(0, len(chunk), self.batch_size):
+                    batch = chunk[index:index + self.batch_size]
+
+                    runs = dict()
+                    for stick in batch:
+                        key = (stick.code, stick.market)
+                        if key not in runs:
+                            runs[key] = [stick.date, stick.date]
+                        runs[key][0] = min(runs[key][0], stick.date)
+                        runs[key][1] = max(runs[key][1], stick.date)
+                    watermarks = self.stock_repository.get_watermarks(ctx, stock_repository_inputdata.GetWatermarksInput(tickers = list(runs.keys()))).watermarks
+
+                    # The rows between the loaded dates are skipped without a lookup, so a top-up costs the new rows only.
+                    if incremental:
+                        newer = [stick for stick in batch if (stick.code, stick.market) not in watermarks or not watermarks[(stick.code, stick.market)].contains(stick.date)]
+                        skipped += len(batch) - len(newer)
+                        batch = newer
+
+                    presents = dict()
+                    if safe and len(batch) > 0:
+                        presents = self.stock_repository.find_bulk(ctx, stock_repository_inputdata.FindBulkInput(
+                            keys = [(stick.code, stick.market, stick.date) for stick in batch]
+                            )).candlesticks
+
+                    conflicts = set()
+                    if safe:
+                        for stick in batch:
+                            present = presents.get((stick.code, stick.market, stick.date))
+                            if present != None and present != stick:
+                                errordata['present'].append(present)
+                                errordata['newer'].append(stick)
+                                conflicts.add((stick.code, stick.market, stick.date))
+                        if len(conflicts) > 0 and skip_conflicts:
+                            batch = [stick for stick in batch if (stick.code, stick.market, stick.date) not in conflicts]
+                        elif len(conflicts) > 0:
+                            can_continue = False
+
+                    # The rows out of the loaded dates may be saved already, when the files come out of order or a chunk was rolled back.
+                    if incremental and len(presents) > 0:
+                        newer = [stick for stick in batch if (stick.code, stick.market, stick.date) not in presents]
+                        skipped += len(batch) - len(newer)
+                        batch = newer
+
+                    if not can_continue:
+                        continue
+                    if len(batch) > 0:
+                        self.stock_repository.save_bulk(ctx, stock_repository_inputdata.SaveBulkInput(candlesticks = batch))
+                        count += len(batch)
+
+                    # The rows of the file saved so far have no gap, so the loaded dates grow over them when they overlap. A newer run apart
+                    # from the dates replaces them, since a gap before it can not be told from the next trading day, and the rows out of
+                    # the dates are looked up on the next load. The tickers with a conflicting row keep the dates and start a new run.
+                    conflicted = set([(code, market) for (code, market, _) in conflicts])
+                    updates = dict()
+                    for (key, (first_date, last_date)) in runs.items():
+                        if key in conflicted:
+                            loaded_from.pop(key, None)
+                            continue
+                        loaded = Watermark(first_date = min(loaded_from.setdefault(key, first_date), first_date), last_date = last_date)
+                        watermark = watermarks.get(key)
+                        if watermark == None or loaded.first_date > watermark.last_date:
+                            updates[key] = loaded
+                        elif loaded.last_date >= watermark.first_date:
+                            joined = Watermark(first_date = min(loaded.first_date, watermark.first_date), last_date = max(loaded.last_date, watermark.last_date))
+                            if joined != watermark:
+                                updates[key] = joined
+                    if len(updates) > 0:
+                        self.stock_repository.save_watermarks(ctx, stock_repository_inputdata.SaveWatermarksInput(watermarks = updates))
+            if not can_continue:
+                raise InconsistencyDataException(present = errordata['present'], newer = errordata['newer'])
+
+            return (count, skipped, errordata, loaded_from)
+
+        try:
+            (count, skipped, errordata, loaded_from) = self.transaction.do_in_tx(task)
+        except InconsistencyDataException:
+            raise
+        except:
+            raise FatalAppException()
+
+        output_data = CreateCandlestickChunksOutput(
+                count   = count,
+                skipped = skipped,
+                present     = errordata['present'],
+                newer       = errordata['newer'],
+                loaded_from = loaded_from
+                )
+
+        return output_data
+
+    # ---------------------------------------------------------------------------------
+    # Get ingestion manifest of the file.
+    # ---------------------------------------------------------------------------------
+    def get_ingestion(self, input_data: GetIngestionInput) -> GetIngestionOutput:
+        path = input_data.path
+
+        # Application Logic.
+        def task(ctx: TxContext):
+            return self.stock_repository.find_ingestion(ctx, stock_repository_inputdata.FindIngestionInput(
+                path = path
+                ))
+
+        try:
+            result = self.transaction.do_in_tx(task)
+        except:
+            raise FatalAppException()
+
+        output_data = GetIngestionOutput(
+                ingestion = result.ingestion
+                )
+
+        return output_data
+
+    # ---------------------------------------------------------------------------------
+    # Create ingestion manifest of the file.
+    # ---------------------------------------------------------------------------------
+    def create_ingestion(self, input_data: CreateIngestionInput) -> CreateIngestionOutput:
+        ingestion = input_data.ingestion
+
+        # Application Logic.
+        def task(ctx: TxContext):
+            self.stock_repository.save_ingestion(ctx, stock_repository_inputdata.SaveIngestionInput(
+                ingestion = ingestion
+                ))
+
+            return True
+
+        try:
+            self.transaction.do_in_tx(task)
+        except:
+            raise FatalAppException()
+
+        output_data = CreateIngestionOutput()
+
+        return output_data
+
     # ---------------------------------------------------------------------------------
     # Create tag.
     # ---------------------------------------------------------------------------------
@@ -219,9 +479,11 @@ class DefaultStockInteractor(StockUsecase):
 
             dates       = [dto.date for dto in result.candlesticks]
             prices      = [dto.close_price for dto in result.candlesticks]
-            price_smas  = [Statistics(values = prices).sma(term = term)[0]]*(term-1) + Statistics(values = prices).sma(term = term)
+            price_smas  = self.numeric.exacts(self.numeric.sma(self.numeric.numbers(prices), term))
+            price_smas  = [price_smas[0]]*(term-1) + price_smas
             volumes     = [Decimal(dto.volume) for dto in result.candlesticks]
-            volume_smas = [Statistics(values = volumes).sma(term = term)[0]]*(term-1) + Statistics(values = volumes).sma(term = term)
+            volume_smas = self.numeric.exacts(self.numeric.sma(self.numeric.numbers(volumes), term))
+            volume_smas = [volume_smas[0]]*(term-1) + volume_smas
         except Exception as e:
             raise FatalAppException()
 
@@ -266,9 +528,11 @@ class DefaultStockInteractor(StockUsecase):
 
             dates       = [dto.date for dto in result.candlesticks]
             prices      = [dto.close_price for dto in result.candlesticks]
-            price_wmas  = [Statistics(values = prices).wma(term = term)[0]]*(term-1) + Statistics(values = prices).wma(term = term)
+            price_wmas  = self.numeric.exacts(self.numeric.wma(self.numeric.numbers(prices), term))
+            price_wmas  = [price_wmas[0]]*(term-1) + price_wmas
             volumes     = [Decimal(dto.volume) for dto in result.candlesticks]
-            volume_wmas = [Statistics(values = volumes).wma(term = term)[0]]*(term-1) + Statistics(values = volumes).wma(term = term)
+            volume_wmas = self.numeric.exacts(self.numeric.wma(self.numeric.numbers(volumes), term))
+            volume_wmas = [volume_wmas[0]]*(term-1) + volume_wmas
         except Exception as e:
             raise FatalAppException()
 
@@ -313,9 +577,11 @@ class DefaultStockInteractor(StockUsecase):
 
             dates       = [dto.date for dto in result.candlesticks]
             prices      = [dto.close_price for dto in result.candlesticks]
-            price_emas  = [Statistics(values = prices).ema(term = term)[0]]*(term-1) + Statistics(values = prices).ema(term = term)
+            price_emas  = self.numeric.exacts(self.numeric.ema(self.numeric.numbers(prices), term))
+            price_emas  = [price_emas[0]]*(term-1) + price_emas
             volumes     = [Decimal(dto.volume) for dto in result.candlesticks]
-            volume_emas = [Statistics(values = volumes).ema(term = term)[0]]*(term-1) + Statistics(values = volumes).ema(term = term)
+            volume_emas = self.numeric.exacts(self.numeric.ema(self.numeric.numbers(volumes), term))
+            volume_emas = [volume_emas[0]]*(term-1) + volume_emas
         except Exception as e:
             print(e)
             raise FatalAppException()
@@ -348,7 +614,7 @@ class DefaultStockInteractor(StockUsecase):
 
         # Application Logic.
         def task(ctx: TxContext):
-            return self.stock_repository.get_all(ctx, stock_repository_inputdata.GetAllInput(
+            return self.stock_repository.get_endpoints(ctx, stock_repository_inputdata.GetEndpointsInput(
                 market    = market,
                 tags      = tags,
                 from_date = today + datetime.timedelta(days=-term), 
@@ -359,13 +625,13 @@ class DefaultStockInteractor(StockUsecase):
         try:
             output = self.transaction.do_in_tx(task)
             performance_data = [PerformanceData(
-                code          = sticks[0].code,
-                market        = sticks[0].market,
-                base_value    = sticks[-1].close_price,
-                base_date     = sticks[-1].date,
-                present_value = sticks[0].close_price,
-                present_date  = sticks[0].date
-                ) for (key, sticks) in output.candlesticks.items()]
+                code          = endpoints.last.code,
+                market        = endpoints.last.market,
+                base_value    = endpoints.first.close_price,
+                base_date     = endpoints.first.date,
+                present_value = endpoints.last.close_price,
+                present_date  = endpoints.last.date
+                ) for (key, endpoints) in output.endpoints.items()]
             result = sorted(performance_data, key=lambda x: x.change_rate(), reverse=(order==RankingOrder.DESC))
             if cache:
                 self.multiple_cachedata(input_data = MultipleCachedataInput(cachekey = cachekey, coefficient = 1, additional_ranking = [f"{value.market}:{value.code}" for value in result]))
@@ -395,7 +661,7 @@ class DefaultStockInteractor(StockUsecase):
 
         # Application Logic.
         def task(ctx: TxContext):
-            return self.stock_repository.get_all(ctx, stock_repository_inputdata.GetAllInput(
+            return self.stock_repository.get_endpoints(ctx, stock_repository_inputdata.GetEndpointsInput(
                 market    = market,
                 tags      = tags,
                 from_date = today + datetime.timedelta(days=-term), 
@@ -406,13 +672,13 @@ class DefaultStockInteractor(StockUsecase):
         try:
             output = self.transaction.do_in_tx(task)
             performance_data = [PerformanceData(
-                code          = sticks[0].code,
-                market        = sticks[0].market,
-                base_value    = sticks[-1].volume,
-                base_date     = sticks[-1].date,
-                present_value = sticks[0].volume,
-                present_date  = sticks[0].date
-                ) for (key, sticks) in output.candlesticks.items()]
+                code          = endpoints.last.code,
+                market        = endpoints.last.market,
+                base_value    = endpoints.first.volume,
+                base_date     = endpoints.first.date,
+                present_value = endpoints.last.volume,
+                present_date  = endpoints.last.date
+                ) for (key, endpoints) in output.endpoints.items()]
             result = sorted(performance_data, key=lambda x: x.change_rate(), reverse=(order==RankingOrder.DESC))
             if cache:
                 self.multiple_cachedata(input_data = MultipleCachedataInput(cachekey = cachekey, coefficient = 1, additional_ranking = [f"{value.market}:{value.code}" for value in result]))
@@ -441,55 +707,30 @@ class DefaultStockInteractor(StockUsecase):
 
         # Application Logic.
         def task(ctx: TxContext):
-            c = self.stock_repository.get_each(ctx, stock_repository_inputdata.GetEachInput(
-                market    = market,
-                tags      = tags,
-                offset    = 0,
-                today     = today
-                ))
-            c63 = self.stock_repository.get_each(ctx, stock_repository_inputdata.GetEachInput(
-                market    = market,
-                tags      = tags,
-                offset    = 63,
-                today     = today
-                ))
-            c126 = self.stock_repository.get_each(ctx, stock_repository_inputdata.GetEachInput(
+            return self.stock_repository.get_each_offsets(ctx, stock_repository_inputdata.GetEachOffsetsInput(
                 market    = market,
                 tags      = tags,
-                offset    = 126,
+                offsets   = [0, 63, 126, 189, 252],
                 today     = today
                 ))
-            c189 = self.stock_repository.get_each(ctx, stock_repository_inputdata.GetEachInput(
-                market    = market,
-                tags      = tags,
-                offset    = 189,
-                today     = today
-                ))
-            c252 = self.stock_repository.get_each(ctx, stock_repository_inputdata.GetEachInput(
-                market    = market,
-                tags      = tags,
-                offset    = 252,
-                today     = today
-                ))
-            return c, c63, c126, c189, c252
 
         result = list()
         try:
-            output = self.transaction.do_in_tx(task)
+            output = self.transaction.do_in_tx(task).candlesticks
             scores = list()
-            for code in output[0].candlesticks.keys(): 
-                if code in output[1].candlesticks and code in output[2].candlesticks and code in output[3].candlesticks and code in output[4].candlesticks:
+            for code in output[0].keys(): 
+                if code in output[63] and code in output[126] and code in output[189] and code in output[252]:
                     scores.append(
                             RelativeStrengthCalcurator.RawScore(
                                 code       = code,
-                                market     = output[0].candlesticks[code].market,
-                                stick      = output[0].candlesticks[code],
-                                stick63    = output[1].candlesticks[code],
-                                stick126   = output[2].candlesticks[code],
-                                stick189   = output[3].candlesticks[code],
-                                stick252   = output[4].candlesticks[code]
+                                market     = output[0][code].market,
+                                stick      = output[0][code],
+                                stick63    = output[63][code],
+                                stick126   = output[126][code],
+                                stick189   = output[189][code],
+                                stick252   = output[252][code]
                                 ))
-            rs = sorted(RelativeStrengthCalcurator(raw_scores = scores).relative_strength(), key=lambda x: x.rawscore, reverse=(order==RankingOrder.DESC))
+            rs = sorted(RelativeStrengthCalcurator(raw_scores = scores, numeric = self.numeric).relative_strength(), key=lambda x: x.rawscore, reverse=(order==RankingOrder.DESC))
             if cache:
                 self.multiple_cachedata(input_data = MultipleCachedataInput(cachekey = cachekey, coefficient = 1, additional_ranking = [f"{value.market}:{value.code}" for value in rs]))
 
@@ -528,23 +769,46 @@ class DefaultStockInteractor(StockUsecase):
                 to_date = today
                 ))
 
+        # The vectorized backend reads the columnar series, without making the candlesticks.
+        def series_task(ctx: TxContext):
+            return self.stock_repository.get_range_series(ctx, stock_repository_inputdata.GetRangeSeriesInput(
+                code    = '',
+                market  = market,
+                tags    = tags,
+                limit   = longterm,
+                to_date = today
+                ))
+
         result = list()
         try:
-            output = self.transaction.do_in_tx(task)
             temp_result = list()
 
-            for (key, sticks) in output.candlesticks.items():
-                deviation_long_term = Statistics(values = [item.close_price for item in sticks[0:longterm]]).standard_deviation()
-                deviation_short_term = Statistics(values = [item.close_price for item in sticks[0:shortterm]]).standard_deviation()
-
-                temp_result.append(PerformanceData(
-                    code          = key,
-                    market        = sticks[0].market,
-                    base_value    = deviation_long_term,
-                    base_date     = sticks[0:longterm][-1].date,
-                    present_value = deviation_short_term,
-                    present_date  = sticks[0:shortterm][-1].date
-                    ))
+            if self.numeric.vectorized:
+                for series in self.transaction.do_in_tx(series_task).universe:
+                    # Newest first, same as the candlesticks.
+                    prices = series.close_prices[::-1]
+                    dates  = series.dates[::-1]
+                    temp_result.append(PerformanceData(
+                        code          = series.code,
+                        market        = series.market,
+                        base_value    = self.numeric.exact(self.numeric.standard_deviation(prices[0:longterm])),
+                        base_date     = dates[0:longterm][-1].item(),
+                        present_value = self.numeric.exact(self.numeric.standard_deviation(prices[0:shortterm])),
+                        present_date  = dates[0:shortterm][-1].item()
+                        ))
+            else:
+                for (key, sticks) in self.transaction.do_in_tx(task).candlesticks.items():
+                    deviation_long_term = self.numeric.exact(self.numeric.standard_deviation(self.numeric.numbers([item.close_price for item in sticks[0:longterm]])))
+                    deviation_short_term = self.numeric.exact(self.numeric.standard_deviation(self.numeric.numbers([item.close_price for item in sticks[0:shortterm]])))
+
+                    temp_result.append(PerformanceData(
+                        code          = key,
+                        market        = sticks[0].market,
+                        base_value    = deviation_long_term,
+                        base_date     = sticks[0:longterm][-1].date,
+                        present_value = deviation_short_term,
+                        present_date  = sticks[0:shortterm][-1].date
+                        ))
             result = sorted(temp_result, key=lambda x: x.rate(), reverse=(order==RankingOrder.DESC))
             if cache:
                 self.multiple_cachedata(input_data = MultipleCachedataInput(cachekey = cachekey, coefficient = 1, additional_ranking = [f"{value.market}:{value.code}" for value in result]))
@@ -585,30 +849,42 @@ class DefaultStockInteractor(StockUsecase):
                 to_date = today
                 ))
 
+        # The vectorized backend reads the columnar series, without making the candlesticks.
+        def series_task(ctx: TxContext):
+            return self.stock_repository.get_range_series(ctx, stock_repository_inputdata.GetRangeSeriesInput(
+                code    = '',
+                market  = market,
+                tags    = tags,
+                limit   = term + smaterm-1, 
+                to_date = today
+                ))
+
         result = list()
         try:
-            output = self.transaction.do_in_tx(task)
-            temp_result = list()
+            # Newest first, in the numbers of the backend. The comparisons are exact unless the backend is vectorized.
+            if self.numeric.vectorized:
+                tickers = [(series.code, series.market, series.dates[0].item(), series.dates[-1].item(), series.close_prices[::-1]) for series in self.transaction.do_in_tx(series_task).universe]
+            else:
+                tickers = [(key, sticks[0].market, sticks[-1].date, sticks[0].date, [item.close_price for item in sticks]) for (key, sticks) in self.transaction.do_in_tx(task).candlesticks.items()]
 
-            for (key, sticks) in output.candlesticks.items():
-                close_prices = [item.close_price for item in sticks]
-                statistics = Statistics(values = close_prices)
-                smas = statistics.sma(term = smaterm)
+            upper = self.numeric.number(1 + Decimal(margin)/100)
+            lower = self.numeric.number(1 - Decimal(margin)/100)
+            temp_result = list()
+            for (code, ticker_market, from_date, to_date, close_prices) in tickers:
+                close_prices = self.numeric.numbers(close_prices)
+                smas = self.numeric.array(self.numeric.sma(close_prices, smaterm))
 
-                count = {'up': 0, 'down': 0}
-                for (price, sma) in list(zip(close_prices[0:-(smaterm-1)], smas)):
-                    if sma * (1 + Decimal(margin)/100) <= price:
-                        count['up'] = count['up'] + 1
-                    elif sma * (1 - Decimal(margin)/100) >= price:
-                        count['down'] = count['down'] + 1
+                prices = self.numeric.array(close_prices[0:len(smas)])
+                up     = smas * upper <= prices
+                down   = ~up & (smas * lower >= prices)
 
                 temp_result.append(TrendData(
-                    code      = key,
-                    market    = sticks[0].market,
-                    from_date = sticks[-1].date,
-                    to_date   = sticks[0].date,
-                    up        = count['up'],
-                    down      = count['down']
+                    code      = code,
+                    market    = ticker_market,
+                    from_date = from_date,
+                    to_date   = to_date,
+                    up        = int(np.count_nonzero(up)),
+                    down      = int(np.count_nonzero(down))
                     ))
 
             result = sorted(temp_result, key=(lambda x: x.up) if sorttype==TrendType.UP else (lambda x: x.down), reverse=True)
@@ -651,30 +927,42 @@ class DefaultStockInteractor(StockUsecase):
                 to_date = today
                 ))
 
+        # The vectorized backend reads the columnar series, without making the candlesticks.
+        def series_task(ctx: TxContext):
+            return self.stock_repository.get_range_series(ctx, stock_repository_inputdata.GetRangeSeriesInput(
+                code    = '',
+                market  = market,
+                tags    = tags,
+                limit   = term + smaterm-1, 
+                to_date = today
+                ))
+
         result = list()
         try:
-            output = self.transaction.do_in_tx(task)
-            temp_result = list()
+            # Newest first, in the numbers of the backend. The comparisons are exact unless the backend is vectorized.
+            if self.numeric.vectorized:
+                tickers = [(series.code, series.market, series.dates[0].item(), series.dates[-1].item(), series.volumes[::-1]) for series in self.transaction.do_in_tx(series_task).universe]
+            else:
+                tickers = [(key, sticks[0].market, sticks[-1].date, sticks[0].date, [Decimal(item.volume) for item in sticks]) for (key, sticks) in self.transaction.do_in_tx(task).candlesticks.items()]
 
-            for (key, sticks) in output.candlesticks.items():
-                volumes = [Decimal(item.volume) for item in sticks]
-                statistics = Statistics(values = volumes)
-                smas = statistics.sma(term = smaterm)
+            upper = self.numeric.number(1 + Decimal(margin)/100)
+            lower = self.numeric.number(1 - Decimal(margin)/100)
+            temp_result = list()
+            for (code, ticker_market, from_date, to_date, volumes) in tickers:
+                volumes = self.numeric.numbers(volumes)
+                smas = self.numeric.array(self.numeric.sma(volumes, smaterm))
 
-                count = {'up': 0, 'down': 0}
-                for (volume, sma) in list(zip(volumes[0:-(smaterm-1)], smas)):
-                    if sma * (1 + Decimal(margin)/100) <= volume:
-                        count['up'] = count['up'] + 1
-                    elif sma * (1 - Decimal(margin)/100) >= volume:
-                        count['down'] = count['down'] + 1
+                volumes = self.numeric.array(volumes[0:len(smas)])
+                up      = smas * upper <= volumes
+                down    = ~up & (smas * lower >= volumes)
 
                 temp_result.append(TrendData(
-                    code      = key,
-                    market    = sticks[0].market,
-                    from_date = sticks[-1].date,
-                    to_date   = sticks[0].date,
-                    up        = count['up'],
-                    down      = count['down']
+                    code      = code,
+                    market    = ticker_market,
+                    from_date = from_date,
+                    to_date   = to_date,
+                    up        = int(np.count_nonzero(up)),
+                    down      = int(np.count_nonzero(down))
                     ))
 
             result = sorted(temp_result, key=(lambda x: x.up) if sorttype==TrendType.UP else (lambda x: x.down), reverse=True)
@@ -717,33 +1005,43 @@ class DefaultStockInteractor(StockUsecase):
                 to_date = today
                 ))
 
+        # The vectorized backend reads the columnar series, without making the candlesticks.
+        def series_task(ctx: TxContext):
+            return self.stock_repository.get_range_series(ctx, stock_repository_inputdata.GetRangeSeriesInput(
+                code    = '',
+                market  = market,
+                tags    = tags,
+                limit   = term + smaterm-1, 
+                to_date = today
+                ))
+
         result = list()
         try:
-            output = self.transaction.do_in_tx(task)
+            # Newest first, in the numbers of the backend. The comparisons are exact unless the backend is vectorized.
+            if self.numeric.vectorized:
+                tickers = [(series.code, series.market, series.dates[0].item(), series.dates[-1].item(), series.volumes[::-1], series.close_prices[::-1]) for series in self.transaction.do_in_tx(series_task).universe]
+            else:
+                tickers = [(key, sticks[0].market, sticks[-1].date, sticks[0].date, [Decimal(item.volume) for item in sticks], [item.close_price for item in sticks]) for (key, sticks) in self.transaction.do_in_tx(task).candlesticks.items()]
+
+            upper = self.numeric.number(1 + Decimal(margin)/100)
             temp_result = list()
+            for (code, ticker_market, from_date, to_date, volumes, close_prices) in tickers:
+                volumes = self.numeric.numbers(volumes)
+                close_prices = self.numeric.array(self.numeric.numbers(close_prices))
+                changes = close_prices[0:-1] - close_prices[1:]
+                smas = self.numeric.array(self.numeric.sma(volumes, smaterm))
 
-            for (key, sticks) in output.candlesticks.items():
-                volumes = [Decimal(item.volume) for item in sticks]
-                close_prices = [Decimal(item.close_price) for item in sticks]
-                changes = [Decimal(a - b) for (a, b) in list(zip(close_prices[0:-1], close_prices[1:]))]
-                statistics = Statistics(values = volumes)
-                smas = statistics.sma(term = smaterm)
-
-                count = {'up': 0, 'down': 0}
-                for (volume, change, sma) in list(zip(volumes[0:len(smas)], changes[0:len(smas)], smas)):
-                    if sma * (1 + Decimal(margin)/100) <= volume:
-                        if change > 0: 
-                            count['up'] = count['up'] + 1
-                        elif change < 0: 
-                            count['down'] = count['down'] + 1
+                length  = min(len(smas), len(changes))
+                surged  = smas[0:length] * upper <= self.numeric.array(volumes[0:length])
+                changes = changes[0:length]
 
                 temp_result.append(TrendData(
-                    code      = key,
-                    market    = sticks[0].market,
-                    from_date = sticks[-1].date,
-                    to_date   = sticks[0].date,
-                    up        = count['up'],
-                    down      = count['down']
+                    code      = code,
+                    market    = ticker_market,
+                    from_date = from_date,
+                    to_date   = to_date,
+                    up        = int(np.count_nonzero(surged & (changes > 0))),
+                    down      = int(np.count_nonzero(surged & (changes < 0)))
                     ))
 
             result = sorted(temp_result, key=(lambda x: x.up) if sorttype==TrendType.UP else (lambda x: x.down), reverse=True)
@@ -817,7 +1115,7 @@ class DefaultStockInteractor(StockUsecase):
         cachekey = input_data.cachekey
 
         try:
-            self.cache_driver.clear_dictionary(key = cachekey)
+            self.cache_driver.clear_ranking(key = cachekey)
         except Exception as e:
             print(e)
             raise FatalAppException()
@@ -834,23 +1132,9 @@ class DefaultStockInteractor(StockUsecase):
         coefficient = input_data.coefficient
         additional_ranking = input_data.additional_ranking
 
-        scores = dict()
-        result = dict()
         try:
-            scores = self.cache_driver.get_dictionary(key = cachekey)
             additional_scores = ScoreCalcurator().faster_better(data = additional_ranking)
-            if len(scores) > 0: 
-                for (key, score) in scores.items(): 
-                    if len(additional_scores) == 0:
-                        result[key] = str(Decimal(score) * Decimal(coefficient))
-                    elif key in additional_scores: 
-                        result[key] = str(Decimal(score) * Decimal(coefficient) * additional_scores[key])
-            else: 
-                for (key, score) in additional_scores.items(): 
-                    result[key] = str(Decimal(score) * Decimal(coefficient))
-
-            self.cache_driver.clear_dictionary(key = cachekey)
-            self.cache_driver.save_dictionary(key = cachekey, value = result)
+            self.cache_driver.compose_ranking(key = cachekey, coefficient = Decimal(coefficient), additional = additional_scores)
         except Exception as e:
             print(e)
             raise FatalAppException()
@@ -867,18 +1151,18 @@ class DefaultStockInteractor(StockUsecase):
         limit    = input_data.limit
         offset   = input_data.offset
 
-        result = dict()
+        result = list()
         try:
-            result = self.cache_driver.get_dictionary(key = cachekey)
+            result = self.cache_driver.get_ranking(key = cachekey, limit = limit, offset = offset)
         except Exception as e:
             print(e)
             raise FatalAppException()
 
         output_data = GetCachedataOutput(
-                scores = sorted([GetCachedataOutput.StockScore(
+                scores = [GetCachedataOutput.StockScore(
                     code  = key,
-                    score = Decimal(value)
-                    ) for (key, value) in result.items()], key=lambda x: x.score, reverse=True)[offset:offset+limit]
+                    score = value
+                    ) for (key, value) in result]
                 )
 
         return output_data
@@ -902,14 +1186,28 @@ class DefaultStockInteractor(StockUsecase):
                 to_date = base_date
                 ))
 
+        # The vectorized backend reads the columnar series, and makes the candlestick of the newest date only.
+        def series_task(ctx: TxContext):
+            return self.stock_repository.get_range_series(ctx, stock_repository_inputdata.GetRangeSeriesInput(
+                code    = '',
+                market  = market,
+                tags    = tags,
+                limit   = term,
+                to_date = base_date
+                ))
+
         result = list()
         try:
-            output = self.transaction.do_in_tx(task)
-
-            for (key, sticks) in output.candlesticks.items():
-                max_price = max([Decimal(item.close_price) for item in sticks])
-                if max_price == sticks[0].close_price:
-                    result.append(sticks[0])
+            if self.numeric.vectorized:
+                for series in self.transaction.do_in_tx(series_task).universe:
+                    # Oldest first, unlike the candlesticks.
+                    if len(series) > 0 and series.close_prices.max() == series.close_prices[-1]:
+                        result.append(series[-1:].to_candlesticks()[0])
+            else:
+                for (key, sticks) in self.transaction.do_in_tx(task).candlesticks.items():
+                    prices = self.numeric.array(self.numeric.numbers([item.close_price for item in sticks]))
+                    if prices.max() == prices[0]:
+                        result.append(sticks[0])
 
         except Exception as e:
             print(e)
@@ -940,14 +1238,28 @@ class DefaultStockInteractor(StockUsecase):
                 to_date = base_date
                 ))
 
+        # The vectorized backend reads the columnar series, and makes the candlestick of the newest date only.
+        def series_task(ctx: TxContext):
+            return self.stock_repository.get_range_series(ctx, stock_repository_inputdata.GetRangeSeriesInput(
+                code    = '',
+                market  = market,
+                tags    = tags,
+                limit   = term,
+                to_date = base_date
+                ))
+
         result = list()
         try:
-            output = self.transaction.do_in_tx(task)
-
-            for (key, sticks) in output.candlesticks.items():
-                min_price = min([Decimal(item.close_price) for item in sticks])
-                if min_price == sticks[0].close_price:
-                    result.append(sticks[0])
+            if self.numeric.vectorized:
+                for series in self.transaction.do_in_tx(series_task).universe:
+                    # Oldest first, unlike the candlesticks.
+                    if len(series) > 0 and series.close_prices.min() == series.close_prices[-1]:
+                        result.append(series[-1:].to_candlesticks()[0])
+            else:
+                for (key, sticks) in self.transaction.do_in_tx(task).candlesticks.items():
+                    prices = self.numeric.array(self.numeric.numbers([item.close_price for item in sticks]))
+                    if prices.min() == prices[0]:
+                        result.append(sticks[0])
 
         except Exception as e:
             print(e)
@@ -986,7 +1298,7 @@ class DefaultStockInteractor(StockUsecase):
             raise FatalAppException()
 
         output_data = GetAverageAtrOutput(
-                average_atr = Atr(candlesticks = output.candlesticks[code]).average(term)[0]
+                average_atr = Atr(candlesticks = output.candlesticks[code], numeric = self.numeric).average(term)[0]
                 )
 
         return output_data
@@ -1020,36 +1332,14 @@ class DefaultStockInteractor(StockUsecase):
         try:
             output = self.transaction.do_in_tx(task)
 
-            invest_rule = None
-            if rule_type == InvestRuleType.TURTLE:
-                invest_rule = TurtleInvestRule(unit_number = unit, losscut_rate = losscut_rate)
-            elif rule_type == InvestRuleType.RANDOM:
-                tickers = [ticker for (ticker, sticks) in output.candlesticks.items()]
-                invest_rule = RandomInvestRule(unit_number = unit, losscut_rate = losscut_rate, tickers = tickers)
-            elif rule_type == InvestRuleType.RANDOM_LONG:
-                tickers = [ticker for (ticker, sticks) in output.candlesticks.items()]
-                invest_rule = RandomLongInvestRule(unit_number = unit, losscut_rate = losscut_rate, tickers = tickers)
-            elif rule_type == InvestRuleType.RANDOM_TRAIL:
-                tickers = [ticker for (ticker, sticks) in output.candlesticks.items()]
-                invest_rule = RandomTrailLongInvestRule(unit_number = unit, losscut_rate = losscut_rate, tickers = tickers)
-            elif rule_type == InvestRuleType.GOLDEN_TRAIL:
-                invest_rule = GoldenTrailLongInvestRule(unit_number = unit, losscut_rate = losscut_rate)
-            elif rule_type == InvestRuleType.SERIAL_STEPUP_TRAIL:
-                invest_rule = SerialStepupTrailLongInvestRule(unit_number = unit, losscut_rate = losscut_rate)
-            elif rule_type == InvestRuleType.TRIPLE_STEPUP_TRAIL:
-                invest_rule = TripleStepupTrailLongInvestRule(unit_number = unit, losscut_rate = losscut_rate)
-            elif rule_type == InvestRuleType.BUYHOLD:
-                stick_numbers = {ticker: len(sticks) for (ticker, sticks) in output.candlesticks.items()}
-                invest_rule = BuyholdInvestRule(unit_number = unit, losscut_rate = losscut_rate, stick_numbers = stick_numbers)
-            else:
-                # TODO
-                pass
+            invest_rule = make_invest_rule(rule_type = rule_type, unit = unit, losscut_rate = losscut_rate, candlesticks = output.candlesticks)
 
             simulator = InvestSimulator(
                     rule       = invest_rule,
                     sticks     = output.candlesticks,
                     cash       = principal,
-                    commission = commission
+                    commission = commission,
+                    cache      = IndicatorCache(output.candlesticks, self.numeric)
                     )
             simulator.simulate()
         except Exception as e:
@@ -1062,6 +1352,185 @@ class DefaultStockInteractor(StockUsecase):
 
         return output_data
 
+    # ---------------------------------------------------------------------------------
+    # Simulate trade rule repeatedly with the seeded generators.
+    # ---------------------------------------------------------------------------------
+    def simulate_trade_rule_montecarlo(self, input_data: SimulateTradeRuleMonteCarloInput) -> SimulateTradeRuleMonteCarloOutput:
+        rule_type    = input_data.rule_type
+        code         = input_data.code
+        market       = input_data.market
+        tags         = input_data.tags
+        unit         = input_data.unit
+        losscut_rate = input_data.losscut_rate
+        term         = input_data.term
+        today        = input_data.today
+        principal    = input_data.principal
+        commission   = input_data.commission
+        loop_num     = input_data.loop_num
+        seed         = input_data.seed
+        workers      = input_data.workers
+        detail       = input_data.detail
+
+        # Application Logic.
+        def task(ctx: TxContext):
+            return self.stock_repository.get_range(ctx, stock_repository_inputdata.GetRangeInput(
+                code    = code,
+                market  = market,
+                tags    = tags,
+                limit   = term,
+                to_date = today
+                ))
+
+        try:
+            output = self.transaction.do_in_tx(task)
+            arguments = [(rule_type, unit, losscut_rate, principal, commission, seed, index, detail) for index in range(loop_num)]
+
+            if workers <= 1:
+                init_simulation_worker(output.candlesticks, self.numeric)
+                try:
+                    reports = [simulate_seeded_trade_rule(*a) for a in arguments]
+                finally:
+                    reset_simulation_worker()
+            else:
+                with ProcessPoolExecutor(max_workers = workers, initializer = init_simulation_worker, initargs = (output.candlesticks, self.numeric)) as executor:
+                    reports = list(executor.map(simulate_seeded_trade_rule, *zip(*arguments), chunksize = max(1, loop_num // (workers * 4))))
+        except Exception as e:
+            print(e)
+            raise FatalAppException()
+
+        output_data = SimulateTradeRuleMonteCarloOutput(
+                reports      = reports,
+                distribution = SimulationDistribution.from_reports(reports = reports, probabilities = input_data.probabilities)
+                )
+
+        return output_data
+
+    # ---------------------------------------------------------------------------------
+    # Simulate trade rule with every combination of the parameters, and rank them.
+    # ---------------------------------------------------------------------------------
+    def sweep_trade_rule(self, input_data: SweepTradeRuleInput) -> SweepTradeRuleOutput:
+        rule_type    = input_data.rule_type
+        code         = input_data.code
+        market       = input_data.market
+        tags         = input_data.tags
+        term         = input_data.term
+        today        = input_data.today
+        principal    = input_data.principal
+        commission   = input_data.commission
+        parameters   = input_data.parameters
+        loop_num     = input_data.loop_num
+        seed         = input_data.seed
+        workers      = input_data.workers
+
+        # Application Logic.
+        def task(ctx: TxContext):
+            return self.stock_repository.get_range(ctx, stock_repository_inputdata.GetRangeInput(
+                code    = code,
+                market  = market,
+                tags    = tags,
+                limit   = term,
+                to_date = today
+                ))
+
+        try:
+            output = self.transaction.do_in_tx(task)
+
+            # Every combination runs with the same seeds, so the difference of the results comes from the parameters.
+            names        = list(parameters.keys())
+            combinations = [dict(zip(names, values)) for values in itertools.product(*[parameters[name] for name in names])]
+            arguments    = [(rule_type, combination, principal, commission, seed, loop_num) for combination in combinations]
+
+            if workers <= 1:
+                init_simulation_worker(output.candlesticks, self.numeric)
+                try:
+                    results = [sweep_seeded_trade_rule(*a) for a in arguments]
+                finally:
+                    reset_simulation_worker()
+            else:
+                with ProcessPoolExecutor(max_workers = workers, initializer = init_simulation_worker, initargs = (output.candlesticks, self.numeric)) as executor:
+                    results = list(executor.map(sweep_seeded_trade_rule, *zip(*arguments), chunksize = max(1, len(arguments) // (workers * 4))))
+        except Exception as e:
+            print(e)
+            raise FatalAppException()
+
+        output_data = SweepTradeRuleOutput(
+                results = sorted(results, key = lambda r: r.valuation, reverse = True)
+                )
+
+        return output_data
+
+    # ---------------------------------------------------------------------------------
+    # Simulate trade rule on the rolling windows, from the oldest to the newest.
+    # The candlesticks are fetched once and each window is a slice of them.
+    # ---------------------------------------------------------------------------------
+    def walk_forward_trade_rule(self, input_data: WalkForwardTradeRuleInput) -> WalkForwardTradeRuleOutput:
+        rule_type    = input_data.rule_type
+        code         = input_data.code
+        market       = input_data.market
+        tags         = input_data.tags
+        unit         = input_data.unit
+        losscut_rate = input_data.losscut_rate
+        term         = input_data.term
+        windows      = input_data.windows
+        step         = input_data.step
+        today        = input_data.today
+        principal    = input_data.principal
+        commission   = input_data.commission
+        seed         = input_data.seed
+        workers      = input_data.workers
+        detail       = input_data.detail
+
+        if term <= 0 or windows <= 0 or step <= 0:
+            raise InvalidDataAppException()
+
+        # Application Logic.
+        def task(ctx: TxContext):
+            return self.stock_repository.get_range(ctx, stock_repository_inputdata.GetRangeInput(
+                code    = code,
+                market  = market,
+                tags    = tags,
+                limit   = term + step * (windows - 1),
+                to_date = today
+                ))
+
+        try:
+            output = self.transaction.do_in_tx(task)
+
+            offsets   = [step * (windows - 1 - index) for index in range(windows)]
+            offsets   = [offset for offset in offsets if len(window_candlesticks(output.candlesticks, offset, term)) > 0]
+            arguments = [(rule_type, unit, losscut_rate, principal, commission, seed, index, detail, None, offset, term) for (index, offset) in enumerate(offsets)]
+
+            if workers <= 1 or len(arguments) <= 1:
+                init_simulation_worker(output.candlesticks, self.numeric)
+                try:
+                    reports = [simulate_seeded_trade_rule(*a) for a in arguments]
+                finally:
+                    reset_simulation_worker()
+            else:
+                with ProcessPoolExecutor(max_workers = workers, initializer = init_simulation_worker, initargs = (output.candlesticks, self.numeric)) as executor:
+                    reports = list(executor.map(simulate_seeded_trade_rule, *zip(*arguments)))
+        except Exception as e:
+            print(e)
+            raise FatalAppException()
+
+        result = list()
+        for (index, (offset, report)) in enumerate(zip(offsets, reports)):
+            sticks = window_candlesticks(output.candlesticks, offset, term)
+            result.append(WalkForwardWindow(
+                index      = index,
+                first_date = min([s[-1].date for s in sticks.values()]),
+                last_date  = max([s[0].date for s in sticks.values()]),
+                report     = report
+                ))
+
+        output_data = WalkForwardTradeRuleOutput(
+                windows      = result,
+                summary      = WalkForwardSummary.from_reports(reports = reports),
+                distribution = SimulationDistribution.from_reports(reports = reports, probabilities = [Decimal(p) for p in ['0', '0.25', '0.5', '0.75', '1']])
+                )
+
+        return output_data
+
     # ---------------------------------------------------------------------------------
     # Predict setup signal.
     # ---------------------------------------------------------------------------------
@@ -1251,14 +1720,14 @@ class DefaultStockInteractor(StockUsecase):
         cachekey = input_data.cachekey
         limit    = input_data.limit
 
-        cachedata = {}
+        cachedata = []
         try:
-            cachedata = self.cache_driver.get_dictionary(key = cachekey)
+            cachedata = self.cache_driver.get_ranking(key = cachekey, limit = limit)
         except Exception as e:
             print(e)
             raise FatalAppException()
 
-        stocks = list(map(lambda x: x['stock'], sorted([{'stock': Stock(code = key.split(':')[1], market = key.split(':')[0], tags = [cachetagname]), 'value': value} for (key, value) in cachedata.items()], key=lambda x: x['value'], reverse=True)[0:0+limit]))
+        stocks = [Stock(code = key.split(':')[1], market = key.split(':')[0], tags = [cachetagname]) for (key, value) in cachedata]
 
         # Application Logic.
         def task(ctx: TxContext):
@@ -1275,3 +1744,35 @@ class DefaultStockInteractor(StockUsecase):
         output_data = MakeCachetagOutput()
 
         return output_data
+
+    # ---------------------------------------------------------------------------------
+    # Export the candlesticks and the tags of the market to the export repository.
+    # ---------------------------------------------------------------------------------
+    def export_candlesticks(self, input_data: ExportCandlesticksInput) -> ExportCandlesticksOutput:
+        market = input_data.market
+
+        if self.stock_export_repository == None:
+            raise FatalAppException()
+
+        # Application Logic.
+        # The tags are read before streaming, since the stream keeps the cursor of the transaction open.
+        def task(ctx: TxContext):
+            tickers = self.export_source_repository.get_tickers(ctx, stock_repository_inputdata.GetTickersInput(market = market)).tickers
+            if len(tickers) == 0:
+                raise DataNotfoundAppException()
+            tags    = self.export_source_repository.find_tags(ctx, stock_repository_inputdata.FindTagsInput(market = market)).tags
+            output  = self.export_source_repository.stream_all(ctx, stock_repository_inputdata.StreamAllInput(market = market, tags = [], from_date = None, to_date = None))
+            return self.stock_export_repository.export_market(stock_repository_inputdata.ExportMarketInput(market = market, candlesticks = output.candlesticks, tags = tags))
+
+        try:
+            result = self.transaction.do_in_tx(task)
+        except Exception as e:
+            print(e)
+            raise FatalAppException()
+
+        output_data = ExportCandlesticksOutput(
+                tickers      = result.tickers,
+                candlesticks = result.candlesticks
+                )
+
+        return output_data
@@ -1,6 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
-from typing import List
+from typing import Any, Dict, List, Iterable, Tuple
 
 from app.domain.stock import *
 from app.domain.analyze import *
@@ -10,6 +10,25 @@ from app.domain.invest import *
 class CreateCandlestickInput:
     safe:         bool
     candlesticks: List[Candlestick]
+    bulk:         bool = False
+
+@dataclass
+class CreateCandlestickChunksInput:
+    safe:        bool
+    chunks:      Iterable[List[Candlestick]]
+    incremental: bool = False
+    # Save the other rows and return the conflicting ones, instead of raising InconsistencyDataException.
+    skip_conflicts: bool = False
+    # The first date of the rows of each ticker saved from the same file by the chunks before, when a file is loaded chunk by chunk.
+    loaded_from: Dict[Tuple[str, str], date] = field(default_factory=dict)
+
+@dataclass
+class GetIngestionInput:
+    path: str
+
+@dataclass
+class CreateIngestionInput:
+    ingestion: Ingestion
 
 @dataclass
 class CreateTagInput:
@@ -206,6 +225,57 @@ class SimulateTradeRuleInput:
     principal:    Decimal
     commission:   Commission
 
+@dataclass
+class SimulateTradeRuleMonteCarloInput:
+    rule_type:     InvestRuleType
+    code:          str
+    market:        str
+    tags:          List[str]
+    unit:          int
+    losscut_rate:  Decimal
+    today:         date
+    term:          int
+    principal:     Decimal
+    commission:    Commission
+    loop_num:      int
+    seed:          int
+    workers:       int           = 1
+    detail:        bool          = False
+    probabilities: List[Decimal] = field(default_factory=lambda: [Decimal(p) for p in ['0', '0.05', '0.25', '0.5', '0.75', '0.95', '1']])
+
+@dataclass
+class SweepTradeRuleInput:
+    rule_type:  InvestRuleType
+    code:       str
+    market:     str
+    tags:       List[str]
+    today:      date
+    term:       int
+    principal:  Decimal
+    commission: Commission
+    parameters: Dict[str, List[Any]]
+    loop_num:   int = 1
+    seed:       int = 0
+    workers:    int = 1
+
+@dataclass
+class WalkForwardTradeRuleInput:
+    rule_type:    InvestRuleType
+    code:         str
+    market:       str
+    tags:         List[str]
+    unit:         int
+    losscut_rate: Decimal
+    today:        date
+    term:         int
+    windows:      int
+    step:         int
+    principal:    Decimal
+    commission:   Commission
+    seed:         int  = 0
+    workers:      int  = 1
+    detail:       bool = False
+
 @dataclass
 class PredictSetupSignalInput:
     rule_type: InvestRuleType
@@ -240,3 +310,7 @@ class GetEachLaststickInput:
 class MakeCachetagInput:
     cachekey: str
     limit:    int
+
+@dataclass
+class ExportCandlesticksInput:
+    market: str
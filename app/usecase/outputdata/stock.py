@@ -1,6 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 from app.domain.stock import *
 from app.domain.analyze import *
@@ -10,6 +10,24 @@ from app.domain.simulator import *
 class CreateCandlestickOutput:
     pass
 
+@dataclass
+class CreateCandlestickChunksOutput:
+    count:   int
+    skipped: int = 0
+    # The rows left out by skip_conflicts, and the present rows they conflicted with.
+    present: List[Candlestick] = field(default_factory=list)
+    newer:   List[Candlestick] = field(default_factory=list)
+    # The first date of the rows of each ticker saved without a gap, to pass to the next chunk of the file.
+    loaded_from: Dict[Tuple[str, str], date] = field(default_factory=dict)
+
+@dataclass
+class GetIngestionOutput:
+    ingestion: Ingestion
+
+@dataclass
+class CreateIngestionOutput:
+    pass
+
 @dataclass
 class CreateTagOutput:
     pass
@@ -136,6 +154,21 @@ class GetAverageAtrOutput:
 class SimulateTradeRuleOutput:
     report: SimulationReport
 
+@dataclass
+class SimulateTradeRuleMonteCarloOutput:
+    reports:      List[SimulationReport]
+    distribution: SimulationDistribution
+
+@dataclass
+class SweepTradeRuleOutput:
+    results: List[SweepResult]
+
+@dataclass
+class WalkForwardTradeRuleOutput:
+    windows:      List[WalkForwardWindow]
+    summary:      WalkForwardSummary
+    distribution: SimulationDistribution
+
 @dataclass
 class PredictSetupSignalOutput:
     candlesticks: List[Candlestick]
@@ -159,3 +192,8 @@ class GetEachLaststickOutput:
 @dataclass
 class MakeCachetagOutput:
     pass
+
+@dataclass
+class ExportCandlesticksOutput:
+    tickers:      int
+    candlesticks: int
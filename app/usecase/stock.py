@@ -8,10 +8,34 @@ class StockUsecase(metaclass=ABCMeta):
     def simulate_trade_rule(self, input_data: SimulateTradeRuleInput) -> SimulateTradeRuleOutput:
         raise NotImplementedError
 
+    @abstractmethod
+    def simulate_trade_rule_montecarlo(self, input_data: SimulateTradeRuleMonteCarloInput) -> SimulateTradeRuleMonteCarloOutput:
+        raise NotImplementedError
+
+    @abstractmethod
+    def sweep_trade_rule(self, input_data: SweepTradeRuleInput) -> SweepTradeRuleOutput:
+        raise NotImplementedError
+
+    @abstractmethod
+    def walk_forward_trade_rule(self, input_data: WalkForwardTradeRuleInput) -> WalkForwardTradeRuleOutput:
+        raise NotImplementedError
+
     @abstractmethod
     def create_candlestick(self, input_data: CreateCandlestickInput) -> CreateCandlestickOutput:
         raise NotImplementedError
 
+    @abstractmethod
+    def create_candlestick_chunks(self, input_data: CreateCandlestickChunksInput) -> CreateCandlestickChunksOutput:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_ingestion(self, input_data: GetIngestionInput) -> GetIngestionOutput:
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_ingestion(self, input_data: CreateIngestionInput) -> CreateIngestionOutput:
+        raise NotImplementedError
+
     @abstractmethod
     def create_tag(self, input_data: CreateTagInput) -> CreateTagOutput:
         raise NotImplementedError
@@ -123,3 +147,7 @@ class StockUsecase(metaclass=ABCMeta):
     @abstractmethod
     def make_cachetag(self, input_data: MakeCachetagInput) -> MakeCachetagOutput:
         raise NotImplementedError
+
+    @abstractmethod
+    def export_candlesticks(self, input_data: ExportCandlesticksInput) -> ExportCandlesticksOutput:
+        raise NotImplementedError
@@ -0,0 +1,75 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterator, List
+import random
+
+from app.domain.stock import Candlestick, Interval, Stock
+
+# ---------------------------------------------------------------------------------
+# Deterministic synthetic OHLCV market for the benchmarks and the tests. Each ticker
+# has its own random generator seeded from (seed, index), so the data does not
+# depend on the generation order.
+# ---------------------------------------------------------------------------------
+@dataclass
+class SyntheticMarket:
+    tickers:    int
+    days:       int
+    seed:       int  = 1
+    market:     str  = 'BENCH'
+    first_date: date = date(2000, 1, 3)
+
+    trading_dates: List[date] = field(init = False, repr = False)
+
+    def __post_init__(self):
+        self.trading_dates = list()
+        current = self.first_date
+        while len(self.trading_dates) < self.days:
+            if current.weekday() < 5:
+                self.trading_dates.append(current)
+            current = current + timedelta(days=1)
+
+    def codes(self) -> List[str]:
+        return [self.code(index) for index in range(self.tickers)]
+
+    def code(self, index:int) -> str:
+        return f"T{index:05d}"
+
+    def last_date(self) -> date:
+        return self.trading_dates[-1]
+
+    def candlesticks(self, index:int) -> List[Candlestick]:
+        rng    = random.Random(self.seed * 1000003 + index)
+        code   = self.code(index)
+        price  = rng.uniform(10, 500)
+        volume = rng.randint(10000, 10000000)
+
+        result = list()
+        for current in self.trading_dates:
+            open_price  = price
+            close_price = max(open_price * (1 + rng.gauss(0.0003, 0.02)), 0.01)
+            high_price  = max(open_price, close_price) * (1 + abs(rng.gauss(0, 0.005)))
+            low_price   = min(open_price, close_price) * (1 - abs(rng.gauss(0, 0.005)))
+            result.append(Candlestick(
+                code        = code,
+                market      = self.market,
+                date        = current,
+                open_price  = Decimal(f"{open_price:.2f}"),
+                close_price = Decimal(f"{close_price:.2f}"),
+                high_price  = Decimal(f"{high_price:.2f}"),
+                low_price   = Decimal(f"{max(low_price, 0.01):.2f}"),
+                volume      = max(int(volume * rng.lognormvariate(0, 0.3)), 1),
+                interval    = Interval.DAILY
+                ))
+            price = close_price
+
+        return result
+
+    def chunks(self) -> Iterator[List[Candlestick]]:
+        for index in range(self.tickers):
+            yield self.candlesticks(index)
+
+    def stocks(self) -> List[Stock]:
+        # Every tenth ticker has 'bench-tag' to cover the tag filter.
+        return [Stock(code = code, market = self.market, tags = ['bench-tag'] if index % 10 == 0 else ['bench-other']) for (index, code) in enumerate(self.codes())]
@@ -0,0 +1,268 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Callable, Dict, List
+import argparse
+import gc
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.repository.sqlalchemy.dto.stock   import Base
+from app.repository.sqlalchemy.transaction import SqlalchemyTransaction
+from app.repository.sqlalchemy.stock       import SqlalchemyStockRepository
+from app.repository.cached.stock           import CachedStockRepository
+from app.repository.cached.window          import WindowCachedStockRepository
+from app.repository.columnar.stock         import ColumnarStockRepository
+from app.repository.columnar.export        import ColumnarStockExportRepository
+from app.usecase.default.stock             import DefaultStockInteractor
+from app.usecase.inputdata.stock           import *
+from app.driver.memory.cache               import MemoryCacheDriver
+from app.driver.memory.window              import MemoryWindowCacheDriver
+
+from app.domain.analyze    import RankingOrder, TrendType
+from app.domain.numeric    import NumericBackendType, make_numeric_backend
+from app.domain.invest     import InvestRuleType, StandardCommission, TurtleInvestRule, GoldenTrailLongInvestRule, History, PositionType
+from app.domain.statistics import Statistics, ArrayStatistics
+from app.domain.simulator  import InvestSimulator, ReportBuilder
+
+from app.util.market import SyntheticMarket
+
+@dataclass
+class BenchmarkResult:
+    name:           str
+    seconds:        List[float] = field(default_factory=list)
+    traced_seconds: List[float] = field(default_factory=list)
+    peak_bytes:     int         = 0
+    blocks:         int         = 0
+
+    def summary(self) -> Dict:
+        summary = {
+                'name':    self.name,
+                'seconds': self.seconds,
+                'min':     min(self.seconds),
+                'median':  statistics.median(self.seconds)
+                }
+        if len(self.traced_seconds) > 0:
+            summary['traced_median'] = statistics.median(self.traced_seconds)
+            summary['peak_bytes']    = self.peak_bytes
+            summary['blocks']        = self.blocks
+        return summary
+
+# ---------------------------------------------------------------------------------
+# Run the function `repeat` times and record the wall clock time of each run.
+# With traced, run it again under tracemalloc. Tracing makes every allocation
+# expensive, so the traced time grows with the allocator churn, and the peak shows
+# the memory held at once. The blocks are the allocated memory blocks the run left
+# behind (sys.getallocatedblocks), so a cache or a leak shows there.
+# ---------------------------------------------------------------------------------
+def measure(name:str, func:Callable, repeat:int, traced:bool = False) -> BenchmarkResult:
+    result = BenchmarkResult(name = name)
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        result.seconds.append(time.perf_counter() - started_at)
+
+    if traced:
+        for _ in range(repeat):
+            gc.collect()
+            blocks = sys.getallocatedblocks()
+            tracemalloc.start()
+            started_at = time.perf_counter()
+            func()
+            result.traced_seconds.append(time.perf_counter() - started_at)
+            result.peak_bytes = max(result.peak_bytes, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            gc.collect()
+            result.blocks = max(result.blocks, sys.getallocatedblocks() - blocks)
+    return result
+
+# ---------------------------------------------------------------------------------
+# Build the interactor on SQLite and the memory cache driver, loaded with the synthetic market.
+# With columnar, the market is exported into the directory and read from there instead.
+# ---------------------------------------------------------------------------------
+def build_interactor(market:SyntheticMarket, database:str, numeric:NumericBackendType = NumericBackendType.DECIMAL, cache_capacity:int = 0, window_cache:bool = False, columnar:str = '') -> (DefaultStockInteractor, List[BenchmarkResult]):
+    transaction = SqlalchemyTransaction(target_url = database, pool_recycle = 60)
+    Base.metadata.drop_all(transaction.sql_engine)
+    Base.metadata.create_all(transaction.sql_engine)
+
+    repository = SqlalchemyStockRepository()
+    if window_cache:
+        repository = WindowCachedStockRepository(repository = repository, driver = MemoryWindowCacheDriver(), ttl = 3600)
+    if cache_capacity > 0:
+        repository = CachedStockRepository(repository = repository, capacity = cache_capacity)
+
+    interactor = DefaultStockInteractor(
+            stock_repository = repository,
+            transaction      = transaction,
+            cache_driver     = MemoryCacheDriver(),
+            numeric          = make_numeric_backend(numeric),
+            stock_export_repository = ColumnarStockExportRepository(root = columnar) if columnar != '' else None
+            )
+
+    load = measure('create_candlestick_chunks', lambda: interactor.create_candlestick_chunks(CreateCandlestickChunksInput(safe = True, chunks = market.chunks())), 1)
+    interactor.create_tag(CreateTagInput(stocks = market.stocks()))
+    if columnar == '':
+        return (interactor, [load])
+
+    export = measure('export_candlesticks', lambda: interactor.export_candlesticks(ExportCandlesticksInput(market = market.market)), 1)
+    interactor.stock_repository = ColumnarStockRepository(root = columnar)
+    return (interactor, [load, export])
+
+# ---------------------------------------------------------------------------------
+# Benchmark cases. Each case is (name, function).
+# ---------------------------------------------------------------------------------
+def cases(interactor:DefaultStockInteractor, market:SyntheticMarket, seed:int) -> List:
+    today      = market.last_date()
+    name       = market.market
+    commission = StandardCommission(minimum = Decimal('0'), maximum = Decimal('22.2'), rate = Decimal('0.0495'))
+
+    sticks = market.candlesticks(0)
+    values = [stick.close_price for stick in sticks]
+    array  = np.array([float(value) for value in values])
+    matrix = np.stack([array] * min(market.tickers, 100))
+
+    # The simulator alone on the candlesticks in memory, without the repository.
+    universe = {market.code(index): list(reversed(market.candlesticks(index))) for index in range(min(market.tickers, 100))}
+    def simulate_in_memory(rule_class):
+        random.seed(seed)
+        simulator = InvestSimulator(rule = rule_class(unit_number = 10, losscut_rate = Decimal('0.1')), sticks = universe, cash = Decimal('100000'), commission = commission)
+        simulator.simulate()
+        return simulator.report(sticks = {k: v[0] for (k, v) in universe.items()})
+
+    # A trade of each ticker on each day, for the report on many trades.
+    trades = {code: [History(open_date = s[i+1].date, close_date = s[i].date, open_price = s[i+1].close_price, close_price = s[i].close_price, volume = 10, position_type = PositionType.BUY if i % 2 == 0 else PositionType.SELL) for i in range(len(s) - 1)] for (code, s) in universe.items()}
+    valuations = [Decimal('100000') + Decimal(i % 17) * 100 - Decimal(i % 5) * 300 for i in range(market.days)]
+    def report_many_trades():
+        return ReportBuilder(principal = Decimal('100000'), commission = commission).build(cash = Decimal('100000'), histories = trades, positions = {}, sticks = {}, valuations = valuations)
+
+    def simulate(rule_type:InvestRuleType):
+        random.seed(seed)
+        return interactor.simulate_trade_rule(SimulateTradeRuleInput(rule_type = rule_type, code = '', market = name, tags = ['bench-tag'], unit = 10, losscut_rate = Decimal('0.1'), today = today, term = min(market.days, 250), principal = Decimal('100000'), commission = commission))
+
+    # A ranking of every ticker, composed again with the same order.
+    ranking = [f"{name}:{market.code(index)}" for index in range(market.tickers)]
+    interactor.multiple_cachedata(MultipleCachedataInput(cachekey = 'bench-ranking', coefficient = '1', additional_ranking = ranking))
+
+    return [
+            ('create_candlestick',      lambda: interactor.create_candlestick(CreateCandlestickInput(safe = True, candlesticks = sticks, bulk = True))),
+            ('get_ranking_price',       lambda: interactor.get_ranking_price(GetRankingPriceInput(market = name, tags = [], today = today, term = 90, order = RankingOrder.DESC, limit = 20, offset = 0))),
+            ('get_ranking_volume',      lambda: interactor.get_ranking_volume(GetRankingVolumeInput(market = name, tags = [], today = today, term = 90, order = RankingOrder.DESC, limit = 20, offset = 0))),
+            ('get_ranking_rs',          lambda: interactor.get_ranking_rs(GetRankingRsInput(market = name, tags = [], today = today, order = RankingOrder.DESC, limit = 20, offset = 0))),
+            ('get_ranking_deviation',   lambda: interactor.get_ranking_deviation(GetRankingDeviationInput(market = name, tags = [], today = today, longterm = 50, shortterm = 10, order = RankingOrder.DESC, limit = 20, offset = 0))),
+            ('get_trend_price',         lambda: interactor.get_trend_price(GetTrendPriceInput(market = name, tags = [], today = today, sorttype = TrendType.UP, margin = 3, term = 60, smaterm = 25, limit = 20, offset = 0))),
+            ('get_trend_volume',        lambda: interactor.get_trend_volume(GetTrendVolumeInput(market = name, tags = [], today = today, sorttype = TrendType.UP, margin = 3, term = 60, smaterm = 25, limit = 20, offset = 0))),
+            ('get_trend_momentum',      lambda: interactor.get_trend_momentum(GetTrendMomentumInput(market = name, tags = [], today = today, sorttype = TrendType.UP, margin = 3, term = 60, smaterm = 25, limit = 20, offset = 0))),
+            ('calcurate_sma',           lambda: interactor.calcurate_sma(CalcurateSmaInput(code = market.code(0), market = name, from_date = min([s.date for s in sticks]), to_date = today, term = 25))),
+            ('calcurate_ema',           lambda: interactor.calcurate_ema(CalcurateEmaInput(code = market.code(0), market = name, from_date = min([s.date for s in sticks]), to_date = today, term = 25))),
+            ('get_ath',                 lambda: interactor.get_ath(GetAthInput(market = name, tags = [], term = 250, base_date = today))),
+            ('get_atl',                 lambda: interactor.get_atl(GetAtlInput(market = name, tags = [], term = 250, base_date = today))),
+            ('multiple_cachedata',      lambda: interactor.multiple_cachedata(MultipleCachedataInput(cachekey = 'bench-ranking', coefficient = '1', additional_ranking = ranking))),
+            ('get_cachedata',           lambda: interactor.get_cachedata(GetCachedataInput(cachekey = 'bench-ranking', limit = 20, offset = 0))),
+            ('simulate_trade_rule.turtle',      lambda: simulate(InvestRuleType.TURTLE)),
+            ('simulate_trade_rule.goldentrail', lambda: simulate(InvestRuleType.GOLDEN_TRAIL)),
+            ('simulate_trade_rule.random',      lambda: simulate(InvestRuleType.RANDOM)),
+            ('invest_simulator.turtle',         lambda: simulate_in_memory(TurtleInvestRule)),
+            ('invest_simulator.goldentrail',    lambda: simulate_in_memory(GoldenTrailLongInvestRule)),
+            ('simulation_report',               report_many_trades),
+            ('statistics.sma',          lambda: Statistics(values = values).sma(term = 200)),
+            ('statistics.wma',          lambda: Statistics(values = values).wma(term = 200)),
+            ('statistics.ema',          lambda: Statistics(values = values).ema(term = 200)),
+            ('array_statistics.sma',    lambda: ArrayStatistics(values = matrix).sma(term = 200)),
+            ('array_statistics.wma',    lambda: ArrayStatistics(values = matrix).wma(term = 200)),
+            ('array_statistics.ema',    lambda: ArrayStatistics(values = matrix).ema(term = 200)),
+            ]
+
+# ---------------------------------------------------------------------------------
+# Print the ratio to the previous result file.
+# ---------------------------------------------------------------------------------
+def compare(current:Dict, previous:Dict) -> str:
+    previous_results = {result['name']: result for result in previous['results']}
+
+    message  = f"|{'Name':>35}|{'Previous':>12}|{'Current':>12}|{'Ratio':>8}|{'Traced Ratio':>13}|{'Peak Ratio':>11}|{'Blocks Diff':>12}|\n"
+    message += f"|{'':->35}|{'':->12}|{'':->12}|{'':->8}|{'':->13}|{'':->11}|{'':->12}|\n"
+    for result in current['results']:
+        if result['name'] not in previous_results:
+            continue
+        previous = previous_results[result['name']]
+        before   = previous['median']
+        message += f"|{result['name']:>35}|{before:>12.6f}|{result['median']:>12.6f}|{result['median'] / before if before > 0 else 0:>8.2f}|"
+        if 'traced_median' in result and 'traced_median' in previous:
+            message += f"{result['traced_median'] / previous['traced_median']:>13.2f}|{result['peak_bytes'] / max(previous['peak_bytes'], 1):>11.2f}|{result.get('blocks', 0) - previous.get('blocks', 0):>+12,}|\n"
+        else:
+            message += f"{'':>13}|{'':>11}|{'':>12}|\n"
+    return message
+
+def revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return ''
+
+def main(argv:List[str]) -> int:
+    parser = argparse.ArgumentParser(description = 'Benchmark the usecases on a synthetic market.')
+    parser.add_argument('--tickers',  type = int, default = 100)
+    parser.add_argument('--days',     type = int, default = 250)
+    parser.add_argument('--seed',     type = int, default = 1)
+    parser.add_argument('--repeat',   type = int, default = 3)
+    parser.add_argument('--database', default = 'sqlite://', help = 'SQLAlchemy url. In-memory SQLite by default.')
+    parser.add_argument('--only',     default = '', help = 'Run the cases which include this keyword.')
+    parser.add_argument('--output',   default = '', help = 'Write the result as JSON to this file.')
+    parser.add_argument('--compare',  default = '', help = 'Compare with the JSON result of a previous run.')
+    parser.add_argument('--numeric',  default = 'decimal', choices = ['decimal', 'float'], help = 'Numeric backend of the analytics.')
+    parser.add_argument('--cache-capacity', type = int, default = 0, help = 'Wrap the repository in the read cache of this capacity. The repeated runs hit it.')
+    parser.add_argument('--window-cache', action = 'store_true', help = 'Wrap the repository in the window cache tier on the memory driver. The repeated runs read the packed windows.')
+    parser.add_argument('--columnar', default = '', help = 'Export the market into the columnar store in this directory and read it from there. The cases which write are skipped.')
+    parser.add_argument('--tracemalloc', action = 'store_true', help = 'Also measure each case under tracemalloc (traced time and peak memory).')
+    args = parser.parse_args(argv)
+
+    market = SyntheticMarket(tickers = args.tickers, days = args.days, seed = args.seed)
+    (interactor, results) = build_interactor(market, args.database, NumericBackendType[args.numeric.upper()], args.cache_capacity, args.window_cache, args.columnar)
+
+    for (name, func) in cases(interactor, market, args.seed):
+        if args.only in name and not (args.columnar != '' and name == 'create_candlestick'):
+            results.append(measure(name, func, args.repeat, args.tracemalloc))
+            summary = results[-1].summary()
+            print(f"{name:>35}: {summary['median']:.6f}s" + (f" (traced: {summary['traced_median']:.6f}s, peak: {summary['peak_bytes']:,} bytes, blocks: {summary['blocks']:,})" if args.tracemalloc else ''), file=sys.stderr)
+
+    output = {
+            'meta': {
+                'tickers':  args.tickers,
+                'days':     args.days,
+                'seed':     args.seed,
+                'repeat':   args.repeat,
+                'database': args.database,
+                'numeric':  args.numeric,
+                'cache_capacity': args.cache_capacity,
+                'window_cache': args.window_cache,
+                'columnar': args.columnar != '',
+                'revision': revision(),
+                'python':   platform.python_version(),
+                'numpy':    np.__version__,
+                'sqlite':   sqlite3.sqlite_version
+                },
+            'results': [result.summary() for result in results]
+            }
+
+    if args.output != '':
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+
+    if args.compare != '':
+        with open(args.compare) as f:
+            print(compare(output, json.load(f)), file=sys.stderr)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -2,6 +2,8 @@ DROP TABLE IF EXISTS `candlesticks`;
 DROP TABLE IF EXISTS `tags`;
 DROP TABLE IF EXISTS `stocks_tags`;
 DROP TABLE IF EXISTS `delistings`;
+DROP TABLE IF EXISTS `ingestions`;
+DROP TABLE IF EXISTS `ingestion_watermarks`;
 
 create table IF not exists `candlesticks`
 (
@@ -33,3 +35,21 @@ create table IF not exists `stocks_tags`
  `tag_id`       INT NOT NULL,
     PRIMARY KEY (`code`, `market`, `tag_id`)
 ) DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin;
+
+create table IF not exists `ingestions`
+(
+ `path`         VARCHAR(512) NOT NULL,
+ `size`         BIGINT NOT NULL,
+ `hash`         VARCHAR(64) NOT NULL,
+ `row_count`    INT NOT NULL,
+    PRIMARY KEY (`path`)
+) DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin;
+
+create table IF not exists `ingestion_watermarks`
+(
+ `code`         VARCHAR(20) NOT NULL,
+ `market`       VARCHAR(20) NOT NULL,
+ `first_date`   DATE NOT NULL,
+ `last_date`    DATE NOT NULL,
+    PRIMARY KEY (`code`, `market`)
+) DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin;
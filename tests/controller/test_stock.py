@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from decimal import Decimal
+
+import app.controller.cli.stock as cli_stock
+
+from app.controller.cli.stock              import CliStockController
+from app.usecase.default.stock             import DefaultStockInteractor
+from app.repository.sqlalchemy.stock       import SqlalchemyStockRepository
+from app.repository.sqlalchemy.transaction import SqlalchemyTransaction
+from app.repository.inputdata.stock        import GetOnesAllInput, GetWatermarksInput, SaveBulkInput
+from app.domain.stock                      import Candlestick, Interval
+from app.driver.memory.cache               import MemoryCacheDriver
+
+def write_csv(dirname:str, filename:str, rows):
+    with open(os.path.join(dirname, filename), 'w') as f:
+        f.write('code,market,date,open,high,low,close,volume\n')
+        for (code, day, price) in rows:
+            f.write(f"{code},M,{day},{price},{price},{price},{price},100\n")
+
+def exit_worker(filename, chunk_size, queue):
+    os._exit(1)
+
+class TestLoadDirectory(unittest.TestCase):
+
+    def setUp(self):
+        self.repository  = SqlalchemyStockRepository()
+        self.transaction = SqlalchemyTransaction(target_url = 'sqlite://', pool_recycle = 60, create_schema = True)
+        self.interactor  = DefaultStockInteractor(stock_repository = self.repository, transaction = self.transaction, cache_driver = MemoryCacheDriver())
+        self.controller  = CliStockController(stock_usecase = self.interactor)
+        self.controller.load_poll_interval = 0.1
+        self.directory   = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def sticks(self, code:str):
+        return self.transaction.do_in_tx(lambda ctx: self.repository.get_ones_all(ctx, GetOnesAllInput(code = code, market = 'M', from_date = None, to_date = None))).candlesticks
+
+    def test_conflicts_do_not_discard_chunk(self):
+        """
+        load_directory saves the rows of the chunk besides the conflicting ones
+        """
+        price = Decimal('10')
+        present = Candlestick(code = 'AAA', market = 'M', date = date(2021, 1, 4), open_price = price, close_price = price, high_price = price, low_price = price, volume = 100, interval = Interval.DAILY)
+        self.transaction.do_in_tx(lambda ctx: self.repository.save_bulk(ctx, SaveBulkInput(candlesticks = [present])))
+        write_csv(self.directory.name, 'a.csv', [('AAA', '2021-01-04', '11'), ('AAA', '2021-01-05', '12'), ('BBB', '2021-01-04', '13')])
+
+        message = self.controller.load_directory(self.directory.name, 1, True)
+
+        self.assertIn('Failed', message)
+        self.assertEqual([(date(2021, 1, 5), Decimal('12')), (date(2021, 1, 4), Decimal('10'))], [(s.date, s.close_price) for s in self.sticks('AAA')])
+        self.assertEqual([date(2021, 1, 4)], [s.date for s in self.sticks('BBB')])
+
+    def test_out_of_order_files(self):
+        """
+        load_directory saves the rows older than the watermark of a file loaded before
+        """
+        write_csv(self.directory.name, 'a.csv', [('AAA', '2021-01-04', '10'), ('AAA', '2021-01-05', '11')])
+        write_csv(self.directory.name, 'b.csv', [('AAA', '2020-01-06', '12'), ('AAA', '2021-01-04', '10')])
+
+        self.controller.load_directory(self.directory.name, 1, True)
+
+        self.assertEqual([date(2021, 1, 5), date(2021, 1, 4), date(2020, 1, 6)], [s.date for s in self.sticks('AAA')])
+
+    def test_rolled_back_chunk(self):
+        """
+        load_directory joins the loaded dates over the chunks of a file but not over a chunk rolled back
+        """
+        self.controller.load_chunk_size = 2
+        write_csv(self.directory.name, 'a.csv', [('AAA', f"2021-01-0{day}", '10') for day in range(4, 10)])
+
+        create = self.interactor.create_candlestick_chunks
+        calls  = []
+        def failing(input_data):
+            calls.append(input_data)
+            if len(calls) == 2:
+                raise Exception('rolled back')
+            return create(input_data)
+        self.interactor.create_candlestick_chunks = failing
+        message = self.controller.load_directory(self.directory.name, 1, True)
+        self.assertIn('Failed', message)
+        self.assertEqual([date(2021, 1, 9), date(2021, 1, 8), date(2021, 1, 5), date(2021, 1, 4)], [s.date for s in self.sticks('AAA')])
+
+        self.controller.load_directory(self.directory.name, 1, True)
+        self.assertEqual([date(2021, 1, day) for day in range(9, 3, -1)], [s.date for s in self.sticks('AAA')])
+        watermark = self.transaction.do_in_tx(lambda ctx: self.repository.get_watermarks(ctx, GetWatermarksInput(tickers = [('AAA', 'M')]))).watermarks[('AAA', 'M')]
+        self.assertEqual((date(2021, 1, 4), date(2021, 1, 9)), (watermark.first_date, watermark.last_date))
+
+    def test_dead_worker_does_not_hang(self):
+        """
+        load_directory fails the files of a worker which died
+        """
+        write_csv(self.directory.name, 'a.csv', [('AAA', '2021-01-04', '10')])
+        parse = cli_stock.parse_candlestick_file
+        cli_stock.parse_candlestick_file = exit_worker
+        try:
+            message = self.controller.load_directory(self.directory.name, 1, True)
+        finally:
+            cli_stock.parse_candlestick_file = parse
+
+        self.assertIn('Failed', message)
+        self.assertEqual([], self.sticks('AAA'))
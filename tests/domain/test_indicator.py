@@ -0,0 +1,51 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from app.domain.indicator import *
+from app.domain.stock import *
+
+class TestIndicator(unittest.TestCase):
+
+    values = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3]
+
+    def test_rolling_max(self):
+        """
+        rolling_max
+        """
+        expected = [None, None] + [max(self.values[i-2:i+1]) for i in range(2, len(self.values))]
+        self.assertEqual(expected, rolling_max(self.values, 3))
+
+    def test_rolling_min(self):
+        """
+        rolling_min
+        """
+        expected = [None, None, None] + [min(self.values[i-3:i+1]) for i in range(3, len(self.values))]
+        self.assertEqual(expected, rolling_min(self.values, 4))
+
+    def test_indicator_cache(self):
+        """
+        IndicatorCache
+        """
+        sticks = [Candlestick(code = 'AAPL', market = 'NYSE', date = date(2020, 1, i + 1), open_price = Decimal(v), close_price = Decimal(v), high_price = Decimal(v), low_price = Decimal(v), volume = 100, interval = Interval.DAILY) for (i, v) in reversed(list(enumerate(self.values)))]
+        cache  = IndicatorCache({'AAPL': sticks})
+
+        self.assertEqual(4, cache.index('AAPL', date(2020, 1, 5)))
+        self.assertEqual(None, cache.index('AAPL', date(2020, 2, 1)))
+        self.assertEqual(Decimal('9'), cache.rolling_max('AAPL', 'close_price', 3)[6])
+        self.assertEqual(Decimal('5.5'), cache.sma('AAPL', 'close_price', 2)[8])
+        self.assertIs(cache.sma('AAPL', 'close_price', 2), cache.sma('AAPL', 'close_price', 2))
+
+    def test_signals(self):
+        """
+        is_highest / is_lowest / crossed_over / stepped_up
+        """
+        sticks = [Candlestick(code = 'AAPL', market = 'NYSE', date = date(2020, 1, i + 1), open_price = Decimal(v), close_price = Decimal(v), high_price = Decimal(v + 1), low_price = Decimal(v - 1), volume = 100, interval = Interval.DAILY) for (i, v) in reversed(list(enumerate(self.values)))]
+        cache  = IndicatorCache({'AAPL': sticks})
+
+        self.assertEqual([False, False] + [v == max(self.values[i-2:i+1]) for (i, v) in enumerate(self.values) if i >= 2], list(cache.is_highest('AAPL', 'close_price', 3)))
+        self.assertEqual([False, False] + [v == min(self.values[i-2:i+1]) for (i, v) in enumerate(self.values) if i >= 2], list(cache.is_lowest('AAPL', 'close_price', 3)))
+        # SMA(1) goes above SMA(2) on the day the value rises.
+        self.assertEqual([False, False, True, False, True, False, False, True, False, False], list(cache.crossed_over('AAPL', 'close_price', 1, 2)))
+        # The blocks of 2 days [4, 1] -> [5, 9] and [1, 5] -> [9, 2] rise in both of the high and the low.
+        self.assertEqual([False, False, False, False, False, True, True, False, False, False], list(cache.stepped_up('AAPL', 2, 2)))
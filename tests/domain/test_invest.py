@@ -50,6 +50,30 @@ class TestCommnet(unittest.TestCase):
         for data in input_data: 
             self.assertEqual(data['expected'], rule.exposure_unit(conditions = data['val']['conditions'], cash = data['val']['cash'])) 
 
+    def test_exposure_unit_by_aggregate(self):
+        """
+        exposure_unit_by_aggregate
+        """
+        rule = TurtleInvestRule(unit_number = 10, losscut_rate = Decimal('0.1'))
+        self.assertEqual(Decimal('10000'), rule.exposure_unit_by_aggregate(long_number = 0, short_amount = Decimal('10000'), cash = Decimal('110000')))
+        self.assertEqual(Decimal('10000'), rule.exposure_unit_by_aggregate(long_number = 1, short_amount = Decimal('0'), cash = Decimal('90000')))
+        self.assertEqual(Decimal('0'), rule.exposure_unit_by_aggregate(long_number = 10, short_amount = Decimal('0'), cash = Decimal('90000')))
+
+    def test_reaching_closedup_long_term(self):
+        """
+        reaching_closedup_long with closedup_term
+        """
+        # The newest close price is the lowest of the recent 10 days, but not of the recent 20 days.
+        closes = [Decimal('10')] + [Decimal('11')] * 10 + [Decimal('9')] + [Decimal('11')] * 8
+        sticks = [Candlestick(code = 'AAAA', market = 'NASDAQ', date = date(2019, 10, 31 - index), open_price = close, close_price = close, high_price = close, low_price = close, volume = int(100), interval = Interval.DAILY) for (index, close) in enumerate(closes)]
+        conditions = [InvestCondition(position_type = PositionType.BUY, price = Decimal('20'), volume = int(500), date = date(2019, 10, 1), losscut_price = Decimal('1'))]
+
+        rule = TurtleInvestRule(unit_number = 10, losscut_rate = Decimal('0.1'))
+        self.assertFalse(rule.reaching_closedup_long(sticks = sticks, conditions = conditions))
+
+        rule = TurtleInvestRule(unit_number = 10, losscut_rate = Decimal('0.1'), closedup_term = 10)
+        self.assertTrue(rule.reaching_closedup_long(sticks = sticks, conditions = conditions))
+
 # TODO: Need to be mocked at random().
 #
 #    def test_reaching_have_long(self):
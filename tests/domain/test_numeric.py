@@ -0,0 +1,56 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from app.domain.numeric import *
+from app.domain.indicator import IndicatorCache
+from app.domain.stock import Candlestick, Interval
+
+class TestNumericBackend(unittest.TestCase):
+
+    values = [Decimal(v) for v in ['101.25', '99.5', '102.125', '103.0000001', '98.75', '100.5', '104.25', '105.5']]
+
+    def assertClose(self, expected, actual):
+        self.assertEqual(len(expected), len(actual))
+        for (e, a) in zip(expected, actual):
+            self.assertAlmostEqual(float(e), float(a), places = 9)
+
+    def test_statistics(self):
+        """
+        The float backend agrees with the decimal backend within the tolerance.
+        """
+        exact = DecimalNumericBackend()
+        fast  = FloatNumericBackend()
+
+        for term in [1, 3, 5]:
+            self.assertClose(exact.sma(exact.numbers(self.values), term), fast.exacts(fast.sma(fast.numbers(self.values), term)))
+            self.assertClose(exact.wma(exact.numbers(self.values), term), fast.exacts(fast.wma(fast.numbers(self.values), term)))
+            self.assertClose(exact.ema(exact.numbers(self.values), term), fast.exacts(fast.ema(fast.numbers(self.values), term)))
+        self.assertClose([exact.standard_deviation(self.values)], [fast.exact(fast.standard_deviation(fast.numbers(self.values)))])
+
+    def test_boundary(self):
+        """
+        exact returns Decimal
+        """
+        self.assertIsInstance(FloatNumericBackend().exact(1.5), Decimal)
+        self.assertEqual(Decimal('1.5'), FloatNumericBackend().exact(1.5))
+        self.assertIs(self.values[0], DecimalNumericBackend().exact(self.values[0]))
+
+    def test_indicator_cache(self):
+        """
+        The signals of the indicator cache are the same with both backends.
+        """
+        sticks = [Candlestick(code = 'AAPL', market = 'NYSE', date = date(2020, 1, i + 1), open_price = v, close_price = v, high_price = v, low_price = v, volume = 100, interval = Interval.DAILY) for (i, v) in reversed(list(enumerate(self.values)))]
+        exact  = IndicatorCache({'AAPL': sticks})
+        fast   = IndicatorCache({'AAPL': sticks}, FloatNumericBackend())
+
+        self.assertEqual(exact.is_highest('AAPL', 'high_price', 3).tolist(), fast.is_highest('AAPL', 'high_price', 3).tolist())
+        self.assertEqual(exact.crossed_over('AAPL', 'close_price', 2, 4).tolist(), fast.crossed_over('AAPL', 'close_price', 2, 4).tolist())
+        self.assertClose([v for v in exact.sma('AAPL', 'close_price', 3) if v is not None], [v for v in fast.sma('AAPL', 'close_price', 3) if v is not None])
+
+    def test_make_numeric_backend(self):
+        """
+        make_numeric_backend
+        """
+        self.assertIsInstance(make_numeric_backend(NumericBackendType.FLOAT), FloatNumericBackend)
+        self.assertIsInstance(make_numeric_backend(NumericBackendType.DECIMAL), DecimalNumericBackend)
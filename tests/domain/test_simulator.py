@@ -0,0 +1,114 @@
+import random
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from app.domain.simulator import *
+from app.domain.invest import *
+from app.domain.stock import Candlestick, Interval
+from app.util.market import SyntheticMarket
+
+class TestSimulationDistribution(unittest.TestCase):
+
+    def test_quantiles(self):
+        """
+        quantiles
+        """
+        values = [Decimal(v) for v in ['30', '10', '20', '40', '50']]
+        probabilities = [Decimal(p) for p in ['0', '0.1', '0.5', '1']]
+
+        self.assertEqual([Decimal('10'), Decimal('14'), Decimal('30'), Decimal('50')], SimulationDistribution.quantiles(values, probabilities))
+        self.assertEqual([Decimal('0')] * 4, SimulationDistribution.quantiles([], probabilities))
+
+class TestReportBuilder(unittest.TestCase):
+
+    def test_build(self):
+        """
+        build
+        """
+        history = lambda open_price, close_price, position_type: History(open_date = date(2020, 1, 1), close_date = date(2020, 1, 2), open_price = Decimal(open_price), close_price = Decimal(close_price), volume = 10, position_type = position_type)
+        histories = {
+                'AAPL': [history('10', '12', PositionType.BUY), history('10', '9', PositionType.BUY)],
+                'ZM':   [history('10', '7', PositionType.SELL)]
+                }
+        positions = {'AAPL': [], 'ZM': [InvestCondition(position_type = PositionType.BUY, price = Decimal('10'), volume = 5, date = date(2020, 1, 3), losscut_price = Decimal('9'))]}
+        sticks    = {'AAPL': None, 'ZM': Candlestick(code = 'ZM', market = 'NYSE', date = date(2020, 1, 4), open_price = Decimal('11'), close_price = Decimal('11'), high_price = Decimal('11'), low_price = Decimal('11'), volume = 100, interval = Interval.DAILY)}
+        builder   = ReportBuilder(principal = Decimal('100'), commission = StandardCommission(minimum = Decimal('1'), maximum = Decimal('1'), rate = Decimal('0')))
+
+        report = builder.build(cash = Decimal('100'), histories = histories, positions = positions, sticks = sticks, valuations = [Decimal(v) for v in ['100', '120', '90', '135']], exposed_number = 2, exposures = {'ZM': 1}, steps = {'ZM': 3})
+
+        self.assertEqual(Decimal('155'), report.current_valuation)
+        self.assertEqual(Decimal('25'), report.mean_profit)
+        self.assertEqual(Decimal('-10'), report.mean_loss)
+        self.assertEqual(Decimal('2.5'), report.payoff_ratio)
+        self.assertEqual(Decimal('7'), report.commission)
+        self.assertEqual(Decimal('0.25'), report.max_drawdown)
+        self.assertEqual(Decimal('2') / Decimal('3'), report.exposure_rate)
+        self.assertTrue(report.sharpe_ratio > 0)
+        self.assertEqual(Decimal('10'), report.tickers['AAPL'].profit)
+        self.assertEqual((1, 1), (report.tickers['AAPL'].win_number, report.tickers['AAPL'].lose_number))
+        self.assertEqual(Decimal('3'), report.tickers['ZM'].commission)
+        self.assertEqual(Decimal('1') / Decimal('3'), report.tickers['ZM'].exposure_rate)
+
+class TestWalkForwardSummary(unittest.TestCase):
+
+    def test_from_reports(self):
+        """
+        from_reports
+        """
+        report  = lambda valuation, drawdown: SimulationReport(principal = Decimal('100'), current_valuation = Decimal(valuation), mean_profit = Decimal('0'), mean_loss = Decimal('0'), win_rate = Decimal('0.5'), lose_rate = Decimal('0.5'), payoff_ratio = Decimal('1'), histories = {}, positions = {}, commission = Decimal('0'), max_drawdown = Decimal(drawdown))
+        summary = WalkForwardSummary.from_reports([report('110', '0.1'), report('95', '0.3'), report('120', '0.2'), report('100', '0')])
+
+        self.assertEqual(4, summary.number)
+        self.assertEqual(Decimal('0.5'), summary.profitable_rate)
+        self.assertEqual(Decimal('0.0625'), summary.mean_return)
+        self.assertEqual(Decimal('0.3'), summary.worst_drawdown)
+
+class TestPreparedInvestRule(unittest.TestCase):
+
+    def setUp(self):
+        market       = SyntheticMarket(tickers = 6, days = 220, seed = 5)
+        self.sticks  = {market.code(index): list(reversed(market.candlesticks(index))) for index in range(market.tickers)}
+        tickers      = list(self.sticks.keys())
+        numbers      = {ticker: len(sticks) for (ticker, sticks) in self.sticks.items()}
+        unit         = 100
+        losscut_rate = Decimal('0.05')
+        self.rules = {
+            InvestRuleType.TURTLE:              lambda rng: TurtleInvestRule(unit_number = unit, losscut_rate = losscut_rate, rng = rng),
+            InvestRuleType.RANDOM:              lambda rng: RandomInvestRule(unit_number = unit, losscut_rate = losscut_rate, tickers = tickers, rng = rng),
+            InvestRuleType.RANDOM_LONG:         lambda rng: RandomLongInvestRule(unit_number = unit, losscut_rate = losscut_rate, tickers = tickers, rng = rng),
+            InvestRuleType.RANDOM_TRAIL:        lambda rng: RandomTrailLongInvestRule(unit_number = unit, losscut_rate = losscut_rate, tickers = tickers, rng = rng),
+            InvestRuleType.GOLDEN_TRAIL:        lambda rng: GoldenTrailLongInvestRule(unit_number = unit, losscut_rate = losscut_rate, rng = rng),
+            InvestRuleType.SERIAL_STEPUP_TRAIL: lambda rng: SerialStepupTrailLongInvestRule(unit_number = unit, losscut_rate = losscut_rate, rng = rng),
+            InvestRuleType.TRIPLE_STEPUP_TRAIL: lambda rng: TripleStepupTrailLongInvestRule(unit_number = unit, losscut_rate = losscut_rate, rng = rng),
+            InvestRuleType.BUYHOLD:             lambda rng: BuyholdInvestRule(unit_number = unit, losscut_rate = losscut_rate, stick_numbers = numbers, rng = rng),
+            }
+
+    def simulate(self, rule:InvestRule, prepared:bool) -> InvestSimulator:
+        if not prepared:
+            # Without the signals, the rule scans the window of the candlesticks on each day.
+            rule.prepare = lambda cache: None
+        simulator = InvestSimulator(rule = rule, sticks = self.sticks, cash = Decimal('1000000'), commission = StandardCommission(minimum = Decimal('1'), maximum = Decimal('20'), rate = Decimal('0.001')))
+        simulator.simulate()
+        return simulator
+
+    def test_signals(self):
+        """
+        prepare
+        """
+        self.assertEqual(set(InvestRuleType), set(self.rules.keys()))
+        for (rule_type, make) in self.rules.items():
+            with self.subTest(rule_type = rule_type.name):
+                rule     = make(random.Random(11))
+                prepared = self.simulate(rule, prepared = True)
+                self.assertEqual(set(rule.signal_expressions().keys()), set(rule.signals.keys()))
+                for signals in rule.signals.values():
+                    self.assertEqual(set(self.sticks.keys()), set(signals.keys()))
+
+                unprepared = self.simulate(make(random.Random(11)), prepared = False)
+
+                self.assertTrue(sum([len(histories) for histories in prepared.histories.values()]) > 0)
+                self.assertEqual(prepared.histories, unprepared.histories)
+                self.assertEqual(prepared.conditions, unprepared.conditions)
+                self.assertEqual(prepared.valuations, unprepared.valuations)
+                self.assertEqual(prepared.cash, unprepared.cash)
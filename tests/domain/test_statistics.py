@@ -0,0 +1,37 @@
+import unittest
+from decimal import Decimal
+
+import numpy as np
+
+from app.domain.statistics import *
+
+class TestStatistics(unittest.TestCase):
+
+    values = [Decimal(v) for v in ['10', '11', '12.5', '11', '13', '14.25', '12', '15']]
+
+    def test_sma(self):
+        """
+        sma
+        """
+        self.assertEqual([Decimal('11.125'), Decimal('11.875'), Decimal('12.6875'), Decimal('12.5625'), Decimal('13.5625')], Statistics(values = self.values).sma(term = 4))
+        self.assertEqual([], Statistics(values = self.values[0:3]).sma(term = 4))
+
+    def test_wma(self):
+        """
+        wma
+        """
+        expected = [sum([value*(j + 1) for (j, value) in enumerate(self.values[i:i+3])])/6 for i in range(len(self.values) - 2)]
+        self.assertEqual(expected, Statistics(values = self.values).wma(term = 3))
+
+    def test_array_statistics(self):
+        """
+        ArrayStatistics sma / wma / ema compared with Statistics
+        """
+        values = np.array([float(value) for value in self.values])
+        for term in [1, 3, 8]:
+            for method in ['sma', 'wma', 'ema']:
+                expected = [float(value) for value in getattr(Statistics(values = self.values), method)(term = term)]
+                self.assertTrue(np.allclose(expected, getattr(ArrayStatistics(values = values), method)(term = term)))
+
+                stacked = getattr(ArrayStatistics(values = np.stack([values, values*2])), method)(term = term)
+                self.assertTrue(np.allclose([expected, [value*2 for value in expected]], stacked))
@@ -0,0 +1,111 @@
+import unittest
+import pickle
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+
+from app.domain.stock import *
+from app.domain.stock import _shared_date
+from app.domain.numeric import FloatNumericBackend
+
+class TestCandlestick(unittest.TestCase):
+
+    def stick(self, close_price, patched = False):
+        return Candlestick(code = ''.join(['AA', 'PL']), market = 'NYSE', date = date(2020, 1, 1), open_price = Decimal('1'), close_price = Decimal(close_price), high_price = Decimal('2'), low_price = Decimal('0.5'), volume = 100, interval = Interval.DAILY, patched = patched)
+
+    def test_quantize(self):
+        """
+        The prices are quantized with ROUND_UP on read.
+        """
+        self.assertEqual(Decimal('1.2345679'), self.stick('1.23456781').close_price)
+        self.assertEqual(Decimal('1.0000000'), self.stick('1').open_price)
+
+    def test_compare(self):
+        """
+        __eq__ / __lt__ ignore patched
+        """
+        self.assertEqual(self.stick('1.5'), self.stick('1.5', patched = True))
+        self.assertNotEqual(self.stick('1.5'), self.stick('1.6'))
+        self.assertTrue(self.stick('1.5') < self.stick('1.6'))
+        self.assertEqual([self.stick('1.5'), self.stick('1.6')], sorted([self.stick('1.6'), self.stick('1.5')]))
+
+    def test_from_row(self):
+        """
+        from_row / pickle
+        """
+        stick = Candlestick.from_row(('AAPL', 'NYSE', date(2020, 1, 1), Decimal('1'), Decimal('1.23456781'), Decimal('2'), Decimal('0.5'), 100, 0))
+
+        self.assertEqual(self.stick('1.23456781'), stick)
+        self.assertIs(self.stick('1').code, stick.code)
+        self.assertEqual(stick, pickle.loads(pickle.dumps(stick)))
+        self.assertFalse(hasattr(stick, '__dict__'))
+
+    def test_shared_date(self):
+        """
+        Equal dates share one object, and the shared dates are bounded
+        """
+        first  = Candlestick.from_row(('AAPL', 'NYSE', date(1990, 1, 1), Decimal('1'), Decimal('1'), Decimal('1'), Decimal('1'), 100, 0))
+        second = Candlestick(code = 'ZM', market = 'NASDAQ', date = date(1990, 1, 1), open_price = Decimal('1'), close_price = Decimal('1'), high_price = Decimal('1'), low_price = Decimal('1'), volume = 100, interval = Interval.DAILY)
+        self.assertIs(first.date, second.date)
+
+        capacity = _shared_date.cache_info().maxsize
+        for day in range(capacity + 10):
+            _shared_date(date.fromordinal(date(1900, 1, 1).toordinal() + day))
+        self.assertEqual(capacity, _shared_date.cache_info().currsize)
+        self.assertEqual(date(1990, 1, 1), pickle.loads(pickle.dumps(first)).date)
+
+class TestCandlestickSeries(unittest.TestCase):
+
+    def sticks(self, code, number):
+        return [Candlestick(code = code, market = 'NYSE', date = date(2020, 1, i + 1), open_price = Decimal(i + 1), close_price = Decimal(i) + Decimal('0.5'), high_price = Decimal(i + 2), low_price = Decimal(i), volume = 100 * i, interval = Interval.DAILY) for i in reversed(range(number))]
+
+    def test_from_candlesticks(self):
+        """
+        from_candlesticks / to_candlesticks
+        """
+        sticks = self.sticks('AAPL', 5)
+        series = CandlestickSeries.from_candlesticks(sticks)
+
+        self.assertEqual(5, len(series))
+        self.assertEqual(np.datetime64('2020-01-01'), series.dates[0])
+        self.assertEqual(4.5, series.close_prices[-1])
+        self.assertEqual(sticks, series.to_candlesticks())
+
+    def test_slice(self):
+        """
+        __getitem__
+        """
+        series = CandlestickSeries.from_candlesticks(self.sticks('AAPL', 5))
+        sliced = series[1:3]
+
+        self.assertEqual([1.5, 2.5], list(sliced.close_prices))
+        self.assertTrue(np.shares_memory(series.close_prices, sliced.close_prices))
+
+    def test_stack(self):
+        """
+        Universe.stack
+        """
+        universe = Universe()
+        universe.add(CandlestickSeries.from_candlesticks(self.sticks('AAPL', 5)))
+        universe.add(CandlestickSeries.from_candlesticks(self.sticks('ZM', 2)))
+
+        (codes, values) = universe.stack(column = 'volumes', length = 3)
+        self.assertEqual(['AAPL'], codes)
+        self.assertEqual([[200, 300, 400]], values.tolist())
+
+class TestAtr(unittest.TestCase):
+
+    def test_average(self):
+        """
+        average on the decimal and float backends
+        """
+        sticks = [Candlestick(code = 'AAPL', market = 'NYSE', date = date(2020, 1, 1 + i), open_price = Decimal('10'), close_price = Decimal(close), high_price = Decimal(high), low_price = Decimal(low), volume = 100, interval = Interval.DAILY) for (i, (close, high, low)) in enumerate([('10.5', '11', '9.5'), ('10.2', '10.9', '9.8'), ('9.1', '10.3', '8.7'), ('9.9', '10.1', '9.3')])]
+
+        ranges = Atr(candlesticks = sticks).calculate()
+        exact  = Atr(candlesticks = sticks).average(2)
+
+        self.assertEqual([sum(ranges[i:i+2])/Decimal(2) for i in range(3)], exact)
+        approximate = Atr(candlesticks = sticks, numeric = FloatNumericBackend()).average(2)
+        self.assertTrue(all([isinstance(average, Decimal) for average in approximate]))
+        self.assertEqual(exact, [round(average, 10) for average in approximate])
@@ -0,0 +1,115 @@
+import os
+import unittest
+import uuid
+from decimal import Decimal
+
+import redis
+
+from app.driver.memory.cache import MemoryCacheDriver
+from app.driver.redis.cache  import RedisCacheDriver
+from app.domain.analyze      import ScoreCalcurator
+
+# The composition of multiple_cachedata when the scores were kept in a dictionary.
+def compose_dictionary(scores, coefficient, additional_ranking):
+    additional_scores = ScoreCalcurator().faster_better(data = additional_ranking)
+    result = dict()
+    if len(scores) > 0: 
+        for (key, score) in scores.items(): 
+            if len(additional_scores) == 0:
+                result[key] = Decimal(score) * Decimal(coefficient)
+            elif key in additional_scores: 
+                result[key] = Decimal(score) * Decimal(coefficient) * additional_scores[key]
+    else: 
+        for (key, score) in additional_scores.items(): 
+            result[key] = Decimal(score) * Decimal(coefficient)
+    return result
+
+class CacheDriverTest:
+    driver = None
+    key    = None
+
+    def compose(self, scores, coefficient, additional_ranking):
+        """
+        Compose the ranking and the dictionary the same way, and return both of them.
+        """
+        self.driver.compose_ranking(key = self.key, coefficient = Decimal(coefficient), additional = ScoreCalcurator().faster_better(data = additional_ranking))
+        expected = compose_dictionary(scores, coefficient, additional_ranking)
+        return (dict(self.driver.get_ranking(key = self.key, limit = 100)), expected)
+
+    def test_compose_ranking_seed(self):
+        """
+        compose_ranking fills the empty ranking with the additional scores
+        """
+        (got, expected) = self.compose({}, 2, ['A', 'B', 'C', 'D'])
+        self.assertEqual({'A': Decimal('2'), 'B': Decimal('1.5'), 'C': Decimal('1'), 'D': Decimal('0.5')}, expected)
+        self.assertEqual(expected, got)
+        self.assertEqual(4, self.driver.count_ranking(key = self.key))
+
+    def test_compose_ranking_multiply(self):
+        """
+        compose_ranking multiplies every score without the additional scores
+        """
+        (scores, _) = self.compose({}, 2, ['A', 'B', 'C', 'D'])
+        (got, expected) = self.compose(scores, 3, [])
+        self.assertEqual({'A': Decimal('6'), 'B': Decimal('4.5'), 'C': Decimal('3'), 'D': Decimal('1.5')}, expected)
+        self.assertEqual(expected, got)
+
+    def test_compose_ranking_intersect(self):
+        """
+        compose_ranking keeps only the members in the additional scores
+        """
+        (scores, _) = self.compose({}, 2, ['A', 'B', 'C', 'D'])
+        (got, expected) = self.compose(scores, 1, ['C', 'A'])
+        self.assertEqual({'A': Decimal('1'), 'C': Decimal('1')}, expected)
+        self.assertEqual(expected, got)
+        self.assertEqual([('C', Decimal('1')), ('A', Decimal('1'))], self.driver.get_ranking(key = self.key, limit = 10))
+
+    def test_compose_ranking_remove(self):
+        """
+        compose_ranking removes the ranking without the common members, and the next one fills it again
+        """
+        (scores, _) = self.compose({}, 2, ['A', 'B', 'C', 'D'])
+        (got, expected) = self.compose(scores, 1, ['X'])
+        self.assertEqual({}, expected)
+        self.assertEqual(expected, got)
+        self.assertEqual(0, self.driver.count_ranking(key = self.key))
+
+        (got, expected) = self.compose(got, 1, ['X', 'Y'])
+        self.assertEqual(expected, got)
+        self.assertEqual({'X': Decimal('1'), 'Y': Decimal('0.5')}, got)
+
+    def test_get_ranking(self):
+        """
+        get_ranking pages in descending order of the score
+        """
+        self.driver.save_ranking(key = self.key, scores = {'A': Decimal('1'), 'B': Decimal('3'), 'C': Decimal('2')})
+        self.assertEqual([('B', Decimal('3')), ('C', Decimal('2'))], self.driver.get_ranking(key = self.key, limit = 2))
+        self.assertEqual([('A', Decimal('1'))], self.driver.get_ranking(key = self.key, limit = 2, offset = 2))
+        self.assertEqual([], self.driver.get_ranking(key = self.key, limit = 0))
+
+        self.driver.clear_ranking(key = self.key)
+        self.assertEqual(0, self.driver.count_ranking(key = self.key))
+
+class TestMemoryCacheDriver(CacheDriverTest, unittest.TestCase):
+
+    def setUp(self):
+        self.driver = MemoryCacheDriver()
+        self.key    = 'ranking'
+
+class TestRedisCacheDriver(CacheDriverTest, unittest.TestCase):
+    server = os.getenv('CacheDriverServer', 'localhost')
+    port   = os.getenv('CacheDriverPort', '6379')
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            redis.StrictRedis(host = cls.server, port = cls.port, socket_connect_timeout = 1, retry = None).ping()
+        except redis.exceptions.ConnectionError:
+            raise unittest.SkipTest('Redis server is not available')
+
+    def setUp(self):
+        self.driver = RedisCacheDriver(server = self.server, port = self.port)
+        self.key    = f"test:ranking:{uuid.uuid4()}"
+
+    def tearDown(self):
+        self.driver.clear_ranking(key = self.key)
@@ -0,0 +1,25 @@
+import unittest
+
+from app.driver.memory.window import MemoryWindowCacheDriver
+
+class TestMemoryWindowCacheDriver(unittest.TestCase):
+
+    def test_versions(self):
+        """
+        bump_versions
+        """
+        driver = MemoryWindowCacheDriver()
+        self.assertEqual([0, 0], driver.get_versions(['a', 'b']))
+        self.assertEqual([1], driver.bump_versions(['a']))
+        self.assertEqual([1, 0], driver.get_versions(['a', 'b']))
+
+    def test_save_blobs(self):
+        """
+        save_blobs purges the expired blobs
+        """
+        driver = MemoryWindowCacheDriver()
+        driver.save_blobs({'a': b'1', 'b': b'2'}, 0)
+        driver.save_blobs({'c': b'3'}, 3600)
+
+        self.assertEqual(['c'], list(driver.blobs.keys()))
+        self.assertEqual([None, None, b'3'], driver.get_blobs(['a', 'b', 'c']))
@@ -0,0 +1,113 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from app.repository.cached.stock           import CachedStockRepository
+from app.repository.sqlalchemy.stock       import SqlalchemyStockRepository
+from app.repository.sqlalchemy.transaction import SqlalchemyTransaction
+from app.repository.inputdata.stock        import *
+from app.domain.stock                      import Candlestick, Interval, Stock
+
+def stick(code:str, market:str, day:date, price:str = '10') -> Candlestick:
+    price = Decimal(price)
+    return Candlestick(code = code, market = market, date = day, open_price = price, close_price = price, high_price = price, low_price = price, volume = 100, interval = Interval.DAILY)
+
+class TestCachedStockRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.transaction = SqlalchemyTransaction(target_url = 'sqlite://', pool_recycle = 60, create_schema = True)
+        self.repository  = CachedStockRepository(repository = SqlalchemyStockRepository(), capacity = 1000)
+        self.write('save_bulk', SaveBulkInput(candlesticks = [stick('AAA', 'M', date(2021, 1, 4)), stick('BBB', 'M', date(2021, 1, 4)), stick('CCC', 'N', date(2021, 1, 4))]))
+
+    def read(self, name:str, input_data):
+        return self.transaction.do_in_tx(lambda ctx: getattr(self.repository, name)(ctx, input_data))
+
+    def write(self, name:str, input_data):
+        return self.transaction.do_in_tx(lambda ctx: getattr(self.repository, name)(ctx, input_data))
+
+    def dates(self, code:str, market:str):
+        return [s.date for s in self.read('get_ones_all', GetOnesAllInput(code = code, market = market, from_date = None, to_date = None)).candlesticks]
+
+    def range_codes(self, market:str, tags):
+        return sorted(self.read('get_range', GetRangeInput(code = '', market = market, tags = tags, to_date = None, limit = 10)).candlesticks.keys())
+
+    def test_save_bulk(self):
+        """
+        save_bulk drops the results of the ticker and its market only
+        """
+        self.assertEqual([date(2021, 1, 4)], self.dates('AAA', 'M'))
+        self.assertEqual([date(2021, 1, 4)], self.dates('BBB', 'M'))
+        self.assertEqual(['AAA', 'BBB'], self.range_codes('M', []))
+        self.assertEqual(['CCC'], self.range_codes('N', []))
+
+        self.write('save_bulk', SaveBulkInput(candlesticks = [stick('AAA', 'M', date(2021, 1, 5)), stick('DDD', 'M', date(2021, 1, 5))]))
+        hits = self.repository.hits
+
+        self.assertEqual([date(2021, 1, 5), date(2021, 1, 4)], self.dates('AAA', 'M'))
+        self.assertEqual(['AAA', 'BBB', 'DDD'], self.range_codes('M', []))
+        self.assertEqual(hits, self.repository.hits)
+
+        self.assertEqual([date(2021, 1, 4)], self.dates('BBB', 'M'))
+        self.assertEqual(['CCC'], self.range_codes('N', []))
+        self.assertEqual(hits + 2, self.repository.hits)
+
+    def test_save_tag(self):
+        """
+        save_tag drops the tags of the ticker and the ranges filtered by the tags
+        """
+        self.assertEqual([], self.read('find_tag', FindTagInput(code = 'AAA', market = 'M')).tags)
+        self.assertEqual([], self.range_codes('M', ['t']))
+
+        self.write('save_tag', SaveTagInput(stock = Stock(code = 'AAA', market = 'M', tags = ['t'])))
+
+        self.assertEqual(['t'], self.read('find_tag', FindTagInput(code = 'AAA', market = 'M')).tags)
+        self.assertEqual(['AAA'], self.range_codes('M', ['t']))
+
+    def test_remove_tag(self):
+        """
+        remove_tag drops every result, since any ticker may have had the tag
+        """
+        self.write('save_tag', SaveTagInput(stock = Stock(code = 'AAA', market = 'M', tags = ['t'])))
+        self.write('save_tag', SaveTagInput(stock = Stock(code = 'CCC', market = 'N', tags = ['t'])))
+        self.assertEqual(['t'], self.read('find_tag', FindTagInput(code = 'AAA', market = 'M')).tags)
+        self.assertEqual(['CCC'], self.range_codes('N', ['t']))
+
+        self.write('remove_tag', RemoveTagInput(tagname = 't'))
+
+        self.assertEqual(0, len(self.repository.entries))
+        self.assertEqual([], self.read('find_tag', FindTagInput(code = 'AAA', market = 'M')).tags)
+        self.assertEqual([], self.range_codes('N', ['t']))
+
+    def test_delistings(self):
+        """
+        save_delisting and remove_delistings_ones_all drop the delistings of the ticker
+        """
+        find = FindDelistingInput(code = 'AAA', market = 'M', date = date(2021, 1, 4))
+        ones = GetDelistingsOnesAllInput(code = 'AAA', market = 'M', from_date = None, to_date = None)
+        self.assertIsNone(self.read('find_delisting', find).delisting)
+        self.assertEqual([], self.read('get_delistings_ones_all', ones).delistings)
+
+        self.write('save_delisting', SaveDelistingInput(delisting = stick('AAA', 'M', date(2021, 1, 4))))
+
+        self.assertEqual(date(2021, 1, 4), self.read('find_delisting', find).delisting.date)
+        self.assertEqual([date(2021, 1, 4)], [s.date for s in self.read('get_delistings_ones_all', ones).delistings])
+
+        self.write('remove_delistings_ones_all', RemoveDelistingsOnesAllInput(code = 'AAA', market = 'M'))
+
+        self.assertIsNone(self.read('find_delisting', find).delisting)
+        self.assertEqual([], self.read('get_delistings_ones_all', ones).delistings)
+
+    def test_writers(self):
+        """
+        The reads of a transaction which wrote are not kept, as it may be rolled back
+        """
+        def task(ctx):
+            self.repository.save_bulk(ctx, SaveBulkInput(candlesticks = [stick('AAA', 'M', date(2021, 1, 5))]))
+            self.repository.get_ones_all(ctx, GetOnesAllInput(code = 'AAA', market = 'M', from_date = None, to_date = None))
+            raise ValueError('rollback')
+
+        with self.assertRaises(ValueError):
+            self.transaction.do_in_tx(task)
+
+        self.assertEqual(0, len(self.repository.entries))
+        self.assertEqual([date(2021, 1, 4)], self.dates('AAA', 'M'))
@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+
+import numpy as np
+
+from app.repository.columnar.stock         import ColumnarStockRepository
+from app.repository.columnar.export        import ColumnarStockExportRepository
+from app.repository.columnar.store         import CURRENT, current_generation
+from app.repository.sqlalchemy.stock       import SqlalchemyStockRepository
+from app.repository.sqlalchemy.transaction import SqlalchemyTransaction
+from app.repository.inputdata.stock        import *
+from app.usecase.default.stock             import DefaultStockInteractor
+from app.usecase.inputdata.stock           import CreateCandlestickChunksInput, CreateTagInput, ExportCandlesticksInput
+from app.driver.memory.cache               import MemoryCacheDriver
+from app.domain.stock                      import Candlestick
+from app.util.market                       import SyntheticMarket
+
+def normalized(value):
+    """
+    The values to compare the outputs of the repositories, with the prices as strings.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, Candlestick):
+        return (value.code, value.market, value.date, str(value.open_price), str(value.close_price), str(value.high_price), str(value.low_price), value.volume, bool(value.patched))
+    if isinstance(value, dict):
+        # The order of the keys is compared too, as the tickers are ordered by (code, market) as the database.
+        return [(k, normalized(v)) for (k, v) in value.items()]
+    if isinstance(value, (list, tuple)):
+        return [normalized(v) for v in value]
+    if hasattr(value, '__dataclass_fields__'):
+        return {name: normalized(getattr(value, name)) for name in value.__dataclass_fields__}
+    return value
+
+class TestColumnarStockRepository(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root        = tempfile.mkdtemp()
+        cls.market      = SyntheticMarket(tickers = 12, days = 60, seed = 7)
+        # The other market has one ticker of a code in the middle of the market, and its dates end earlier.
+        cls.other       = SyntheticMarket(tickers = 6, days = 40, seed = 8, market = 'ALT')
+        cls.transaction = SqlalchemyTransaction(target_url = 'sqlite://', pool_recycle = 60, create_schema = True)
+        cls.source      = SqlalchemyStockRepository()
+        cls.columnar    = ColumnarStockRepository(root = cls.root)
+
+        # The interactor reads the columnar store, and the export reads the database.
+        interactor = DefaultStockInteractor(stock_repository = cls.columnar, transaction = cls.transaction, cache_driver = MemoryCacheDriver(),
+                stock_export_repository = ColumnarStockExportRepository(root = cls.root), export_source_repository = cls.source)
+        loader     = DefaultStockInteractor(stock_repository = cls.source, transaction = cls.transaction, cache_driver = MemoryCacheDriver())
+        loader.create_candlestick_chunks(input_data = CreateCandlestickChunksInput(chunks = cls.market.chunks(), safe = False))
+        loader.create_tag(input_data = CreateTagInput(stocks = cls.market.stocks()))
+        loader.create_candlestick_chunks(input_data = CreateCandlestickChunksInput(chunks = [cls.other.candlesticks(5)], safe = False))
+        loader.create_tag(input_data = CreateTagInput(stocks = cls.other.stocks()[5:]))
+        cls.exported = interactor.export_candlesticks(input_data = ExportCandlesticksInput(market = cls.market.market))
+        interactor.export_candlesticks(input_data = ExportCandlesticksInput(market = cls.other.market))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root, ignore_errors = True)
+
+    def assertParity(self, name:str, input_data):
+        expected = self.transaction.do_in_tx(lambda ctx: getattr(self.source, name)(ctx, input_data))
+        got      = getattr(self.columnar, name)(None, input_data)
+        self.assertEqual(normalized(expected), normalized(got))
+
+    def test_export(self):
+        """
+        export_candlesticks reads the database while the columnar store is the repository
+        """
+        self.assertEqual((12, 12 * 60), (self.exported.tickers, self.exported.candlesticks))
+
+    def test_get(self):
+        """
+        get
+        """
+        dates = self.market.trading_dates
+        for code in [self.market.code(0), self.market.code(11), 'NONE']:
+            self.assertParity('get', GetInput(code = code, market = self.market.market, from_date = dates[10], to_date = dates[40]))
+
+    def test_get_range(self):
+        """
+        get_range with and without the tags
+        """
+        for tags in [[], ['bench-tag'], ['bench-other', 'bench-tag'], ['none']]:
+            for code in ['', self.market.code(0), self.market.code(1)]:
+                for to_date in [None, self.market.trading_dates[30]]:
+                    self.assertParity('get_range', GetRangeInput(code = code, market = self.market.market, tags = tags, to_date = to_date, limit = 20))
+
+    def test_get_each(self):
+        """
+        get_each
+        """
+        for tags in [[], ['bench-tag']]:
+            for today in [self.market.last_date(), self.market.trading_dates[5]]:
+                self.assertParity('get_each', GetEachInput(market = self.market.market, tags = tags, offset = 3, today = today))
+
+    def test_get_all_term(self):
+        """
+        get_all_term
+        """
+        expected = self.transaction.do_in_tx(lambda ctx: self.source.get_all_term(ctx, GetAllTermInput())).terms
+        got      = self.columnar.get_all_term(None, GetAllTermInput()).terms
+        key      = lambda term: (term.market, term.code)
+        self.assertEqual(normalized(sorted(expected, key = key)), normalized(sorted(got, key = key)))
+
+    def test_get_stockdatainfo(self):
+        """
+        get_stockdatainfo
+        """
+        for code in [self.market.code(0), self.market.code(5)]:
+            self.assertParity('get_stockdatainfo', GetStockdatainfoInput(code = code, market = self.market.market))
+
+    def test_all_markets(self):
+        """
+        get_range, get_range_series and get_each_offsets of every market, in the order of (code, market) as the database
+        """
+        for code in ['', self.market.code(1)]:
+            for to_date in [None, self.other.last_date(), self.market.last_date()]:
+                self.assertParity('get_range', GetRangeInput(code = code, market = '', tags = [], to_date = to_date, limit = 20))
+                self.assertParity('get_range_series', GetRangeSeriesInput(code = code, market = '', tags = [], to_date = to_date, limit = 20))
+        for today in [self.other.last_date(), self.market.last_date()]:
+            self.assertParity('get_each_offsets', GetEachOffsetsInput(market = '', tags = [], offsets = [0, 5], today = today))
+
+    def test_get_range_series(self):
+        """
+        get_range_series with and without the tags
+        """
+        for tags in [[], ['bench-tag'], ['none']]:
+            for code in ['', self.market.code(0)]:
+                for (to_date, limit) in [(None, 20), (self.market.trading_dates[30], 20), (self.market.trading_dates[5], 20), (self.market.last_date(), 100)]:
+                    self.assertParity('get_range_series', GetRangeSeriesInput(code = code, market = self.market.market, tags = tags, to_date = to_date, limit = limit))
+
+    def test_get_endpoints(self):
+        """
+        get_endpoints
+        """
+        dates = self.market.trading_dates
+        for tags in [[], ['bench-tag']]:
+            for (from_date, to_date) in [(dates[0], dates[-1]), (dates[10], dates[20]), (dates[20] + timedelta(days = 1), dates[20] + timedelta(days = 1)), (dates[-1] + timedelta(days = 1), dates[-1] + timedelta(days = 30))]:
+                self.assertParity('get_endpoints', GetEndpointsInput(market = self.market.market, tags = tags, from_date = from_date, to_date = to_date))
+
+    def test_get_each_offsets(self):
+        """
+        get_each_offsets with several offsets, some of which are before the first date
+        """
+        for tags in [[], ['bench-other']]:
+            for today in [self.market.last_date(), self.market.trading_dates[10], self.market.trading_dates[0] - timedelta(days = 1)]:
+                self.assertParity('get_each_offsets', GetEachOffsetsInput(market = self.market.market, tags = tags, offsets = [0, 1, 7, 30, 59, 80], today = today))
+
+    def test_find_tags(self):
+        """
+        find_tags
+        """
+        for market in [self.market.market, self.other.market, 'NONE']:
+            self.assertParity('find_tags', FindTagsInput(market = market))
+        self.assertEqual(['bench-tag'], self.columnar.find_tags(None, FindTagsInput(market = self.market.market)).tags[self.market.code(0)])
+
+    def test_failed_export(self):
+        """
+        A failed export removes its directory and keeps the current generation
+        """
+        def candlesticks():
+            yield (self.market.code(0), self.market.candlesticks(0)[::-1])
+            raise RuntimeError('broken stream')
+
+        generation = current_generation(self.root, self.market.market)
+        with self.assertRaises(RuntimeError):
+            ColumnarStockExportRepository(root = self.root).export_market(ExportMarketInput(market = self.market.market, candlesticks = candlesticks(), tags = {}))
+
+        self.assertEqual(generation, current_generation(self.root, self.market.market))
+        self.assertEqual(sorted([generation, CURRENT]), sorted(os.listdir(os.path.join(self.root, self.market.market))))
+        self.assertParity('get_range', GetRangeInput(code = '', market = self.market.market, tags = [], to_date = None, limit = 20))
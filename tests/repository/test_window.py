@@ -0,0 +1,126 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+
+from app.repository.cached.window          import WindowCachedStockRepository, pack_arrays, unpack_arrays
+from app.repository.sqlalchemy.stock       import SqlalchemyStockRepository
+from app.repository.sqlalchemy.transaction import SqlalchemyTransaction
+from app.repository.inputdata.stock        import *
+from app.driver.memory.window              import MemoryWindowCacheDriver
+from app.domain.stock                      import Candlestick, Interval
+
+def stick(code:str, market:str, day:date, price:str = '10.5') -> Candlestick:
+    price = Decimal(price)
+    return Candlestick(code = code, market = market, date = day, open_price = price, close_price = price, high_price = price, low_price = price, volume = 100, interval = Interval.DAILY)
+
+class TestWindowCachedStockRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.transaction = SqlalchemyTransaction(target_url = 'sqlite://', pool_recycle = 60, create_schema = True)
+        self.inner       = SqlalchemyStockRepository()
+        self.driver      = MemoryWindowCacheDriver()
+        self.repository  = WindowCachedStockRepository(repository = self.inner, driver = self.driver, ttl = 3600)
+        self.transaction.do_in_tx(lambda ctx: self.repository.save_bulk(ctx, SaveBulkInput(candlesticks = [stick('AAA', 'M', date(2021, 1, 4)), stick('BBB', 'M', date(2021, 1, 4), '20')])))
+
+    def get_range(self, repository):
+        output = self.transaction.do_in_tx(lambda ctx: repository.get_range(ctx, GetRangeInput(code = '', market = 'M', tags = [], to_date = date(2021, 1, 31), limit = 10)))
+        return {code: [(s.date, s.close_price, s.volume) for s in sticks] for (code, sticks) in output.candlesticks.items()}
+
+    def test_get_range(self):
+        """
+        get_range reads the same candlesticks from the driver as from the repository
+        """
+        expected = self.get_range(self.inner)
+        self.assertEqual(expected, self.get_range(self.repository))
+        self.assertEqual(3, len(self.driver.blobs))
+        self.assertEqual(expected, self.get_range(self.repository))
+
+    def test_committed_write(self):
+        """
+        A committed write makes the windows of before it unreachable
+        """
+        self.get_range(self.repository)
+        self.transaction.do_in_tx(lambda ctx: self.repository.save_bulk(ctx, SaveBulkInput(candlesticks = [stick('AAA', 'M', date(2021, 1, 5), '11')])))
+
+        self.assertEqual([date(2021, 1, 5), date(2021, 1, 4)], [d for (d, _, _) in self.get_range(self.repository)['AAA']])
+
+    def test_writers(self):
+        """
+        The reads of a transaction which wrote are not shared, as it may be rolled back
+        """
+        def task(ctx):
+            self.repository.save_bulk(ctx, SaveBulkInput(candlesticks = [stick('AAA', 'M', date(2021, 1, 5), '11')]))
+            self.repository.get_range(ctx, GetRangeInput(code = '', market = 'M', tags = [], to_date = date(2021, 1, 31), limit = 10))
+            self.repository.get_range(ctx, GetRangeInput(code = 'AAA', market = 'M', tags = [], to_date = date(2021, 1, 31), limit = 10))
+            raise ValueError('rollback')
+
+        # The tickers of the market are kept and the windows are dropped, so the reads save both the tickers and the windows.
+        self.get_range(self.repository)
+        self.driver.blobs = {key: blob for (key, blob) in self.driver.blobs.items() if not key.startswith('window:range:')}
+        with self.assertRaises(ValueError):
+            self.transaction.do_in_tx(task)
+
+        self.assertEqual(1, len(self.driver.blobs))
+        self.assertEqual([date(2021, 1, 4)], [d for (d, _, _) in self.get_range(self.repository)['AAA']])
+
+    def test_get_range_series(self):
+        """
+        get_range_series reads the same series from the driver as from the repository
+        """
+        def read(repository):
+            output = self.transaction.do_in_tx(lambda ctx: repository.get_range_series(ctx, GetRangeSeriesInput(code = '', market = 'M', tags = [], to_date = date(2021, 1, 31), limit = 10)))
+            return {series.code: (series.market, series.dates.tolist(), series.close_prices.tolist(), series.volumes.tolist()) for series in output.universe}
+
+        self.transaction.do_in_tx(lambda ctx: self.repository.save_bulk(ctx, SaveBulkInput(candlesticks = [stick('AAA', 'M', date(2021, 1, 5), '11.25')])))
+        expected = read(self.inner)
+        self.assertEqual(expected, read(self.repository))
+        self.assertEqual(3, len([key for key in self.driver.blobs.keys() if ':series:' in key]))
+        with mock.patch.object(self.inner, 'get_range_series', side_effect = AssertionError('read the repository')):
+            self.assertEqual(expected, read(self.repository))
+        self.assertEqual([date(2021, 1, 4), date(2021, 1, 5)], expected['AAA'][1])
+
+    def test_compressed(self):
+        """
+        pack_arrays / unpack_arrays round trip with compress
+        """
+        arrays = [np.arange(1000, dtype=np.int64), np.linspace(0, 1, 1000), np.array([0, 1, 1], dtype=np.uint8), np.array([], dtype=np.int64)]
+        for compress in [False, True]:
+            blob   = pack_arrays(arrays, compress = compress)
+            result = unpack_arrays(blob)
+            self.assertEqual([array.dtype for array in arrays], [array.dtype for array in result])
+            for (array, unpacked) in zip(arrays, result):
+                self.assertTrue(np.array_equal(array, unpacked))
+        self.assertTrue(len(pack_arrays(arrays, compress = True)) < len(pack_arrays(arrays)))
+
+        repository = WindowCachedStockRepository(repository = self.inner, driver = MemoryWindowCacheDriver(), ttl = 3600, compress = True)
+        self.assertEqual(self.get_range(self.inner), self.get_range(repository))
+        self.assertEqual(self.get_range(self.inner), self.get_range(repository))
+
+    def test_expired_window(self):
+        """
+        When the tickers of the query are known, only the expired window is read from the repository
+        """
+        expected = self.get_range(self.repository)
+        self.driver.blobs = {key: blob for (key, blob) in self.driver.blobs.items() if not (key.startswith('window:range:') and ':M:BBB:' in key)}
+
+        with mock.patch.object(self.inner, 'get_range', wraps = self.inner.get_range) as get_range:
+            self.assertEqual(expected, self.get_range(self.repository))
+            self.assertEqual([('BBB', 'M', [])], [(call.args[1].code, call.args[1].market, call.args[1].tags) for call in get_range.call_args_list])
+        self.assertEqual(3, len(self.driver.blobs))
+
+    def test_failing_hook(self):
+        """
+        A hook which fails after the commit does not fail the transaction or skip the other hooks
+        """
+        self.get_range(self.repository)
+        def task(ctx):
+            ctx.on_commit(lambda: 1/0)
+            self.repository.save_bulk(ctx, SaveBulkInput(candlesticks = [stick('AAA', 'M', date(2021, 1, 5), '11')]))
+            ctx.on_commit(lambda: 1/0)
+            return 'done'
+
+        self.assertEqual('done', self.transaction.do_in_tx(task))
+        self.assertEqual([date(2021, 1, 5), date(2021, 1, 4)], [d for (d, _, _) in self.get_range(self.repository)['AAA']])
@@ -0,0 +1,313 @@
+import random
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+
+import app.usecase.default.stock as default_stock
+
+from app.usecase.default.stock             import DefaultStockInteractor
+from app.usecase.inputdata.stock           import CreateCandlestickChunksInput, SimulateTradeRuleInput, SimulateTradeRuleMonteCarloInput, SweepTradeRuleInput, WalkForwardTradeRuleInput, GetTrendPriceInput, GetRankingRsInput, GetAverageAtrInput, GetAthInput, GetAtlInput
+from app.repository.sqlalchemy.stock       import SqlalchemyStockRepository
+from app.repository.sqlalchemy.transaction import SqlalchemyTransaction
+from app.repository.inputdata.stock        import GetOnesAllInput, GetWatermarksInput, SaveBulkInput
+from app.driver.memory.cache               import MemoryCacheDriver
+from app.domain.stock                      import Candlestick, Interval, Watermark
+from app.domain.invest                     import InvestRuleType, StandardCommission
+from app.domain.analyze                    import RankingOrder, TrendType
+from app.domain.numeric                    import DecimalNumericBackend, FloatNumericBackend
+from app.util.market                       import SyntheticMarket
+from app.util.exception                    import InconsistencyDataException
+
+def stick(code:str, day:date, price:str) -> Candlestick:
+    price = Decimal(price)
+    return Candlestick(code = code, market = 'M', date = day, open_price = price, close_price = price, high_price = price, low_price = price, volume = 100, interval = Interval.DAILY)
+
+class TestCreateCandlestickChunks(unittest.TestCase):
+
+    def setUp(self):
+        self.repository  = SqlalchemyStockRepository()
+        self.transaction = SqlalchemyTransaction(target_url = 'sqlite://', pool_recycle = 60, create_schema = True)
+        self.interactor  = DefaultStockInteractor(stock_repository = self.repository, transaction = self.transaction, cache_driver = MemoryCacheDriver())
+
+    def load(self, chunk, **kwargs):
+        return self.interactor.create_candlestick_chunks(input_data = CreateCandlestickChunksInput(chunks = [chunk], safe = True, incremental = True, **kwargs))
+
+    def dates(self, code:str):
+        output = self.transaction.do_in_tx(lambda ctx: self.repository.get_ones_all(ctx, GetOnesAllInput(code = code, market = 'M', from_date = None, to_date = None)))
+        return [s.date for s in output.candlesticks]
+
+    def watermarks(self, *codes):
+        return self.transaction.do_in_tx(lambda ctx: self.repository.get_watermarks(ctx, GetWatermarksInput(tickers = [(code, 'M') for code in codes]))).watermarks
+
+    def seed(self, sticks):
+        # Rows saved without loaded dates, as the rows of a load rolled back after them.
+        self.transaction.do_in_tx(lambda ctx: self.repository.save_bulk(ctx, SaveBulkInput(candlesticks = sticks)))
+
+    def test_incremental_skips_present_rows(self):
+        """
+        create_candlestick_chunks skips the rows between the loaded dates
+        """
+        self.load([stick('AAA', date(2021, 1, 5), '10')])
+
+        output = self.load([stick('AAA', date(2021, 1, 4), '11'), stick('AAA', date(2021, 1, 5), '10'), stick('AAA', date(2021, 1, 6), '12')])
+
+        self.assertEqual((2, 1), (output.count, output.skipped))
+        self.assertEqual([date(2021, 1, 6), date(2021, 1, 5), date(2021, 1, 4)], self.dates('AAA'))
+        self.assertEqual({('AAA', 'M'): Watermark(first_date = date(2021, 1, 4), last_date = date(2021, 1, 6))}, self.watermarks('AAA'))
+
+    def test_top_up_looks_up_new_rows_only(self):
+        """
+        create_candlestick_chunks looks up only the rows after the loaded dates on a top-up
+        """
+        days    = [date(2021, 1, 1) + timedelta(days = index) for index in range(31)]
+        history = [stick(code, day, '10') for code in ['AAA', 'BBB', 'CCC'] for day in days[:30]]
+        self.load(history)
+
+        keys = []
+        find_bulk = self.repository.find_bulk
+        def counting(ctx, input_data):
+            keys.extend(input_data.keys)
+            return find_bulk(ctx, input_data)
+        self.repository.find_bulk = counting
+
+        output = self.load([stick(code, day, '10') for code in ['AAA', 'BBB', 'CCC'] for day in days])
+
+        self.assertEqual((3, 90), (output.count, output.skipped))
+        self.assertEqual(sorted([(code, 'M', days[30]) for code in ['AAA', 'BBB', 'CCC']]), sorted(keys))
+        self.assertEqual(Watermark(first_date = days[0], last_date = days[30]), self.watermarks('AAA')[('AAA', 'M')])
+
+    def test_out_of_order_files(self):
+        """
+        create_candlestick_chunks saves the rows of an older file loaded after a newer one
+        """
+        self.load([stick('AAA', date(2021, 1, 6), '12'), stick('AAA', date(2021, 1, 7), '13')])
+        output = self.load([stick('AAA', date(2021, 1, 4), '10'), stick('AAA', date(2021, 1, 5), '11')])
+
+        self.assertEqual((2, 0), (output.count, output.skipped))
+        self.assertEqual([date(2021, 1, 7), date(2021, 1, 6), date(2021, 1, 5), date(2021, 1, 4)], self.dates('AAA'))
+        # The older rows are apart from the loaded dates, so the newer ones are kept.
+        self.assertEqual(Watermark(first_date = date(2021, 1, 6), last_date = date(2021, 1, 7)), self.watermarks('AAA')[('AAA', 'M')])
+
+    def test_rolled_back_chunk(self):
+        """
+        create_candlestick_chunks does not join the loaded dates over a chunk rolled back
+        """
+        sticks = [stick('AAA', date(2021, 1, day), '10') for day in range(4, 10)]
+        self.load(sticks[0:2])
+        # The chunk of sticks[2:4] is rolled back, so the next chunk of the file starts a new run.
+        self.load(sticks[4:6])
+        self.assertEqual(Watermark(first_date = sticks[4].date, last_date = sticks[5].date), self.watermarks('AAA')[('AAA', 'M')])
+
+        output = self.load(sticks)
+
+        self.assertEqual((2, 4), (output.count, output.skipped))
+        self.assertEqual([s.date for s in reversed(sticks)], self.dates('AAA'))
+        self.assertEqual(Watermark(first_date = sticks[0].date, last_date = sticks[5].date), self.watermarks('AAA')[('AAA', 'M')])
+
+    def test_next_chunk_joins(self):
+        """
+        create_candlestick_chunks joins the loaded dates over the chunks of a file
+        """
+        output = self.load([stick('AAA', date(2021, 1, 4), '10'), stick('AAA', date(2021, 1, 5), '10')])
+        self.assertEqual({('AAA', 'M'): date(2021, 1, 4)}, output.loaded_from)
+        self.load([stick('AAA', date(2021, 1, 6), '10')], loaded_from = output.loaded_from)
+
+        self.assertEqual(Watermark(first_date = date(2021, 1, 4), last_date = date(2021, 1, 6)), self.watermarks('AAA')[('AAA', 'M')])
+
+    def test_conflict_then_rerun(self):
+        """
+        create_candlestick_chunks saves the rows of a rejected chunk on the rerun after a later chunk was loaded
+        """
+        self.seed([stick('AAA', date(2020, 1, 6), '10')])
+        with self.assertRaises(InconsistencyDataException):
+            self.load([stick('AAA', date(2020, 1, 6), '11'), stick('AAA', date(2020, 1, 7), '12')])
+        self.load([stick('AAA', date(2021, 1, 4), '13')])
+
+        output = self.load([stick('AAA', date(2020, 1, 6), '10'), stick('AAA', date(2020, 1, 7), '12')])
+
+        self.assertEqual((1, 1), (output.count, output.skipped))
+        self.assertEqual([date(2021, 1, 4), date(2020, 1, 7), date(2020, 1, 6)], self.dates('AAA'))
+
+    def test_skipped_conflicts_keep_watermark(self):
+        """
+        create_candlestick_chunks does not move the loaded dates of a ticker with a skipped conflict
+        """
+        self.seed([stick('AAA', date(2020, 1, 6), '10')])
+        self.load([stick('BBB', date(2020, 1, 6), '10')])
+
+        output = self.load([stick('AAA', date(2020, 1, 6), '11'), stick('AAA', date(2020, 1, 7), '12'), stick('BBB', date(2020, 1, 6), '10'), stick('BBB', date(2020, 1, 7), '12')], skip_conflicts = True)
+
+        self.assertEqual((2, 1), (output.count, len(output.newer)))
+        self.assertEqual({('BBB', 'M'): Watermark(first_date = date(2020, 1, 6), last_date = date(2020, 1, 7))}, self.watermarks('AAA', 'BBB'))
+
+class TestSimulateTradeRuleMonteCarlo(unittest.TestCase):
+
+    def test_in_process_releases_candlesticks(self):
+        """
+        simulate_trade_rule_montecarlo does not keep the candlesticks in the process after the runs
+        """
+        repository  = SqlalchemyStockRepository()
+        transaction = SqlalchemyTransaction(target_url = 'sqlite://', pool_recycle = 60, create_schema = True)
+        interactor  = DefaultStockInteractor(stock_repository = repository, transaction = transaction, cache_driver = MemoryCacheDriver())
+        market      = SyntheticMarket(tickers = 3, days = 120)
+        interactor.create_candlestick_chunks(input_data = CreateCandlestickChunksInput(chunks = market.chunks(), safe = False))
+
+        output = interactor.simulate_trade_rule_montecarlo(input_data = SimulateTradeRuleMonteCarloInput(
+            rule_type = InvestRuleType.RANDOM, code = '', market = market.market, tags = [], unit = 100, losscut_rate = Decimal('0.9'),
+            today = market.last_date(), term = 120, principal = Decimal('1000000'), commission = StandardCommission(Decimal('0'), Decimal('0'), Decimal('0')),
+            loop_num = 2, seed = 1, workers = 1
+            ))
+
+        self.assertEqual(2, len(output.reports))
+        self.assertEqual({}, default_stock.simulation_candlesticks)
+        self.assertIsNone(default_stock.simulation_cache)
+
+class TestSweepTradeRule(unittest.TestCase):
+
+    def setUp(self):
+        repository       = SqlalchemyStockRepository()
+        transaction      = SqlalchemyTransaction(target_url = 'sqlite://', pool_recycle = 60, create_schema = True)
+        self.interactor  = DefaultStockInteractor(stock_repository = repository, transaction = transaction, cache_driver = MemoryCacheDriver())
+        self.market      = SyntheticMarket(tickers = 5, days = 160, seed = 3)
+        self.commission  = StandardCommission(minimum = Decimal('1'), maximum = Decimal('20'), rate = Decimal('0.001'))
+        self.interactor.create_candlestick_chunks(input_data = CreateCandlestickChunksInput(chunks = self.market.chunks(), safe = False))
+
+    def test_results_equal_standalone_runs(self):
+        """
+        sweep_trade_rule gives the result of simulate_trade_rule for every combination
+        """
+        seed = 7
+        output = self.interactor.sweep_trade_rule(input_data = SweepTradeRuleInput(
+            rule_type = InvestRuleType.TURTLE, code = '', market = self.market.market, tags = [], today = self.market.last_date(), term = 160,
+            principal = Decimal('1000000'), commission = self.commission, parameters = {'unit': [100, 300], 'losscut_rate': [Decimal('0.05'), Decimal('0.2')]},
+            loop_num = 1, seed = seed, workers = 1
+            ))
+
+        self.assertEqual(4, len(output.results))
+        self.assertEqual(sorted([(100, Decimal('0.05')), (100, Decimal('0.2')), (300, Decimal('0.05')), (300, Decimal('0.2'))]), sorted([(r.parameters['unit'], r.parameters['losscut_rate']) for r in output.results]))
+        self.assertEqual(sorted([r.valuation for r in output.results], reverse = True), [r.valuation for r in output.results])
+        for result in output.results:
+            # The rules draw from the global generator when no generator is given, so it is seeded as the first run of the sweep.
+            random.seed(seed * 1000003)
+            report = self.interactor.simulate_trade_rule(input_data = SimulateTradeRuleInput(
+                rule_type = InvestRuleType.TURTLE, code = '', market = self.market.market, tags = [], unit = result.parameters['unit'], losscut_rate = result.parameters['losscut_rate'],
+                today = self.market.last_date(), term = 160, principal = Decimal('1000000'), commission = self.commission
+                )).report
+            self.assertEqual(1, result.number)
+            self.assertEqual((report.current_valuation, report.win_rate, report.payoff_ratio, report.commission), (result.valuation, result.win_rate, result.payoff_ratio, result.commission))
+            self.assertNotEqual(Decimal('0'), report.commission)
+
+class TestWalkForwardTradeRule(unittest.TestCase):
+
+    def setUp(self):
+        repository       = SqlalchemyStockRepository()
+        transaction      = SqlalchemyTransaction(target_url = 'sqlite://', pool_recycle = 60, create_schema = True)
+        self.interactor  = DefaultStockInteractor(stock_repository = repository, transaction = transaction, cache_driver = MemoryCacheDriver())
+        self.market      = SyntheticMarket(tickers = 10, days = 200, seed = 3)
+        self.commission  = StandardCommission(minimum = Decimal('1'), maximum = Decimal('20'), rate = Decimal('0.001'))
+        self.interactor.create_candlestick_chunks(input_data = CreateCandlestickChunksInput(chunks = self.market.chunks(), safe = False))
+
+    def test_windows_equal_standalone_runs(self):
+        """
+        walk_forward_trade_rule gives the result of simulate_trade_rule over the slice of each window
+        """
+        (seed, term, step) = (7, 120, 20)
+        for rule_type in [InvestRuleType.TURTLE, InvestRuleType.GOLDEN_TRAIL, InvestRuleType.RANDOM]:
+            with self.subTest(rule_type = rule_type.name):
+                output = self.interactor.walk_forward_trade_rule(input_data = WalkForwardTradeRuleInput(
+                    rule_type = rule_type, code = '', market = self.market.market, tags = [], unit = 100, losscut_rate = Decimal('0.05'),
+                    today = self.market.last_date(), term = term, windows = 4, step = step, principal = Decimal('1000000'), commission = self.commission,
+                    seed = seed, workers = 1, detail = True
+                    ))
+
+                self.assertEqual([0, 1, 2, 3], [window.index for window in output.windows])
+                for window in output.windows:
+                    # The oldest window comes first, and each window ends `step` days after the previous one.
+                    last = len(self.market.trading_dates) - 1 - step * (3 - window.index)
+                    self.assertEqual((self.market.trading_dates[last - term + 1], self.market.trading_dates[last]), (window.first_date, window.last_date))
+
+                    # The rules draw from the global generator when no generator is given, so it is seeded as the run of the window.
+                    random.seed(seed * 1000003 + window.index)
+                    report = self.interactor.simulate_trade_rule(input_data = SimulateTradeRuleInput(
+                        rule_type = rule_type, code = '', market = self.market.market, tags = [], unit = 100, losscut_rate = Decimal('0.05'),
+                        today = window.last_date, term = term, principal = Decimal('1000000'), commission = self.commission
+                        )).report
+                    self.assertEqual(report.histories, window.report.histories)
+                    self.assertEqual(report.positions, window.report.positions)
+                    self.assertEqual((report.current_valuation, report.win_rate, report.payoff_ratio, report.commission, report.max_drawdown), (window.report.current_valuation, window.report.win_rate, window.report.payoff_ratio, window.report.commission, window.report.max_drawdown))
+                self.assertTrue(any([len(trades) > 0 for window in output.windows for trades in list(window.report.histories.values()) + list(window.report.positions.values())]))
+
+class TestGetTrendPrice(unittest.TestCase):
+
+    def trend(self, numeric):
+        repository  = SqlalchemyStockRepository()
+        transaction = SqlalchemyTransaction(target_url = 'sqlite://', pool_recycle = 60, create_schema = True)
+        interactor  = DefaultStockInteractor(stock_repository = repository, transaction = transaction, cache_driver = MemoryCacheDriver(), numeric = numeric)
+        # The SMA of the newest two days is 50, so the newest price is just 10% above it.
+        interactor.create_candlestick_chunks(input_data = CreateCandlestickChunksInput(chunks = [[stick('AAA', date(2021, 1, 4), '45'), stick('AAA', date(2021, 1, 5), '55')]], safe = False))
+        return interactor.get_trend_price(input_data = GetTrendPriceInput(market = 'M', tags = [], today = date(2021, 1, 5), sorttype = TrendType.UP, margin = 10, term = 1, smaterm = 2, limit = 10, offset = 0)).data
+
+    def test_decimal_margin(self):
+        """
+        get_trend_price compares with the margin exactly on the decimal backend
+        """
+        data = self.trend(None)
+        self.assertEqual([('AAA', 1, 0)], [(d.code, d.up, d.down) for d in data])
+        self.assertEqual((date(2021, 1, 4), date(2021, 1, 5)), (data[0].from_date, data[0].to_date))
+
+    def test_float_margin(self):
+        """
+        get_trend_price compares in float64 on the vectorized backend
+        """
+        data = self.trend(FloatNumericBackend())
+        self.assertEqual([('AAA', 0, 0)], [(d.code, d.up, d.down) for d in data])
+        self.assertEqual((date(2021, 1, 4), date(2021, 1, 5)), (data[0].from_date, data[0].to_date))
+
+class TestNumericBackendParity(unittest.TestCase):
+
+    def setUp(self):
+        self.market = SyntheticMarket(tickers = 12, days = 300, seed = 5)
+        self.interactors = dict()
+        for numeric in [DecimalNumericBackend(), FloatNumericBackend()]:
+            repository  = SqlalchemyStockRepository()
+            transaction = SqlalchemyTransaction(target_url = 'sqlite://', pool_recycle = 60, create_schema = True)
+            interactor  = DefaultStockInteractor(stock_repository = repository, transaction = transaction, cache_driver = MemoryCacheDriver(), numeric = numeric)
+            interactor.create_candlestick_chunks(input_data = CreateCandlestickChunksInput(chunks = self.market.chunks(), safe = False))
+            self.interactors[numeric.vectorized] = interactor
+
+    def assertClose(self, exact, approximate):
+        self.assertTrue(abs(exact - approximate) <= abs(exact) * Decimal('1e-12'), f"{exact} != {approximate}")
+
+    def test_ranking_rs(self):
+        """
+        get_ranking_rs ranks the same on the decimal and float backends
+        """
+        (exact, approximate) = [self.interactors[vectorized].get_ranking_rs(input_data = GetRankingRsInput(market = self.market.market, tags = [], today = self.market.last_date(), order = RankingOrder.DESC, limit = 20, offset = 0)).data for vectorized in [False, True]]
+
+        self.assertEqual(12, len(exact))
+        self.assertEqual([(d.code, d.point, d.stick252.date) for d in exact], [(d.code, d.point, d.stick252.date) for d in approximate])
+        for (e, a) in zip(exact, approximate):
+            self.assertIsInstance(a.rawscore, Decimal)
+            self.assertEqual(e.rawscore, 2*e.stick.close_price/e.stick63.close_price + e.stick.close_price/e.stick126.close_price + e.stick.close_price/e.stick189.close_price + e.stick.close_price/e.stick252.close_price)
+            self.assertClose(e.rawscore, a.rawscore)
+
+    def test_average_atr(self):
+        """
+        get_average_atr gives the same on the decimal and float backends
+        """
+        for code in self.market.codes():
+            (exact, approximate) = [self.interactors[vectorized].get_average_atr(input_data = GetAverageAtrInput(code = code, market = self.market.market, term = 14, today = self.market.last_date())).average_atr for vectorized in [False, True]]
+            self.assertIsInstance(approximate, Decimal)
+            self.assertClose(exact, approximate)
+
+    def test_ath_atl(self):
+        """
+        get_ath and get_atl find the same candlesticks on the decimal and float backends
+        """
+        for term in [5, 20, 60]:
+            for (method, input_class) in [('get_ath', GetAthInput), ('get_atl', GetAtlInput)]:
+                with self.subTest(method = method, term = term):
+                    (exact, approximate) = [getattr(self.interactors[vectorized], method)(input_data = input_class(market = self.market.market, tags = [], term = term, base_date = self.market.trading_dates[-2])).candlesticks for vectorized in [False, True]]
+                    self.assertEqual(exact, approximate)
+                    if term == 5:
+                        self.assertTrue(len(exact) > 0)